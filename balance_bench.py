@@ -0,0 +1,114 @@
+"""
+配平基准：在随机生成、具有唯一正整数配平的合成反应上，对比内置整数配平（balance.balance_matrix，
+经 balance_reaction_info(method="integer")）与 chempy.balance_stoichiometry 的耗时与结果。
+任一反应两者结果不一致时以非零码退出。
+
+用法：python balance_bench.py [--sizes 8 12 16 20 24] [--per-size 5] [--seed 0]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from equallab.chem.balance import BalanceError, balance_matrix
+from equallab.chem.formula import _composition_rows
+from equallab.chem.reaction import balance_reaction_info
+
+
+# 合成化学式所用元素（chempy 与内置元素表均可识别）
+_ELEMENTS = ["C", "H", "O", "N", "S", "P", "Cl", "Na", "K", "Ca", "Mg", "Fe", "Cu", "Zn", "Al",
+             "Si", "Br", "I", "F", "Mn", "Cr", "Co", "Ni", "Ba", "Li", "B", "Ag", "Pb", "Sn", "Ti"]
+
+
+def _formula(comp):
+    return "".join(f"{el}{n if n != 1 else ''}" for el, n in comp.items() if n)
+
+
+def synthetic_reaction(n_species, rng):
+    """
+    生成 n_species 个物种、具有唯一正整数配平的反应式（元素数取 n_species-1）：
+    先取随机正系数与反应物组成，其余产物取随机小组成，最后一个产物（系数 1）吸收剩余原子，
+    从而保证存在全正配平；零空间维数大于 1 或化学式重复时重抽。
+    """
+    elements = _ELEMENTS[:n_species - 1]
+    n_reactants = n_species // 2
+    while True:
+        coef = [rng.randint(1, 3) for _ in range(n_species - 1)] + [1]
+        comps = [{el: rng.randint(1, 6) for el in rng.sample(elements, rng.randint(2, 4))} for _ in range(n_reactants)]
+        left = {el: 0 for el in elements}
+        for c, comp in zip(coef, comps):
+            for el, k in comp.items():
+                left[el] += c * k
+        for j in range(n_reactants, n_species - 1):
+            comp = {}
+            for el in rng.sample(elements, rng.randint(1, 3)):
+                k = min(rng.randint(1, 2), left[el] // coef[j])
+                if k:
+                    comp[el] = k
+                    left[el] -= coef[j] * k
+            comps.append(comp)
+        comps.append(left)
+        species = [_formula(comp) for comp in comps]
+        if not all(species) or len(set(species)) < n_species:
+            continue
+        rows, _elements = _composition_rows(species)
+        try:
+            balance_matrix(rows, n_reactants)
+        except BalanceError:
+            continue
+        return " + ".join(species[:n_reactants]) + " -> " + " + ".join(species[n_reactants:])
+
+
+def _chempy_coefficients(reaction):
+    from chempy import balance_stoichiometry
+
+    left, right = reaction.split(" -> ")
+    reag, prod = left.split(" + "), right.split(" + ")
+    R, P = balance_stoichiometry(set(reag), set(prod))
+    return [int(R[s]) for s in reag], [int(P[s]) for s in prod]
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return (time.perf_counter() - start) * 1000, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 12, 16, 20, 24])
+    parser.add_argument("--per-size", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    opts = parser.parse_args()
+
+    try:
+        import chempy  # noqa: F401
+    except ImportError:
+        sys.exit("chempy is not installed")
+
+    rng = random.Random(opts.seed)
+    agree = total = 0
+    print(f"{'species':>8} {'integer ms':>11} {'chempy ms':>10}  agree")
+    for size in opts.sizes:
+        t_int, t_chempy, ok = [], [], 0
+        for _ in range(opts.per_size):
+            reaction = synthetic_reaction(size, rng)
+            # 每个合成反应互不相同，不会命中配平缓存
+            ms, (rc, pc, *_rest) = _timed(balance_reaction_info, reaction, "integer")
+            t_int.append(ms)
+            ms, expected = _timed(_chempy_coefficients, reaction)
+            t_chempy.append(ms)
+            if (rc, pc) == expected:
+                ok += 1
+            else:
+                print(f"     mismatch: {reaction}\n       integer {rc} {pc}\n       chempy  {expected}")
+        agree += ok
+        total += opts.per_size
+        print(f"{size:>8} {statistics.mean(t_int):>11.2f} {statistics.mean(t_chempy):>10.1f}  {ok}/{opts.per_size}")
+    print(f"results agree {agree}/{total}")
+    sys.exit(0 if agree == total else 1)
+
+
+if __name__ == "__main__":
+    main()
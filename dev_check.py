@@ -1,13 +1,21 @@
+import asyncio
+import json
 import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
 from equallab.api import similarity, normalize
-from equallab.api import image_latex_similarity  # 新增 API 覆盖
+from equallab.api import image_latex_similarity, aimage_latex_similarity  # 新增 API 覆盖
 from equallab.api import chem_image_similarity  # 化学图片+相似度（一步）
+from equallab.api import image_similarity_batch
 from equallab.chem import (
     normalize_formula,
     formulas_equivalent,
     balance_reaction_info,
     reactions_equivalent,
 )
+from equallab.ocr import configure_ocr_client
 from equallab.web import app
 
 try:
@@ -16,6 +24,72 @@ except Exception:  # noqa: BLE001
     TestClient = None
 
 
+class _StubOcrHandler(BaseHTTPRequestHandler):
+    """本地 OCR 桩服务：GET /predict?path=...，按文件名返回固定结果；路径含 flaky 时每个路径首次返回 503。"""
+
+    protocol_version = "HTTP/1.1"  # 支持 keep-alive，便于观察连接复用
+    results = {"x2y.png": {"latex": ["$x+2y$"]}, "chem.png": {"text": "\\ce{H2O}"}}
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        path = parse_qs(urlparse(self.path).query).get("path", [""])[0]
+        if "flaky" in path and path not in self.server.failed:
+            self.server.failed.add(path)
+            self._send(503, "text/plain", "busy")
+            return
+        self._send(200, "application/json", json.dumps(self.results.get(os.path.basename(path).replace("flaky-", ""), {})))
+
+    def _send(self, status, content_type, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def check_ocr_stub():
+    # 本地 OCR 桩：覆盖 OCR 客户端的解码、5xx 重试与连接复用，不依赖真实 TexTeller 服务
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOcrHandler)
+    server.connections, server.failed = 0, set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = configure_ocr_client(f"http://127.0.0.1:{server.server_address[1]}/predict", backoff=0.01)
+    try:
+        r = image_latex_similarity("/tmp/x2y.png", "$x+2*y$")
+        print("STUB.IMG.SIM:", r["image_latex"], r["result"]["equivalent"])
+        r = chem_image_similarity("/tmp/flaky-chem.png", "OH2", "formula")
+        print("STUB.CHEM.IMG.SIM (after 503):", r["image_text"], r["result"]["equivalent"])
+        for _ in range(5):
+            image_latex_similarity("/tmp/x2y.png", "$x+2*y$")
+        r = asyncio.run(aimage_latex_similarity("/tmp/x2y.png", "$x+2*y$"))
+        print("STUB.IMG.SIM (async):", r["image_latex"], r["result"]["equivalent"])
+        batch = [
+            {"image_path": "/tmp/x2y.png", "expected": "$x+2*y$"},
+            {"image_path": "/tmp/chem.png", "expected": "H2O", "type": "formula"},
+            {"image_path": "/tmp/chem.png", "expected": "H2O", "type": "bogus"},
+        ]
+        print("STUB.IMG.BATCH:", [(r["index"], r["ok"]) for r in image_similarity_batch(batch, concurrency=2)])
+        if TestClient is not None:
+            http = TestClient(app)
+            resp = http.post("/image/similarity", json={"image_path": "/tmp/x2y.png", "latex": "$x+2*y$"})
+            print("STUB HTTP /image/similarity:", resp.status_code)
+            resp = http.post("/chem/image/similarity", json={"image_path": "/tmp/chem.png", "text": "H2O", "type": "formula"})
+            print("STUB HTTP /chem/image/similarity:", resp.status_code)
+            resp = http.post("/image/similarity/batch", json={"items": batch})
+            print("STUB HTTP /image/similarity/batch:", resp.status_code, len(resp.text.splitlines()))
+        print("STUB.OCR:", client.stats(), "connections:", server.connections)
+        print("STUB.OCR.CACHE:", client.cache.stats())
+    finally:
+        server.shutdown()
+        configure_ocr_client()
+
+
 def main():
     # 数学基本功能
     print("SIM:", similarity("$(x+1)^2$", "$x^2+2x+1$"))
@@ -62,6 +136,13 @@ def main():
         print("HTTP /chem/formula/norm:", resp.status_code)
         resp = client.post("/chem/formula/eq", json={"a": "H2O", "b": "OH2"})
         print("HTTP /chem/formula/eq:", resp.status_code)
+        resp = client.post("/chem/formula/batch", json={"formulas": ["H2O", "CuSO4·5H2O"], "pairs": [["H2O", "OH2"]]})
+        print("HTTP /chem/formula/batch:", resp.status_code)
+        resp = client.post("/chem/formula/similarity", json={"a": "Fe2O3", "b": "Fe3O4"})
+        print("HTTP /chem/formula/similarity:", resp.status_code)
+        client.post("/chem/index/add", json={"key": "hematite", "input": "Fe2O3"})
+        resp = client.post("/chem/index/query", json={"input": "Fe3O4", "k": 3})
+        print("HTTP /chem/index/query:", resp.status_code)
         resp = client.post("/chem/reaction/balance", json={"reaction": "H2 + 1/2 O2 -> H2O"})
         print("HTTP /chem/reaction/balance:", resp.status_code)
         resp = client.post("/chem/reaction/eq", json={"a": "H2 + 1/2 O2 -> H2O", "b": "H2 + 1/2 O2 -> H2O"})
@@ -84,6 +165,8 @@ def main():
             except Exception as e:
                 print("HTTP /chem/image/similarity ERROR:", e)
 
+    check_ocr_stub()
+
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,11 @@
-from .api import normalize
+__version__ = "0.1.0"
 
-__all__ = ["normalize"]
+__all__ = ["normalize", "__version__"]
 
 
+def __getattr__(name):
+    # 延迟导入：import equallab / equallab.cli 不连带加载 SymPy 等重依赖
+    if name == "normalize":
+        from .api import normalize
+        return normalize
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,24 +1,57 @@
-from typing import Dict, Any
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Any, List
+import os
+import threading
 
 from .normalization.preprocess import preprocess_text
 from .normalization.latex_clean import clean_latex
-from .normalization.to_sympy import parse_to_sympy
-from .similarity.scorer import similarity as _similarity
-from .chem import normalize_formula, formulas_equivalent, balance_reaction_info, reactions_equivalent
+from .normalization.to_sympy import CANONICAL_LEVELS, parse_raw_detailed
+from .normalization.carrier import NormalizedExpr
+from .cache import env_int
+from .disk_cache import get_disk_cache
+from .ocr import LATEX_FIELDS, TEXT_FIELDS, get_ocr_client
+from .chem import normalize_formula, formulas_equivalent, balance_reaction_info, reaction_equivalence_info
 
-import os
-import requests
 
+# 比较/聚类/索引所需的 similarity 子包（NumPy 等）在对应函数内导入，仅规范化的调用不加载
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+    from .similarity.index import ExpressionIndex
 
-def normalize(input_text: str, is_latex: bool | None = None) -> Dict[str, Any]:
+
+def normalize(input_text: str, is_latex: bool | None = None, canonical: str = "full") -> NormalizedExpr:
     """
     基础规范化入口：
     - 预处理文本（Unicode NFKC、空白规范、常见替换）
     - 若判断为 LaTeX 或显式声明 is_latex=True，则进行 LaTeX 清洗
-    - 解析为 SymPy 表达式
-    返回：{"input": 原始字符串, "text_norm": 规范化文本, "latex_norm": 规范化后可能的 LaTeX,
-          "expr": sympy.Expr 或 None, "errors": list[str]}
+    - 解析为 SymPy 表达式，并按 canonical 级别规范化：
+      none 仅解析（适合只做展示/指纹的高频调用）；cheap 仅 expand/together/cancel；full 完整 simplify（缺省）
+    返回 NormalizedExpr 载体（兼容 dict 访问）：{"input": 原始字符串, "text_norm": 规范化文本,
+          "latex_norm": 规范化后可能的 LaTeX, "expr": 对应级别的 sympy.Expr 或 None, "errors": list[str],
+          "parser": 处理该输入的解析器（native / parse_latex / parse_expr）}
+    化简等派生形式惰性计算并缓存在载体上，similarity 等下游阶段直接复用。
+    配置了磁盘缓存（EQUALLAB_DISK_CACHE）时，结果连同对应级别的规范形按
+    (库版本, is_latex, canonical, 输入) 持久化，多个 worker 进程共享。
     """
+    if canonical not in CANONICAL_LEVELS:
+        raise ValueError(f"unknown canonical level: {canonical}")
+    disk = get_disk_cache()
+    if disk is None:
+        return _normalize(input_text, is_latex, canonical)
+    from . import __version__
+    key = ("normalize", __version__, is_latex, canonical, input_text)
+    hit, state = disk.get(key)
+    if hit:
+        return NormalizedExpr.load(state)
+    out = _normalize(input_text, is_latex, canonical)
+    state = out.dump()
+    # 化简超时/失败时规范形是退化的原始表达式：不写入共享缓存，留给之后的调用重新计算
+    if not out.degraded:
+        disk.put(key, state)
+    return out
+
+
+def _normalize(input_text: str, is_latex: bool | None, canonical: str) -> NormalizedExpr:
     raw = input_text
     errors: list[str] = []
 
@@ -37,26 +70,22 @@ def normalize(input_text: str, is_latex: bool | None = None) -> Dict[str, Any]:
         latex_norm = clean_latex(text_norm)
         to_parse = latex_norm
 
-    expr, parse_err = parse_to_sympy(to_parse, assume_latex=looks_latex)
+    expr, parse_err, parser = parse_raw_detailed(to_parse, assume_latex=looks_latex)
     if parse_err:
         errors.append(parse_err)
 
-    return {
-        "input": raw,
-        "text_norm": text_norm,
-        "latex_norm": latex_norm,
-        "expr": expr,
-        "errors": errors,
-    }
+    return NormalizedExpr(expr, input=raw, text_norm=text_norm, latex_norm=latex_norm, errors=errors, level=canonical, parser=parser)
 
 
-def similarity(a: str, b: str, assumptions: Dict[str, Any] | None = None) -> Dict[str, Any]:
+def similarity(a: str, b: str, assumptions: Dict[str, Any] | None = None, metric_weights: Dict[str, float] | None = None, canonical: str = "full") -> Dict[str, Any]:
     """
     计算两个输入表达式的等价性与相似度分数。
+    metric_weights：结构度量权重，如 {"jaccard": 0.5, "tree_edit": 0.5}
+    canonical：输入的规范化级别（见 normalize）；等价判定从该形式出发，只在需要时再计算更重的形式
     返回：{"a": normalize(a), "b": normalize(b), "equivalent": bool, "score": float, "detail": {...}}
     """
-    na = normalize(a)
-    nb = normalize(b)
+    na = normalize(a, canonical=canonical)
+    nb = normalize(b, canonical=canonical)
     if na["expr"] is None or nb["expr"] is None:
         return {
             "a": na,
@@ -65,7 +94,8 @@ def similarity(a: str, b: str, assumptions: Dict[str, Any] | None = None) -> Dic
             "score": 0.0,
             "detail": {"error": "failed to parse one of inputs"},
         }
-    res = _similarity(na["expr"], nb["expr"], assumptions=assumptions)
+    from .similarity.scorer import similarity as _similarity
+    res = _similarity(na, nb, assumptions=assumptions, metric_weights=metric_weights)
     return {
         "a": na,
         "b": nb,
@@ -75,51 +105,70 @@ def similarity(a: str, b: str, assumptions: Dict[str, Any] | None = None) -> Dic
     }
 
 
+def cluster(inputs: List[str], assumptions: Dict[str, Any] | None = None, confirm: bool = True) -> Dict[str, Any]:
+    """
+    批量将输入划分为等价类：每个输入只规范化一次，按数值指纹分桶，仅在桶内做符号确认。
+    返回：{"classes": [{"representative": int, "members": [int], "expr": str}], "failed": [int]}
+    其中下标对应 inputs；failed 为无法解析的输入。
+    """
+    parsed = [normalize(t)["expr"] for t in inputs]
+    ok = [i for i, e in enumerate(parsed) if e is not None]
+    from .similarity.cluster import cluster_expressions
+    groups = cluster_expressions([parsed[i] for i in ok], assumptions=assumptions, confirm=confirm)
+    classes = []
+    for g in groups:
+        members = [ok[j] for j in g]
+        classes.append({"representative": members[0], "members": members, "expr": str(parsed[members[0]])})
+    return {"classes": classes, "failed": [i for i, e in enumerate(parsed) if e is None]}
+
+
+def index_add(index: "ExpressionIndex", key: str, text: str) -> Dict[str, Any]:
+    """规范化 text 并以 key 加入参考表达式索引；无法解析时抛出 ValueError。"""
+    n = normalize(text)
+    if n["expr"] is None:
+        raise ValueError(f"failed to parse input: {n['errors']}")
+    index.add(key, n["expr"])
+    return n
+
+
+def index_query(index: "ExpressionIndex", text: str, k: int = 10, confirm: bool = True, assumptions: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """
+    在参考表达式索引中检索与 text 结构最相近的 top-k 候选；confirm=True 时仅对这些候选做等价判定。
+    返回：{"input": normalize(text), "candidates": [{"key", "similarity", "equivalent"?}]}
+    """
+    n = normalize(text)
+    if n["expr"] is None:
+        return {"input": n, "candidates": [], "error": "failed to parse input"}
+    candidates = []
+    for key, est in index.query(n["expr"], k=k):
+        item: Dict[str, Any] = {"key": key, "similarity": est}
+        if confirm:
+            from .similarity.equivalence import are_equivalent
+            item["equivalent"] = are_equivalent(n, index.get(key), assumptions=assumptions).is_equivalent
+        candidates.append(item)
+    return {"input": n, "candidates": candidates}
+
+
 def image_latex_similarity(image_path: str, latex: str, assumptions: Dict[str, Any] | None = None, use_onnx: bool = False) -> Dict[str, Any]:
     """
     识别图片中的公式为 LaTeX，并与传入的 LaTeX 进行等价/相似度比对。
-    通过 HTTP 请求远程 OCR 服务（如 TexTeller web），期望接口形如 GET {server_url}?path={image_path}。
+    通过共享的 OCR 客户端（见 equallab.ocr，服务地址取自 TEXTELLER_SERVER_URL）请求远程 OCR 服务，期望接口形如 GET {server_url}?path={image_path}。
     返回：{"image_latex": str, "input_latex": str, "result": similarity(...) }
     """
-    # server_url = os.getenv("TEXTELLER_SERVER_URL")
-    server_url = "http://47.116.161.224:8501/predict"
-    if not server_url:
-        raise RuntimeError(
-            "TEXTELLER_SERVER_URL 未设置，请配置指向 OCR 服务的 HTTP 接口，例如 http://127.0.0.1:8502/predict"
-        )
+    img_latex_raw = get_ocr_client().recognize(image_path, LATEX_FIELDS)
+    return _image_latex_compare(img_latex_raw, latex, assumptions)
 
-    try:
-        resp = requests.get(server_url, params={"path": image_path}, timeout=15)
-    except requests.RequestException as e:  # noqa: BLE001
-        raise RuntimeError(f"HTTP 请求 OCR 服务失败: {e}")
 
-    if resp.status_code != 200:
-        trunc = (resp.text or "")[:200]
-        raise RuntimeError(f"OCR 服务返回非 200 状态码: {resp.status_code}, 响应片段: {trunc}")
+async def aimage_latex_similarity(image_path: str, latex: str, assumptions: Dict[str, Any] | None = None, use_onnx: bool = False) -> Dict[str, Any]:
+    """image_latex_similarity 的 asyncio 版本：异步等待 OCR，比对（SymPy，CPU 密集）放入默认执行器。"""
+    import asyncio  # 仅异步路径需要，避免拖慢同步入口的导入
 
-    img_latex_raw = ""
-    # 尝试 JSON；否则退回纯文本
-    try:
-        if "application/json" in (resp.headers.get("Content-Type") or ""):
-            data = resp.json()
-            if isinstance(data, dict):
-                cand = data.get("latex") or data.get("data") or data.get("result") or data.get("prediction")
-                if isinstance(cand, list):
-                    img_latex_raw = (cand[0] or "") if cand else ""
-                elif isinstance(cand, dict) and "latex" in cand:
-                    img_latex_raw = str(cand.get("latex") or "")
-                elif isinstance(cand, str):
-                    img_latex_raw = cand
-            elif isinstance(data, list):
-                if data and isinstance(data[0], str):
-                    img_latex_raw = data[0]
-                elif data and isinstance(data[0], dict) and "latex" in data[0]:
-                    img_latex_raw = str(data[0].get("latex") or "")
-        else:
-            img_latex_raw = resp.text.strip()
-    except Exception:
-        img_latex_raw = resp.text.strip()
+    img_latex_raw = await get_ocr_client().arecognize(image_path, LATEX_FIELDS)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _image_latex_compare, img_latex_raw, latex, assumptions)
 
+
+def _image_latex_compare(img_latex_raw: str, latex: str, assumptions: Dict[str, Any] | None) -> Dict[str, Any]:
     if not img_latex_raw:
         raise RuntimeError("OCR 服务未返回可用的 LaTeX 字符串")
 
@@ -165,51 +214,20 @@ def chem_image_similarity(image_path: str, text: str, type_: str) -> Dict[str, A
     通过 HTTP 请求远程 OCR 服务（同上），期望接口形如 GET {server_url}?path={image_path}。
     返回：{"image_text": str, "input_text": str, "type": type_, "result": {"equivalent": bool, "detail": {...}} }
     """
-    server_url = os.getenv("TEXTELLER_SERVER_URL")
-    if not server_url:
-        raise RuntimeError(
-            "TEXTELLER_SERVER_URL 未设置，请配置指向 OCR 服务的 HTTP 接口，例如 http://127.0.0.1:8502/predict"
-        )
+    ocr_text_raw = get_ocr_client().recognize(image_path, TEXT_FIELDS)
+    return _chem_image_compare(ocr_text_raw, text, type_)
 
-    try:
-        resp = requests.get(server_url, params={"path": image_path}, timeout=15)
-    except requests.RequestException as e:  # noqa: BLE001
-        raise RuntimeError(f"HTTP 请求 OCR 服务失败: {e}")
 
-    if resp.status_code != 200:
-        trunc = (resp.text or "")[:200]
-        raise RuntimeError(f"OCR 服务返回非 200 状态码: {resp.status_code}, 响应片段: {trunc}")
+async def achem_image_similarity(image_path: str, text: str, type_: str) -> Dict[str, Any]:
+    """chem_image_similarity 的 asyncio 版本：异步等待 OCR，比对放入默认执行器。"""
+    import asyncio  # 仅异步路径需要，避免拖慢同步入口的导入
+
+    ocr_text_raw = await get_ocr_client().arecognize(image_path, TEXT_FIELDS)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _chem_image_compare, ocr_text_raw, text, type_)
 
-    # 解析为纯文本优先；若为 JSON 则尝试常见字段
-    ocr_text_raw = ""
-    try:
-        if "application/json" in (resp.headers.get("Content-Type") or ""):
-            data = resp.json()
-            if isinstance(data, dict):
-                cand = data.get("text") or data.get("data") or data.get("result") or data.get("prediction") or data.get("latex")
-                if isinstance(cand, list):
-                    ocr_text_raw = (cand[0] or "") if cand else ""
-                elif isinstance(cand, dict):
-                    # 尝试常见键
-                    for k in ("text", "latex"):
-                        if k in cand:
-                            ocr_text_raw = str(cand.get(k) or "")
-                            break
-                elif isinstance(cand, str):
-                    ocr_text_raw = cand
-            elif isinstance(data, list):
-                if data and isinstance(data[0], str):
-                    ocr_text_raw = data[0]
-                elif data and isinstance(data[0], dict):
-                    for k in ("text", "latex"):
-                        if k in data[0]:
-                            ocr_text_raw = str(data[0].get(k) or "")
-                            break
-        else:
-            ocr_text_raw = resp.text.strip()
-    except Exception:
-        ocr_text_raw = resp.text.strip()
 
+def _chem_image_compare(ocr_text_raw: str, text: str, type_: str) -> Dict[str, Any]:
     if not ocr_text_raw:
         raise RuntimeError("OCR 服务未返回可用的化学文本")
 
@@ -247,7 +265,8 @@ def chem_image_similarity(image_path: str, text: str, type_: str) -> Dict[str, A
             "normalized_b": normalize_formula(input_text),
         }
     else:  # reaction
-        equiv = reactions_equivalent(image_text, input_text)
+        info = reaction_equivalence_info(image_text, input_text)
+        equiv = info["equivalent"]
         # 可选：给出配平信息，便于排查
         try:
             ra = balance_reaction_info(image_text)
@@ -260,8 +279,91 @@ def chem_image_similarity(image_path: str, text: str, type_: str) -> Dict[str, A
         detail = {
             "balance_a": ra,
             "balance_b": rb,
+            "balanced_as_written": {"a": info["a"]["balanced_as_written"], "b": info["b"]["balanced_as_written"]},
         }
 
     return {"image_text": image_text, "input_text": input_text, "type": kind, "result": {"equivalent": equiv, "detail": detail}}
 
 
+# 批量图片比对：OCR 并发扇出，结果按完成顺序逐条产出
+IMAGE_BATCH_TYPES = ("latex", "formula", "reaction")
+
+_batch_executor: "ThreadPoolExecutor | None" = None
+_batch_executor_lock = threading.Lock()
+
+
+def _get_batch_executor() -> "ThreadPoolExecutor":
+    # 批量比对专用的有界线程池（EQUALLAB_IMAGE_BATCH_WORKERS，缺省 min(4, CPU 数)），不挤占单张图片接口所用的默认执行器；
+    # 提前停止迭代时，尚在排队的比对随任务一起取消，只有已开始的至多 max_workers 个会执行完
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            workers = env_int("EQUALLAB_IMAGE_BATCH_WORKERS", min(4, os.cpu_count() or 1))
+            _batch_executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="equallab-batch")
+        return _batch_executor
+
+
+async def _image_batch_item(index: int, item: Dict[str, Any], sem: Any) -> Dict[str, Any]:
+    import asyncio
+
+    image_path = item.get("image_path")
+    kind = (item.get("type") or "latex").strip().lower()
+    out: Dict[str, Any] = {"index": index, "image_path": image_path, "type": kind}
+    try:
+        if kind not in IMAGE_BATCH_TYPES:
+            raise ValueError(f"type 必须为 {', '.join(IMAGE_BATCH_TYPES)} 之一")
+        if not image_path:
+            raise ValueError("缺少 image_path")
+        expected = item.get("expected") or ""
+        fields = LATEX_FIELDS if kind == "latex" else TEXT_FIELDS
+        # 信号量只限制同时进行的 OCR 请求；比对在批量专用线程池中排队，不占并发名额
+        async with sem:
+            raw = await get_ocr_client().arecognize(image_path, fields)
+        loop = asyncio.get_running_loop()
+        if kind == "latex":
+            result = await loop.run_in_executor(_get_batch_executor(), _image_latex_compare, raw, expected, item.get("assumptions"))
+        else:
+            result = await loop.run_in_executor(_get_batch_executor(), _chem_image_compare, raw, expected, kind)
+    except Exception as e:  # noqa: BLE001
+        out.update(ok=False, error=str(e))
+    else:
+        out.update(ok=True, result=result)
+    return out
+
+
+async def aimage_similarity_batch(items: List[Dict[str, Any]], concurrency: int | None = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    批量“图片识别 + 比对”：items 为 {"image_path", "expected", "type", "assumptions"?} 列表，
+    type ∈ {"latex", "formula", "reaction"}（缺省 latex，expected 为期望的 LaTeX 或化学文本）。
+    OCR 请求以 concurrency（缺省取 EQUALLAB_OCR_BATCH_CONCURRENCY，32）为上限并发发出，
+    每条结果在其 OCR 返回并比对完成后立即产出（按完成顺序，"index" 为其在 items 中的位置）：
+    成功为 {"index", "image_path", "type", "ok": True, "result": {...}}，失败为 {..., "ok": False, "error": str}，
+    单条失败不影响其它条目。比对在有界的专用线程池中进行（见 _get_batch_executor）；
+    提前停止迭代时未完成的 OCR 请求与排队中的比对会被取消。
+    """
+    import asyncio
+
+    concurrency = concurrency or env_int("EQUALLAB_OCR_BATCH_CONCURRENCY", 32)
+    sem = asyncio.Semaphore(max(1, concurrency))
+    tasks = [asyncio.ensure_future(_image_batch_item(i, item, sem)) for i, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def image_similarity_batch(items: List[Dict[str, Any]], concurrency: int | None = None) -> List[Dict[str, Any]]:
+    """aimage_similarity_batch 的同步版本：等待全部完成，按 items 顺序返回。不能在运行中的事件循环内调用。"""
+    import asyncio
+
+    async def _collect() -> List[Dict[str, Any]]:
+        results = [out async for out in aimage_similarity_batch(items, concurrency=concurrency)]
+        # asyncio.run 结束时关闭事件循环，先释放绑定在该循环上的 OCR 连接池
+        await get_ocr_client().aclose()
+        return results
+
+    return sorted(asyncio.run(_collect()), key=lambda r: r["index"])
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Tuple
+
+if TYPE_CHECKING:
+    import sympy as sp
+
+
+def canonicalize(expr: sp.Basic) -> Tuple[sp.Basic, Dict[sp.Symbol, sp.Symbol]]:
+    """
+    α-换名：按先序遍历中首次出现的顺序，将自由符号依次换名为 _v0, _v1, ...（保留假设），
+    使 x^2+1 与 t^2+1 得到同一规范形。返回 (规范形, 逆映射)。
+    """
+    free = expr.free_symbols
+    if not free:
+        return expr, {}
+    import sympy as sp
+
+    order = []
+    seen = set()
+    for node in sp.preorder_traversal(expr):
+        if isinstance(node, sp.Symbol) and node in free and node not in seen:
+            seen.add(node)
+            order.append(node)
+    forward = {s: sp.Symbol(f"_v{i}", **s.assumptions0) for i, s in enumerate(order)}
+    back = {v: k for k, v in forward.items()}
+    return expr.xreplace(forward), back
+
+
+def _approx_size(obj: Any) -> int:
+    try:
+        return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:  # noqa: BLE001
+        return sys.getsizeof(obj)
+
+
+class CanonicalCache:
+    """
+    进程级 LRU 缓存：同时受条目数（max_items）与近似字节数（max_bytes，按 pickle 长度估算）约束，
+    记录 hits/misses/evictions。线程安全。max_items=0 表示关闭缓存。
+    """
+
+    def __init__(self, max_items: int = 4096, max_bytes: int = 64 * 1024 * 1024):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, item[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_items <= 0:
+            return
+        size = _approx_size(key) + _approx_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._data and (len(self._data) > self.max_items or self._bytes > self.max_bytes):
+            _key, (_value, size) = self._data.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def configure(self, max_items: int | None = None, max_bytes: int | None = None) -> None:
+        with self._lock:
+            if max_items is not None:
+                self.max_items = max_items
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "items": len(self._data),
+                "bytes": self._bytes,
+                "max_items": self.max_items,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def env_int(name: str, default: int) -> int:
+    """读取整数环境变量；未设置或无法解析时返回 default。"""
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+_cache = CanonicalCache(
+    max_items=env_int("EQUALLAB_CACHE_MAX_ITEMS", 4096),
+    max_bytes=env_int("EQUALLAB_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+)
+
+
+def get_cache() -> CanonicalCache:
+    return _cache
+
+
+def cached_value(namespace: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+    """普通记忆化：按 (namespace, key) 查找，未命中则 compute() 并写入。"""
+    hit, value = _cache.get((namespace, key))
+    if hit:
+        return value
+    value = compute()
+    _cache.put((namespace, key), value)
+    return value
+
+
+def cached_transform(namespace: str, expr: sp.Basic, fn: Callable[[sp.Basic], sp.Basic]) -> sp.Basic:
+    """
+    对与符号名无关的变换（simplify 等）做 α-换名记忆化：在规范形上计算并缓存，
+    返回时换回调用方的符号。fn 抛出的异常（含超时）不会被缓存。
+    """
+    canon, back = canonicalize(expr)
+    value = cached_value(namespace, canon, lambda: fn(canon))
+    return value.xreplace(back) if back else value
@@ -1,14 +1,31 @@
-from .formula import parse_formula, normalize_formula, formulas_equivalent
-from .reaction import parse_reaction, balance_reaction, balance_reaction_info, reactions_equivalent
+from .elements import ATOMIC_WEIGHTS
+from .formula import parse_formula, normalize_formula, formulas_equivalent, composition_matrix, molar_masses, formula_batch
+from .similarity import composition_score, formula_similarity, formula_similarity_info
+from .index import FormulaIndex, composition_hash
+from .balance import BalanceError, balance_matrix
+from .reaction import parse_reaction, balance_reaction, balance_reaction_info, balance_cache_stats, reactions_equivalent, reaction_equivalence_info
 
 __all__ = [
     "parse_formula",
     "normalize_formula",
     "formulas_equivalent",
+    "composition_matrix",
+    "molar_masses",
+    "formula_batch",
+    "ATOMIC_WEIGHTS",
+    "composition_score",
+    "formula_similarity",
+    "formula_similarity_info",
+    "FormulaIndex",
+    "composition_hash",
+    "BalanceError",
+    "balance_matrix",
     "parse_reaction",
     "balance_reaction",
     "balance_reaction_info",
+    "balance_cache_stats",
     "reactions_equivalent",
+    "reaction_equivalence_info",
 ]
 
 
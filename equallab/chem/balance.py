@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from math import gcd
+from typing import List, Sequence, Tuple
+
+
+class BalanceError(ValueError):
+    """
+    无法给出唯一配平：kind="underdetermined" 表示存在多组线性无关的配平（由若干独立反应叠加而成），
+    kind="infeasible" 表示不存在全为正整数的配平（元素不守恒或某物种系数只能为 0/负）。
+    """
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+def _bareiss(M: List[List[int]]) -> Tuple[List[List[int]], List[int]]:
+    """
+    Bareiss 无分式消元（原地）：化为行阶梯形，返回 (M, 主元列)。
+    每步对上一主元做整除，消元过程中所有元素均为原矩阵子式，全程只用 Python 整数。
+    """
+    m = len(M)
+    n = len(M[0]) if m else 0
+    prev = 1
+    pivots: List[int] = []
+    r = 0
+    for c in range(n):
+        if r == m:
+            break
+        p = next((i for i in range(r, m) if M[i][c]), None)
+        if p is None:
+            continue
+        M[r], M[p] = M[p], M[r]
+        piv, row = M[r][c], M[r]
+        for i in range(r + 1, m):
+            ri = M[i]
+            f = ri[c]
+            for k in range(c + 1, n):
+                ri[k] = (piv * ri[k] - f * row[k]) // prev
+            ri[c] = 0
+        prev = piv
+        pivots.append(c)
+        r += 1
+    return M, pivots
+
+
+def _kernel_vector(U: List[List[int]], pivots: List[int], free: int, n: int) -> List[int]:
+    """一维零空间的整数基向量：令自由变量为 1 自下而上回代，不能整除时整体放大，最后除去公因子。"""
+    x = [0] * n
+    x[free] = 1
+    for i in reversed(range(len(pivots))):
+        row, c = U[i], pivots[i]
+        s = sum(row[k] * x[k] for k in range(c + 1, n) if x[k])
+        a = row[c]
+        scale = abs(a) // gcd(s, a)
+        if scale != 1:
+            x = [v * scale for v in x]
+            s *= scale
+        x[c] = -s // a
+    g = 0
+    for v in x:
+        g = gcd(g, v)
+    return [v // g for v in x]
+
+
+def balance_matrix(A: Sequence[Sequence[int]], n_reactants: int) -> List[int]:
+    """
+    给定组成矩阵 A（元素 × 物种，前 n_reactants 列为反应物，见 composition_matrix），
+    返回使各元素守恒的最小正整数系数（按物种顺序）。
+    零空间维数为 0 或唯一解含零/负系数时抛出 BalanceError("infeasible")，维数大于 1 时抛出 BalanceError("underdetermined")。
+    """
+    M = [[int(v) if j < n_reactants else -int(v) for j, v in enumerate(row)] for row in A]
+    n = len(M[0]) if M else 0
+    if not n:
+        raise BalanceError("infeasible", "no species to balance")
+    U, pivots = _bareiss(M)
+    free = [c for c in range(n) if c not in set(pivots)]
+    if not free:
+        raise BalanceError("infeasible", "only the trivial solution exists (elements are not conserved)")
+    if len(free) > 1:
+        raise BalanceError(
+            "underdetermined",
+            f"{len(free)} independent balancings exist; the reaction is a combination of several reactions",
+        )
+    x = _kernel_vector(U, pivots, free[0], n)
+    if x[0] < 0:
+        x = [-v for v in x]
+    if any(v <= 0 for v in x):
+        raise BalanceError("infeasible", "no balancing with all coefficients positive")
+    return x
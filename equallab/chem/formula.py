@@ -2,10 +2,27 @@ from __future__ import annotations
 
 import re
 from collections import defaultdict
-from typing import Dict, List
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Sequence, Tuple
 
+from .elements import ATOMIC_WEIGHTS
 
-_TOKEN = re.compile(r"([A-Z][a-z]?)(\d*)|\(|\)|\[|\]|\{|\}")
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# 元素(+计数) / 括号 / 括号后的整组倍数
+_TOKEN = re.compile(r"([A-Z][a-z]?)(\d*)|\(|\)|\[|\]|\{|\}|\d+")
+_SPACES = re.compile(r"\s+")
+# 末尾标记：相态 / 花括号电荷 ^{2-} / 电荷 ^2-、^+ / 裸 +、-
+_TRAILING = (
+    re.compile(r"(\(s\)|\(l\)|\(g\)|\(aq\))$"),
+    re.compile(r"\^\{[^}]*\}$"),
+    re.compile(r"\^[+\-]?\d*$"),
+    re.compile(r"[+\-]+$"),
+)
+_HYDRATE_SEP = re.compile(r"[·•.]")
+_LEADING_MULT = re.compile(r"^(\d+)\s*(.*)$")
 
 
 def _merge_counts(a: Dict[str, int], b: Dict[str, int], k: int = 1) -> None:
@@ -18,25 +35,13 @@ def _strip_trailing_annotations(s: str) -> str:
     去除末尾相态与电荷标记：(s)/(l)/(g)/(aq)、^2-、^{2+}、+、- 等；同时移除空格。
     仅处理末尾，避免破坏像 (OH)2 的结构。
     """
-    s = s.strip()
-    s = re.sub(r"\s+", "", s)
+    s = _SPACES.sub("", s.strip())
     changed = True
     while changed and s:
         changed = False
-        # 相态
-        if re.search(r"(\(s\)|\(l\)|\(g\)|\(aq\))$", s):
-            s = re.sub(r"(\(s\)|\(l\)|\(g\)|\(aq\))$", "", s)
-            changed = True
-        # 电荷 ^{...} 或 ^... 或 末尾 +/-
-        if re.search(r"\^\{[^}]*\}$", s):
-            s = re.sub(r"\^\{[^}]*\}$", "", s)
-            changed = True
-        if re.search(r"\^[+\-]?\d*$", s):
-            s = re.sub(r"\^[+\-]?\d*$", "", s)
-            changed = True
-        if re.search(r"[+\-]+$", s):
-            s = re.sub(r"[+\-]+$", "", s)
-            changed = True
+        for pattern in _TRAILING:
+            s, n = pattern.subn("", s, count=1)
+            changed = changed or n > 0
     return s
 
 
@@ -76,25 +81,23 @@ def _parse_core(formula: str) -> Dict[str, int]:
     return dict(out)
 
 
-def parse_formula(s: str) -> Dict[str, int]:
-    """
-    解析化学式为元素计数字典：
-    - 支持括号与嵌套：Ca(OH)2、K4[ON(SO3)2]2
-    - 支持水合点/配位点：CuSO4·5H2O、Na2CO3.10H2O（分隔符 '·'/'•'/'.'）
-    - 支持前置整体系数：2H2O（等价于 (H2O)2）
-    - 忽略末尾相态与电荷：Fe(s)、SO4^{2-}、Fe3+、Cl-
-    """
+@lru_cache(maxsize=4096)
+def _parse_cached(s: str) -> Tuple[Tuple[str, int], ...]:
+    # 记忆化的解析结果以不可变元组保存，调用方拿到的是各自的 dict 副本
+    return tuple(_parse_uncached(s).items())
+
+
+def _parse_uncached(s: str) -> Dict[str, int]:
     s = _strip_trailing_annotations(s)
     if not s:
         return {}
 
-    parts: List[str] = re.split(r"[·•.]", s)
-    parts = [p for p in parts if p]
+    parts: List[str] = [p for p in _HYDRATE_SEP.split(s) if p]
 
     total: Dict[str, int] = defaultdict(int)
     for part in parts:
         part = _strip_trailing_annotations(part)
-        m = re.match(r"^(\d+)\s*(.*)$", part)
+        m = _LEADING_MULT.match(part)
         if m:
             mul = int(m.group(1))
             core = m.group(2)
@@ -109,6 +112,42 @@ def parse_formula(s: str) -> Dict[str, int]:
     return dict(total)
 
 
+def parse_formula(s: str) -> Dict[str, int]:
+    """
+    解析化学式为元素计数字典：
+    - 支持括号与嵌套：Ca(OH)2、K4[ON(SO3)2]2
+    - 支持水合点/配位点：CuSO4·5H2O、Na2CO3.10H2O（分隔符 '·'/'•'/'.'）
+    - 支持前置整体系数：2H2O（等价于 (H2O)2）
+    - 忽略末尾相态与电荷：Fe(s)、SO4^{2-}、Fe3+、Cl-
+    同一字符串只解析一次（进程内 LRU），返回值可自由修改。
+    """
+    return dict(_parse_cached(s))
+
+
+def composition_matrix(species: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+    """
+    组成矩阵：每个物种只解析一次，返回 (A, elements)。
+    A 为 int64 矩阵，形状 (len(elements), len(species))，A[i, j] 为 species[j] 中 elements[i] 的原子数；
+    elements 按字母序排列。
+    """
+    import numpy as np
+
+    rows, elements = _composition_rows(species)
+    return np.array(rows, dtype=np.int64).reshape(len(elements), len(species)), elements
+
+
+def _composition_rows(species: Sequence[str]) -> Tuple[List[List[int]], List[str]]:
+    """composition_matrix 的纯 Python 版本（嵌套列表），供整数配平等不需要 NumPy 的路径使用。"""
+    comps = [_parse_cached(s) for s in species]
+    elements = sorted({el for comp in comps for el, _ in comp})
+    index = {el: i for i, el in enumerate(elements)}
+    rows = [[0] * len(comps) for _ in elements]
+    for j, comp in enumerate(comps):
+        for el, c in comp:
+            rows[index[el]][j] = c
+    return rows, elements
+
+
 def normalize_formula(s: str) -> Dict[str, int]:
     return parse_formula(s)
 
@@ -117,3 +156,77 @@ def formulas_equivalent(a: str, b: str) -> bool:
     return normalize_formula(a) == normalize_formula(b)
 
 
+def molar_masses(species: Sequence[str]) -> np.ndarray:
+    """
+    各物种的摩尔质量（g/mol，float64 数组）：原子量向量与组成矩阵一次矩阵-向量乘积得到。
+    含元素表中没有的元素时对应位置为 NaN。
+    """
+    import numpy as np
+
+    A, elements = composition_matrix(species)
+    weights, known = _weight_vector(elements)
+    masses = weights @ A
+    masses[(~known) @ (A != 0)] = np.nan
+    return masses
+
+
+def _weight_vector(elements: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """按 elements 顺序的原子量向量与“已知元素”掩码；未知元素的权重置 0（NaN * 0 仍为 NaN，会污染其它物种）。"""
+    import numpy as np
+
+    known = np.array([el in ATOMIC_WEIGHTS for el in elements], dtype=bool)
+    weights = np.array([ATOMIC_WEIGHTS.get(el, 0.0) for el in elements], dtype=np.float64)
+    return weights, known
+
+
+def formula_batch(formulas: Sequence[str], pairs: Iterable[Tuple[str, str]] | None = None) -> Dict[str, Any]:
+    """
+    批量处理化学式：每个不同的字符串只解析一次，组成矩阵一次构建，摩尔质量为一次矩阵-向量乘积，
+    成对等价为组成矩阵列之间的数组比较（pairs 中的化学式可不在 formulas 内）。
+    返回 {"items": [{"formula", "composition", "molar_mass", ...}], "pairs": [{"a", "b", "equivalent"}]}：
+    解析失败的条目带 "error"，其 composition/molar_mass 为 None，涉及它的 pair 的 equivalent 为 None；
+    含未知元素时 molar_mass 为 None 并给出 "unknown_elements"。
+    """
+    import numpy as np
+
+    pairs = list(pairs or ())
+    unique = list(dict.fromkeys([*formulas, *(f for pair in pairs for f in pair)]))
+    errors: Dict[str, str] = {}
+    ok: List[str] = []
+    for f in unique:
+        try:
+            _parse_cached(f)
+        except ValueError as e:
+            errors[f] = str(e)
+        else:
+            ok.append(f)
+    column = {f: j for j, f in enumerate(ok)}
+
+    A, elements = composition_matrix(ok)
+    weights, known = _weight_vector(elements)
+    masses = weights @ A
+    unknown_rows = np.flatnonzero(~known)
+    has_unknown = (A[unknown_rows] != 0).any(axis=0)
+
+    items = []
+    for f in formulas:
+        if f in errors:
+            items.append({"formula": f, "composition": None, "molar_mass": None, "error": errors[f]})
+            continue
+        j = column[f]
+        item: Dict[str, Any] = {"formula": f, "composition": dict(_parse_cached(f)), "molar_mass": None}
+        if has_unknown[j]:
+            item["unknown_elements"] = [elements[i] for i in unknown_rows if A[i, j]]
+        else:
+            item["molar_mass"] = float(masses[j])
+        items.append(item)
+
+    valid = [(a, b) for a, b in pairs if a in column and b in column]
+    ia = np.array([column[a] for a, _ in valid], dtype=np.intp)
+    ib = np.array([column[b] for _, b in valid], dtype=np.intp)
+    same = iter(np.all(A[:, ia] == A[:, ib], axis=0).tolist())
+    out_pairs = [
+        {"a": a, "b": b, "equivalent": next(same) if a in column and b in column else None}
+        for a, b in pairs
+    ]
+    return {"items": items, "pairs": out_pairs}
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Set, Tuple
+
+import hashlib
+import json
+import threading
+
+from .formula import parse_formula
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+Composition = Tuple[Tuple[str, int], ...]
+
+
+def _composition(formula: str) -> Composition:
+    return tuple(sorted((el, c) for el, c in parse_formula(formula).items() if c))
+
+
+def _hash(comp: Composition) -> str:
+    return hashlib.blake2b("".join(f"{el}{c}" for el, c in comp).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def composition_hash(formula: str) -> str:
+    """组成的稳定哈希（元素按字母序拼接后取 blake2b），组成相同的化学式哈希相同，可跨进程持久化。"""
+    return _hash(_composition(formula))
+
+
+class FormulaIndex:
+    """
+    参考化合物库的近邻索引：
+    - 每条化学式存为元素计数向量，全部条目组成 CSR 稀疏矩阵（行 = 条目，列 = 元素），行向量预先单位化
+    - query 一次稀疏矩阵-向量乘积得到全部余弦，乘以总原子数之比（见 composition_score），argpartition 取 top-k
+    - lookup 按组成哈希精确查找组成完全相同的条目
+    增删只更新字典，矩阵在下一次 query 时重建；批量导入请用 add_many。
+    """
+
+    def __init__(self):
+        self._formulas: Dict[str, str] = {}
+        self._comps: Dict[str, Composition] = {}
+        self._by_hash: Dict[str, Set[str]] = defaultdict(set)
+        self._hashes: Dict[str, str] = {}
+        self._matrix = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._formulas)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._formulas
+
+    def add(self, key: str, formula: str) -> None:
+        self.add_many([(key, formula)])
+
+    def add_many(self, entries: Iterable[Tuple[str, str]]) -> int:
+        """批量添加 (key, formula)；先全部解析，任一失败则整体不写入（抛出 ValueError）。返回添加条数。"""
+        parsed = [(key, formula, _composition(formula)) for key, formula in entries]
+        with self._lock:
+            for key, formula, comp in parsed:
+                h = _hash(comp)
+                if key in self._formulas:
+                    self.remove(key)
+                self._formulas[key] = formula
+                self._comps[key] = comp
+                self._hashes[key] = h
+                self._by_hash[h].add(key)
+            if parsed:
+                self._matrix = None
+        return len(parsed)
+
+    def remove(self, key: str) -> bool:
+        with self._lock:
+            if self._formulas.pop(key, None) is None:
+                return False
+            self._comps.pop(key)
+            h = self._hashes.pop(key)
+            bucket = self._by_hash[h]
+            bucket.discard(key)
+            if not bucket:
+                del self._by_hash[h]
+            self._matrix = None
+            return True
+
+    def get(self, key: str) -> str | None:
+        return self._formulas.get(key)
+
+    def lookup(self, formula: str) -> List[str]:
+        """组成与 formula 完全相同的条目 key（按字典序）。"""
+        h = composition_hash(formula)
+        with self._lock:
+            return sorted(self._by_hash.get(h, ()))
+
+    def _build(self) -> Tuple[List[str], Dict[str, int], Dict[str, int], "np.ndarray", "np.ndarray", object]:
+        # (keys, key -> 行号, 元素 -> 列号, 行总原子数, 各行 key 的字典序名次, 行单位化后的 CSR 矩阵)
+        import numpy as np
+        from scipy import sparse
+
+        keys = list(self._comps)
+        columns: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        data: List[int] = []
+        for key in keys:
+            for el, c in self._comps[key]:
+                indices.append(columns.setdefault(el, len(columns)))
+                data.append(c)
+            indptr.append(len(indices))
+        X = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(keys), len(columns)),
+        )
+        norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        totals = np.asarray(X.sum(axis=1)).ravel()
+        scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        rows = {key: i for i, key in enumerate(keys)}
+        key_rank = np.empty(len(keys), dtype=np.int64)
+        key_rank[sorted(range(len(keys)), key=keys.__getitem__)] = np.arange(len(keys))
+        return keys, rows, columns, totals, key_rank, sparse.diags(scale) @ X
+
+    def query(self, formula: str, k: int = 10) -> List[Tuple[str, float]]:
+        """返回 [(key, 相似度)]，按相似度降序（同分按 key），至多 k 个；相似度与 composition_score 的 score 一致。"""
+        import numpy as np
+
+        comp = dict(_composition(formula))
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = self._build()
+            keys, rows, columns, totals, key_rank, X = self._matrix
+            exact = list(self._by_hash.get(_hash(tuple(comp.items())), ()))
+        if not keys or k <= 0:
+            return []
+        q = np.zeros(len(columns), dtype=np.float64)
+        for el, c in comp.items():
+            if el in columns:
+                q[columns[el]] = c
+        q_norm = np.sqrt(sum(c * c for c in comp.values()))
+        q_total = sum(comp.values())
+        if q_norm:
+            cosine = np.minimum(X @ q / q_norm, 1.0)
+            size_ratio = np.minimum(totals, q_total) / np.maximum(totals, q_total)
+            scores = cosine * size_ratio
+        else:
+            # 空组成只与空组成相同（由下面的哈希命中置 1）
+            scores = np.zeros(len(keys), dtype=np.float64)
+        # 浮点舍入会让组成完全相同的条目得到 0.999...；按哈希命中的条目记为恰好 1
+        scores[[rows[key] for key in exact]] = 1.0
+        n = len(keys)
+        if k < n:
+            # 第 k 名的分数；高于它的全部入选，与它同分的按 key 字典序补足 k 个（并列可能覆盖大半个库，不逐个排序）
+            kth = np.partition(scores, n - k)[n - k]
+            above = np.flatnonzero(scores > kth)
+            ties = np.flatnonzero(scores == kth)
+            need = k - above.size
+            if need < ties.size:
+                ties = ties[np.argpartition(key_rank[ties], need - 1)[:need]]
+            top = np.concatenate([above, ties])
+        else:
+            top = np.arange(n)
+        # 按 (分数降序, key) 排序，只为最终的 k 个条目构造 Python 元组
+        top = top[np.lexsort((key_rank[top], -scores[top]))]
+        return [(keys[i], float(scores[i])) for i in top]
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            data = {"entries": dict(self._formulas)}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "FormulaIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls()
+        index.add_many(data.get("entries", {}).items())
+        return index
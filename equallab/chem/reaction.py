@@ -1,18 +1,35 @@
 from __future__ import annotations
 
+from collections import defaultdict
+from fractions import Fraction
+from functools import lru_cache
+from math import gcd, lcm
 from typing import Dict, List, Tuple
+import os
 import re
-import sympy as sp
-from .formula import parse_formula
-try:
-    from chempy import balance_stoichiometry  # type: ignore
-    _HAS_CHEMPY = True
-except Exception:  # noqa: BLE001
-    _HAS_CHEMPY = False
+from equallab.cache import CanonicalCache, env_int
+from .balance import BalanceError, balance_matrix
+from .formula import _composition_rows, parse_formula
 
 
 # 模块级：去除物种前置系数（整数/分数/小数）的正则
-_COEF_PREFIX_PATTERN = r"^\s*(?:\d+(?:/\d+)?|\d*\.\d+)\s*"
+_COEF_PREFIX_PATTERN = r"^\s*(\d*\.\d+|\d+(?:/\d+)?)\s*"
+_COEF_PREFIX = re.compile(_COEF_PREFIX_PATTERN)
+_INT_PREFIX = re.compile(r"^(\d+)\s*(.*)$")
+_PLUS = re.compile(r"\+")
+
+BALANCERS = ("integer", "chempy")
+
+# 配平缓存：规范组成 -> 系数（或 BalanceError），独立于表达式缓存，单独统计命中率
+_balance_cache = CanonicalCache(
+    max_items=env_int("EQUALLAB_BALANCE_CACHE_MAX_ITEMS", 1024),
+    max_bytes=env_int("EQUALLAB_BALANCE_CACHE_MAX_BYTES", 8 * 1024 * 1024),
+)
+
+
+def _strip_coef(x: str) -> str:
+    # 去除前置系数：整数/小数/分数，如 '2H2O'、'0.5 O2'、'1/2 O2'
+    return _COEF_PREFIX.sub("", x)
 
 
 def _split_reaction(s: str) -> Tuple[List[str], List[str]]:
@@ -31,74 +48,97 @@ def _split_reaction(s: str) -> Tuple[List[str], List[str]]:
         # 默认尝试 '->'
         arrow = '->'
     left, right = [p.strip() for p in s.split(arrow, 1)]
-    reag = [p.strip() for p in re.split(r"\+", left) if p.strip()]
-    prod = [p.strip() for p in re.split(r"\+", right) if p.strip()]
+    reag = [p.strip() for p in _PLUS.split(left) if p.strip()]
+    prod = [p.strip() for p in _PLUS.split(right) if p.strip()]
     return reag, prod
 
 
 def parse_reaction(s: str) -> Tuple[List[Tuple[int, Dict[str,int]]], List[Tuple[int, Dict[str,int]]]]:
     reag, prod = _split_reaction(s)
     def parse_term(term: str) -> Tuple[int, Dict[str,int]]:
-        m = re.match(r"^(\d+)\s*(.*)$", term)
+        m = _INT_PREFIX.match(term)
         coef = int(m.group(1)) if m else 1
         formula = m.group(2) if m else term
         return coef, parse_formula(formula)
     return [parse_term(t) for t in reag], [parse_term(t) for t in prod]
 
 
-def balance_reaction_info(s: str) -> Tuple[List[int], List[int], List[str], List[str], str]:
-    """返回 (reactant_coeffs, product_coeffs, reactants, products, method)
-    method ∈ {"chempy", "sympy"}
-    """
-    reag, prod = _split_reaction(s)
+@lru_cache(maxsize=4096)
+def _composition_key(formula: str) -> Tuple[Tuple[str, int], ...]:
+    return tuple(sorted(parse_formula(formula).items()))
+
+
+@lru_cache(maxsize=1)
+def _chempy_balancer():
+    # chempy 连带导入 SciPy/SymPy，仅在选择 chempy 配平时加载
+    try:
+        from chempy import balance_stoichiometry  # type: ignore
+    except Exception:  # noqa: BLE001
+        return None
+    return balance_stoichiometry
 
-    # Prefer chempy if available
-    if _HAS_CHEMPY:
-        def strip_coef(x: str) -> str:
-            # 去除前置系数：整数/小数/分数，如 '2H2O'、'0.5 O2'、'1/2 O2'
-            return re.sub(r"^\s*(?:\d+(?:/\d+)?|\d*\.\d+)\s*", "", x)
-        reag_clean = [strip_coef(x) for x in reag]
-        prod_clean = [strip_coef(x) for x in prod]
+
+def _balance(reag: List[str], prod: List[str], method: str) -> Tuple[List[int], List[int], str]:
+    balance_stoichiometry = _chempy_balancer() if method == "chempy" else None
+    if balance_stoichiometry is not None:
         try:
-            R, P = balance_stoichiometry(set(reag_clean), set(prod_clean))
-            reag_coef = [int(R.get(spc, 0)) for spc in reag_clean]
-            prod_coef = [int(P.get(spc, 0)) for spc in prod_clean]
+            R, P = balance_stoichiometry(set(reag), set(prod))
+            reag_coef = [int(R.get(spc, 0)) for spc in reag]
+            prod_coef = [int(P.get(spc, 0)) for spc in prod]
             # ensure nonzero
             if not any(c == 0 for c in reag_coef + prod_coef):
-                return reag_coef, prod_coef, reag_clean, prod_clean, "chempy"
+                return reag_coef, prod_coef, "chempy"
         except Exception:
-            # fallback to sympy method
+            # fallback to integer method
             pass
 
-    # Fallback: SymPy nullspace method
-    species = reag + prod
-    # 去除前置系数：整数/分数/小数
-    elems: List[str] = sorted({el for spc in species for el in parse_formula(re.sub(_COEF_PREFIX_PATTERN, "", spc)).keys()})
-
-    rows = []
-    for el in elems:
-        row = []
-        for spc in reag:
-            f = parse_formula(re.sub(_COEF_PREFIX_PATTERN, "", spc))
-            row.append(f.get(el, 0))
-        for spc in prod:
-            f = parse_formula(re.sub(_COEF_PREFIX_PATTERN, "", spc))
-            row.append(-f.get(el, 0))
-        rows.append(row)
-
-    A = sp.Matrix(rows)
-    null = A.nullspace()
-    if not null:
-        raise ValueError("no balancing solution")
-    v = null[0]
-    lcm = sp.ilcm(*[sp.denom(c) for c in v]) if any(sp.denom(c) != 1 for c in v) else 1
-    coeffs = [int(sp.together(c*lcm)) for c in v]
-    if all(c <= 0 for c in coeffs):
-        coeffs = [-c for c in coeffs]
-
-    reag_coef = coeffs[:len(reag)]
-    prod_coef = coeffs[len(reag):]
-    return reag_coef, prod_coef, reag, prod, "sympy"
+    # 整数配平：每个物种只解析一次
+    rows, _elems = _composition_rows(reag + prod)
+    coeffs = balance_matrix(rows, len(reag))
+    return coeffs[:len(reag)], coeffs[len(reag):], "integer"
+
+
+def balance_reaction_info(s: str, method: str | None = None) -> Tuple[List[int], List[int], List[str], List[str], str]:
+    """返回 (reactant_coeffs, product_coeffs, reactants, products, method)
+    method ∈ {"integer", "chempy"}；缺省取环境变量 EQUALLAB_BALANCER，未设置时为 "integer"
+    （内置整数无分式消元，见 balance.balance_matrix）。选择 "chempy" 时若 chempy 不可用或失败则退回 "integer"。
+    无法唯一配平时抛出 BalanceError（ValueError 子类，kind 为 underdetermined / infeasible）。
+
+    配平结果（含 BalanceError）按反应的规范组成缓存：两侧各自为物种元素组成的有序集合，
+    与书写顺序、前置系数及同组成的不同写法无关；命中时按调用方的物种顺序取回系数。
+    同一侧存在组成相同的物种时无法唯一对应，不走缓存。
+    """
+    method = method or os.getenv("EQUALLAB_BALANCER", "integer")
+    if method not in BALANCERS:
+        raise ValueError(f"unknown balancer: {method}")
+    reag, prod = _split_reaction(s)
+    reag_clean = [_strip_coef(x) for x in reag]
+    prod_clean = [_strip_coef(x) for x in prod]
+
+    rkeys = [_composition_key(x) for x in reag_clean]
+    pkeys = [_composition_key(x) for x in prod_clean]
+    if len(set(rkeys)) < len(rkeys) or len(set(pkeys)) < len(pkeys):
+        rc, pc, used = _balance(reag_clean, prod_clean, method)
+        return rc, pc, reag_clean, prod_clean, used
+
+    key = (method, tuple(sorted(rkeys)), tuple(sorted(pkeys)))
+    hit, value = _balance_cache.get(key)
+    if not hit:
+        try:
+            rc, pc, used = _balance(reag_clean, prod_clean, method)
+            value = (dict(zip(rkeys, rc)), dict(zip(pkeys, pc)), used)
+        except BalanceError as e:
+            value = e
+        _balance_cache.put(key, value)
+    if isinstance(value, BalanceError):
+        raise BalanceError(value.kind, str(value))
+    rmap, pmap, used = value
+    return [rmap[k] for k in rkeys], [pmap[k] for k in pkeys], reag_clean, prod_clean, used
+
+
+def balance_cache_stats() -> Dict[str, int]:
+    """配平缓存的条目数与命中统计（同 CanonicalCache.stats）。"""
+    return _balance_cache.stats()
 
 
 def balance_reaction(s: str) -> Tuple[List[int], List[int], List[str], List[str]]:
@@ -106,19 +146,86 @@ def balance_reaction(s: str) -> Tuple[List[int], List[int], List[str], List[str]
     return rc, pc, r, p
 
 
-def reactions_equivalent(a: str, b: str) -> bool:
-    ar, ap, areag, aprod = balance_reaction(a)
-    br, bp, breag, bprod = balance_reaction(b)
-    # normalize to species dictionary with coefficients
-    def norm_map(reag, coef_reag, prod, coef_prod):
-        from collections import Counter
-        def key(x):
-            return re.sub(_COEF_PREFIX_PATTERN, "", x)
-        m = Counter()
-        for s, c in zip(reag, coef_reag): m[key(s)] += c
-        for s, c in zip(prod, coef_prod): m[key(s)] -= c
-        return dict(m)
+def _split_coef(term: str) -> Tuple[Tuple[int, int], str]:
+    """拆出前置系数（整数/分数/小数，精确表示为 (分子, 分母)，缺省为 1）与化学式。"""
+    m = _COEF_PREFIX.match(term)
+    if not m:
+        return (1, 1), term
+    text = m.group(1)
+    if text.isdigit():
+        return (int(text), 1), term[m.end():]
+    try:
+        f = Fraction(text)
+    except ZeroDivisionError:
+        raise ValueError(f"invalid coefficient: {text}") from None
+    return (f.numerator, f.denominator), term[m.end():]
+
+
+def _primitive(vec: Dict[tuple, int]) -> Dict[tuple, int]:
+    """去零项后除以最大公约数（保留方向），两反应成比例当且仅当结果相同。"""
+    g = 0
+    for v in vec.values():
+        g = gcd(g, v)
+    return {k: v // g for k, v in vec.items() if v} if g else {}
+
+
+def _formula_of(key: Tuple[Tuple[str, int], ...]) -> str:
+    return "".join(f"{el}{n if n != 1 else ''}" for el, n in key)
+
 
-    return norm_map(areag, ar, aprod, ap) == norm_map(breag, br, bprod, bp)
+def _stoichiometry(s: str) -> Tuple[Dict[tuple, int], bool, str]:
+    """
+    反应的带符号化学计量向量（规范组成 -> 系数，反应物为正、产物为负，化为互素整数）。
+    分数/小数系数先统一乘以分母的最小公倍数，之后全为整数运算。
+    按书写系数（缺省为 1）已元素守恒时直接使用，不做配平；否则调用 balance_reaction_info。
+    返回 (向量, 是否按书写已配平, 来源：written / integer / chempy)。
+    """
+    reag, prod = _split_reaction(s)
+    terms = []
+    for side, sign in ((reag, 1), (prod, -1)):
+        for term in side:
+            (num, den), formula = _split_coef(term)
+            terms.append((sign * num, den, _composition_key(formula)))
+    scale = lcm(*(den for _, den, _ in terms))
+    vec: Dict[tuple, int] = defaultdict(int)
+    totals: Dict[str, int] = defaultdict(int)
+    for num, den, key in terms:
+        c = num * (scale // den)
+        vec[key] += c
+        for el, n in key:
+            totals[el] += c * n
+    if not any(totals.values()):
+        return _primitive(vec), True, "written"
+
+    rc, pc, reag_clean, prod_clean, method = balance_reaction_info(s)
+    vec = defaultdict(int)
+    for species, coefs, sign in ((reag_clean, rc, 1), (prod_clean, pc, -1)):
+        for formula, c in zip(species, coefs):
+            vec[_composition_key(formula)] += sign * c
+    return _primitive(vec), False, method
+
+
+def reaction_equivalence_info(a: str, b: str) -> Dict[str, object]:
+    """
+    比较两个反应：两侧物种按元素组成归一（H2O 与 OH2 视为同一物种），
+    各自的化学计量向量成正比（比例为正，即方向相同）即等价；比较全程为精确整数运算。
+    已按书写配平的反应不做配平，仅缺系数/未配平时才配平（无法唯一配平时抛出 BalanceError）。
+    返回 {"equivalent": bool, "a": {...}, "b": {...}}，每侧含 balanced_as_written、source 与
+    stoichiometry（规范化学式 -> 互素整数系数，产物为负）。
+    """
+    va, wa, sa = _stoichiometry(a)
+    vb, wb, sb = _stoichiometry(b)
+
+    def side(vec: Dict[tuple, int], written: bool, source: str) -> Dict[str, object]:
+        return {
+            "balanced_as_written": written,
+            "source": source,
+            "stoichiometry": {_formula_of(k): v for k, v in sorted(vec.items())},
+        }
 
+    return {"equivalent": va == vb, "a": side(va, wa, sa), "b": side(vb, wb, sb)}
 
+
+def reactions_equivalent(a: str, b: str) -> bool:
+    """同 reaction_equivalence_info(a, b)["equivalent"]，不构造明细。"""
+    return _stoichiometry(a)[0] == _stoichiometry(b)[0]
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from math import sqrt
+from typing import Any, Dict, Mapping
+
+from .formula import parse_formula
+
+
+def composition_score(a: Mapping[str, int], b: Mapping[str, int]) -> Dict[str, float]:
+    """
+    两个元素计数字典的相似度：score = cosine * size_ratio，取值 [0, 1]。
+    - cosine：元素计数向量的余弦，衡量元素种类与比例是否一致（Fe2O3 与 Fe4O6 为 1）
+    - size_ratio：总原子数之比 min/max，区分比例相同但大小不同的式子
+    当且仅当两组成完全相同时 score 为 1。
+    """
+    if dict(a) == dict(b):
+        return {"score": 1.0, "cosine": 1.0, "size_ratio": 1.0}
+    na = sqrt(sum(c * c for c in a.values()))
+    nb = sqrt(sum(c * c for c in b.values()))
+    ta, tb = sum(a.values()), sum(b.values())
+    if not na or not nb:
+        return {"score": 0.0, "cosine": 0.0, "size_ratio": 0.0}
+    cosine = min(1.0, sum(c * b.get(el, 0) for el, c in a.items()) / (na * nb))
+    size_ratio = min(ta, tb) / max(ta, tb)
+    return {"score": cosine * size_ratio, "cosine": cosine, "size_ratio": size_ratio}
+
+
+def formula_similarity_info(a: str, b: str) -> Dict[str, Any]:
+    """化学式相似度详情：{"equivalent", "score", "cosine", "size_ratio"}，等价时 score 恰为 1。"""
+    ca, cb = parse_formula(a), parse_formula(b)
+    return {"equivalent": ca == cb, **composition_score(ca, cb)}
+
+
+def formula_similarity(a: str, b: str) -> float:
+    """化学式的部分得分（0~1），如 Fe2O3 与 Fe3O4 约 0.71；见 composition_score。"""
+    return formula_similarity_info(a, b)["score"]
@@ -1,39 +1,45 @@
 import json
 import typer
-from rich import print
-
-from .api import normalize, similarity
-from .assumptions.config import parse_assumptions_json
-from .chem import (
-    parse_formula,
-    normalize_formula,
-    formulas_equivalent,
-    parse_reaction,
-    balance_reaction,
-    balance_reaction_info,
-    reactions_equivalent,
-)
 
 
+# 各命令只在函数内导入所需模块：chem / cache 命令不加载 SymPy、chempy、requests，
+# 逐条调用 CLI 的脚本只为实际用到的依赖付启动开销（见 startup_check.py）
 app = typer.Typer(add_completion=False)
 
 
+def print(*args, **kwargs):
+    from rich import print as _print
+    _print(*args, **kwargs)
+
+
+_CANONICAL_HELP = "规范化级别：none（仅解析）| cheap（expand/together/cancel）| full（simplify）"
+
+
 @app.command()
-def norm(expr: str):
+def norm(expr: str, canonical: str = typer.Option("full", help=_CANONICAL_HELP)):
     """规范化并输出 SymPy 表达式与中间结果"""
-    out = normalize(expr)
+    from .api import normalize
+    out = normalize(expr, canonical=canonical)
     print(json.dumps({
         "text_norm": out["text_norm"],
         "latex_norm": out["latex_norm"],
         "expr": str(out["expr"]),
         "errors": out["errors"],
+        "parser": out["parser"],
     }, ensure_ascii=False, indent=2))
 
 
 @app.command()
-def sim(a: str, b: str, assumptions: str = typer.Option(None, help="JSON 假设，如 '{\"all\":\"real\",\"vars\":{\"x\":\"positive\"}}'")):
+def sim(
+    a: str,
+    b: str,
+    assumptions: str = typer.Option(None, help="JSON 假设，如 '{\"all\":\"real\",\"vars\":{\"x\":\"positive\"}}'"),
+    canonical: str = typer.Option("full", help=_CANONICAL_HELP),
+):
     """比较两个表达式的等价性与相似度"""
-    out = similarity(a, b, assumptions=parse_assumptions_json(assumptions))
+    from .api import similarity
+    from .assumptions.config import parse_assumptions_json
+    out = similarity(a, b, assumptions=parse_assumptions_json(assumptions), canonical=canonical)
     print(json.dumps({
         "equivalent": out["equivalent"],
         "score": out["score"],
@@ -41,23 +47,107 @@ def sim(a: str, b: str, assumptions: str = typer.Option(None, help="JSON 假设
     }, ensure_ascii=False, indent=2))
 
 
+@app.command()
+def cluster(
+    path: str = typer.Argument(..., help="输入文件，每行一个表达式；'-' 表示标准输入"),
+    assumptions: str = typer.Option(None, help="JSON 假设"),
+    no_confirm: bool = typer.Option(False, "--no-confirm", help="只按数值指纹分桶，不做符号确认"),
+):
+    """将一批表达式划分为等价类（每类可只批改一个代表）"""
+    import sys
+    from .api import cluster as _cluster
+    from .assumptions.config import parse_assumptions_json
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        inputs = [line.rstrip("\n") for line in f if line.strip()]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    out = _cluster(inputs, assumptions=parse_assumptions_json(assumptions), confirm=not no_confirm)
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+
+
+cache = typer.Typer(help="normalize 磁盘缓存（EQUALLAB_DISK_CACHE）相关命令")
+app.add_typer(cache, name="cache")
+
+_CACHE_PATH_HELP = "SQLite 缓存文件路径，缺省取环境变量 EQUALLAB_DISK_CACHE"
+
+
+def _disk_cache(path: str | None):
+    from .disk_cache import configure_disk_cache, get_disk_cache
+    disk = configure_disk_cache(path) if path else get_disk_cache()
+    if disk is None:
+        raise typer.BadParameter("未配置磁盘缓存：请设置 EQUALLAB_DISK_CACHE 或传入 --path")
+    return disk
+
+
+@cache.command("warm")
+def cache_warm(
+    corpus: str = typer.Argument(..., help="JSONL 语料，每行为字符串或 {\"input\": ..., \"is_latex\": ..., \"canonical\": ...}；'-' 表示标准输入"),
+    canonical: str = typer.Option("full", help="行内未指定时使用的" + _CANONICAL_HELP),
+    path: str = typer.Option(None, help=_CACHE_PATH_HELP),
+):
+    """用 JSONL 语料预热磁盘缓存，使新启动的 worker 直接命中"""
+    import sys
+    from .api import normalize
+    disk = _disk_cache(path)
+    total = errors = 0
+    hits_before = disk.hits
+    f = sys.stdin if corpus == "-" else open(corpus, "r", encoding="utf-8")
+    try:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"input": item}
+            out = normalize(item["input"], is_latex=item.get("is_latex"), canonical=item.get("canonical", canonical))
+            total += 1
+            errors += bool(out["errors"])
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    disk.compact()
+    print(json.dumps({
+        "inputs": total,
+        "already_cached": disk.hits - hits_before,
+        "parse_errors": errors,
+        "cache": disk.stats(),
+    }, ensure_ascii=False, indent=2))
+
+
+@cache.command("stats")
+def cache_stats(path: str = typer.Option(None, help=_CACHE_PATH_HELP)):
+    print(json.dumps(_disk_cache(path).stats(), ensure_ascii=False, indent=2))
+
+
+@cache.command("clear")
+def cache_clear(path: str = typer.Option(None, help=_CACHE_PATH_HELP)):
+    disk = _disk_cache(path)
+    disk.clear()
+    print(json.dumps(disk.stats(), ensure_ascii=False, indent=2))
+
+
 chem = typer.Typer(help="化学公式/反应相关命令")
 app.add_typer(chem, name="chem")
 
 
 @chem.command("norm")
 def chem_norm(formula: str):
+    from .chem import normalize_formula
     print(json.dumps(normalize_formula(formula), ensure_ascii=False, indent=2))
 
 
 @chem.command("eq")
 def chem_eq(a: str, b: str):
+    from .chem import formulas_equivalent
     print(json.dumps({"equivalent": formulas_equivalent(a, b)}, ensure_ascii=False, indent=2))
 
 
 @chem.command("balance")
-def chem_balance(reaction: str):
-    rc, pc, reag, prod, method = balance_reaction_info(reaction)
+def chem_balance(reaction: str, method: str = typer.Option(None, help="配平方法：integer | chempy，缺省取 EQUALLAB_BALANCER（integer）")):
+    from .chem import balance_reaction_info
+    rc, pc, reag, prod, method = balance_reaction_info(reaction, method=method)
     print(json.dumps({
         "reactants": [{"coef": c, "species": s} for c, s in zip(rc, reag)],
         "products": [{"coef": c, "species": s} for c, s in zip(pc, prod)],
@@ -67,7 +157,8 @@ def chem_balance(reaction: str):
 
 @chem.command("eqrxn")
 def chem_eqrxn(a: str, b: str):
-    print(json.dumps({"equivalent": reactions_equivalent(a, b)}, ensure_ascii=False, indent=2))
+    from .chem import reaction_equivalence_info
+    print(json.dumps(reaction_equivalence_info(a, b), ensure_ascii=False, indent=2))
 
 
 def main():
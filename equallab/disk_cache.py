@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Hashable, Tuple
+
+from .cache import env_int
+from .serialization import dumps
+
+
+logger = logging.getLogger("equallab.disk_cache")
+
+# totals 为单行的条目数/字节数累计，由触发器随 entries 的增删改维护，容量检查无需全表扫描
+# （仅在首次打开旧文件时统计一次）；写入用 UPSERT 而非 INSERT OR REPLACE（REPLACE 删除旧行时不触发 DELETE 触发器）
+_SCHEMA = """
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS entries (
+    key   BLOB PRIMARY KEY,
+    value BLOB NOT NULL,
+    size  INTEGER NOT NULL,
+    atime REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_atime ON entries (atime);
+CREATE TABLE IF NOT EXISTS totals (
+    id    INTEGER PRIMARY KEY CHECK (id = 0),
+    items INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT INTO totals (id, items, bytes)
+SELECT 0, (SELECT COUNT(*) FROM entries), (SELECT COALESCE(SUM(size), 0) FROM entries)
+WHERE NOT EXISTS (SELECT 1 FROM totals);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE totals SET items = items + 1, bytes = bytes + new.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE totals SET items = items - 1, bytes = bytes - old.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_resize AFTER UPDATE OF size ON entries BEGIN
+    UPDATE totals SET bytes = bytes + new.size - old.size WHERE id = 0;
+END;
+COMMIT;
+"""
+
+# 命中时最近访问时间的刷新粒度（秒）：避免每次读取都产生一次写事务
+_TOUCH_INTERVAL = 60.0
+_TOTALS = "SELECT items, bytes FROM totals WHERE id = 0"
+# 超出容量时淘汰到上限的 90%，以留出余量
+_LOW_WATERMARK = 0.9
+
+
+def _dumps(value: Any) -> bytes:
+    return zlib.compress(dumps(value))
+
+
+def _digest(key: Hashable) -> bytes:
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).digest()
+
+
+class DiskCache:
+    """
+    跨进程共享的磁盘缓存（SQLite，WAL 模式）：值以 pickle + zlib 压缩存储，键为 JSON 序列化后的 sha256。
+    多个 worker 进程可同时读写同一文件；按最近访问时间做 LRU 淘汰，受 max_bytes（压缩后字节数）
+    与 max_items 约束。任何 SQLite 错误都只记一次告警并按未命中处理，不影响调用方。
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, max_items: int = 1_000_000, timeout: float = 5.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._pid = None
+        self._warned = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # fork 之后不能复用父进程的连接
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _failed(self, exc: Exception) -> None:
+        if not self._warned:
+            self._warned = True
+            logger.warning("disk cache %s unavailable: %s", self.path, exc)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        k = _digest(key)
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute("SELECT value, atime FROM entries WHERE key = ?", (k,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return False, None
+                now = time.time()
+                if now - row[1] > _TOUCH_INTERVAL:
+                    conn.execute("UPDATE entries SET atime = ? WHERE key = ?", (now, k))
+                value = pickle.loads(zlib.decompress(row[0]))
+            except Exception as exc:  # noqa: BLE001
+                self._failed(exc)
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            return True, value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        try:
+            blob = _dumps(value)
+        except Exception:  # noqa: BLE001
+            # 不可序列化的值（如动态生成的对象）直接跳过
+            return
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT INTO entries (key, value, size, atime) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, atime = excluded.atime",
+                    (_digest(key), blob, len(blob), time.time()),
+                )
+                self._evict(conn)
+            except Exception as exc:  # noqa: BLE001
+                self._failed(exc)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        items, size = conn.execute(_TOTALS).fetchone()
+        if items <= self.max_items and size <= self.max_bytes:
+            return
+        target_items = int(self.max_items * _LOW_WATERMARK)
+        target_bytes = int(self.max_bytes * _LOW_WATERMARK)
+        victims = []
+        for k, s in conn.execute("SELECT key, size FROM entries ORDER BY atime"):
+            if items <= target_items and size <= target_bytes:
+                break
+            victims.append((k,))
+            items -= 1
+            size -= s
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def compact(self) -> None:
+        """立即按容量上限淘汰（批量写入后调用）。"""
+        with self._lock:
+            try:
+                self._evict(self._connect())
+            except Exception as exc:  # noqa: BLE001
+                self._failed(exc)
+
+    def clear(self) -> None:
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute("DELETE FROM entries")
+                conn.execute("VACUUM")
+            except Exception as exc:  # noqa: BLE001
+                self._failed(exc)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            try:
+                items, size = self._connect().execute(_TOTALS).fetchone()
+            except Exception as exc:  # noqa: BLE001
+                self._failed(exc)
+                items, size = None, None
+            return {
+                "path": self.path,
+                "items": items,
+                "bytes": size,
+                "max_items": self.max_items,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_disk_cache: DiskCache | None = None
+_disk_cache_ready = False
+_disk_cache_lock = threading.Lock()
+
+
+def get_disk_cache() -> DiskCache | None:
+    """按环境变量 EQUALLAB_DISK_CACHE（SQLite 文件路径）创建进程内单例；未设置时返回 None（关闭）。线程安全。"""
+    global _disk_cache, _disk_cache_ready
+    if _disk_cache_ready:
+        return _disk_cache
+    with _disk_cache_lock:
+        if not _disk_cache_ready:
+            path = os.getenv("EQUALLAB_DISK_CACHE")
+            if path:
+                _disk_cache = DiskCache(
+                    path,
+                    max_bytes=env_int("EQUALLAB_DISK_CACHE_MAX_BYTES", 256 * 1024 * 1024),
+                    max_items=env_int("EQUALLAB_DISK_CACHE_MAX_ITEMS", 1_000_000),
+                )
+            _disk_cache_ready = True
+        return _disk_cache
+
+
+def configure_disk_cache(path: str | None, **kwargs: Any) -> DiskCache | None:
+    """显式指定（或以 None 关闭）磁盘缓存，覆盖环境变量配置。"""
+    global _disk_cache, _disk_cache_ready
+    with _disk_cache_lock:
+        _disk_cache = DiskCache(path, **kwargs) if path else None
+        _disk_cache_ready = True
+        return _disk_cache
@@ -1,7 +1,16 @@
 from .preprocess import preprocess_text
 from .latex_clean import clean_latex
-from .to_sympy import parse_to_sympy
-
-__all__ = ["preprocess_text", "clean_latex", "parse_to_sympy"]
-
+from .latex_parser import parse_latex_native, LatexUnsupported
+from .to_sympy import parse_to_sympy, parse_raw, parse_raw_detailed
+from .carrier import NormalizedExpr
 
+__all__ = [
+    "preprocess_text",
+    "clean_latex",
+    "parse_latex_native",
+    "LatexUnsupported",
+    "parse_to_sympy",
+    "parse_raw",
+    "parse_raw_detailed",
+    "NormalizedExpr",
+]
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Sequence
+
+import json
+import sympy as sp
+
+from .to_sympy import CANONICAL_LEVELS, _cheap_cached, _simplify_cached
+
+
+class NormalizedExpr(Mapping):
+    """
+    规范化结果载体：持有原始解析结果 raw，派生形式（化简/展开/doit/应用假设/自由符号/
+    lambdify 函数/结构指纹等）在首次使用时计算一次，供同一请求内各阶段复用。
+
+    兼容旧的 dict 返回值：支持 ["input"] / ["text_norm"] / ["latex_norm"] / ["expr"] / ["errors"] / ["parser"]，
+    dict(carrier) 与 carrier.get(...) 照常可用。parser 为处理该输入的解析器。"expr" 为 level 对应的规范形：
+    level="full" 为 simplify 结果，level="cheap" 为 expand/together/cancel 结果，level="none" 为原始解析结果。
+    更重的形式（如 simplified）仍可按需取用，只在首次访问时计算。
+    化简超时或失败时规范形退回原始表达式，并置 degraded=True；退化的结果不应持久化。
+    """
+
+    _KEYS = ("input", "text_norm", "latex_norm", "expr", "errors", "parser")
+    # level -> 对应规范形在 _forms 中的名称
+    _LEVEL_FORMS = {"full": "simplified", "cheap": "cheap"}
+
+    def __init__(
+        self,
+        raw: sp.Expr | None,
+        input: str | None = None,
+        text_norm: str | None = None,
+        latex_norm: str | None = None,
+        errors: List[str] | None = None,
+        level: str = "none",
+        parser: str | None = None,
+    ):
+        if level not in CANONICAL_LEVELS:
+            raise ValueError(f"unknown canonical level: {level}")
+        self.raw = raw
+        self.input = input
+        self.text_norm = text_norm
+        self.latex_norm = latex_norm
+        self.errors = errors if errors is not None else []
+        self.level = level
+        self.parser = parser
+        self.degraded = False
+        self._forms: Dict[Hashable, Any] = {}
+
+    @classmethod
+    def wrap(cls, expr: "sp.Expr | NormalizedExpr", level: str = "none") -> "NormalizedExpr":
+        """已是载体则原样返回，否则以给定 level 包装原始表达式（缺省不做任何规范化）。"""
+        return expr if isinstance(expr, NormalizedExpr) else cls(expr, level=level)
+
+    def dump(self) -> tuple:
+        """导出可 pickle 的状态（含 level 对应的规范形，必要时先计算），供磁盘缓存持久化。"""
+        form = self.expr if self.level in self._LEVEL_FORMS else None
+        return (self.raw, self.input, self.text_norm, self.latex_norm, list(self.errors), self.level, self.parser, form)
+
+    @classmethod
+    def load(cls, state: tuple) -> "NormalizedExpr":
+        """由 dump() 的结果重建载体；已持久化的规范形直接放入派生形式缓存，不再重复计算。"""
+        raw, input, text_norm, latex_norm, errors, level, parser, form = state
+        out = cls(raw, input=input, text_norm=text_norm, latex_norm=latex_norm, errors=errors, level=level, parser=parser)
+        if form is not None and raw is not None:
+            out._forms[cls._LEVEL_FORMS[level]] = form
+        return out
+
+    # --- Mapping 兼容接口 ---
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return self.expr if key == "expr" else getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    # --- 派生形式 ---
+    def derive(self, name: Hashable, fn: Callable[[sp.Expr], Any]) -> Any:
+        """以 name 记忆化 fn(self.expr)；异常不缓存。"""
+        if name not in self._forms:
+            self._forms[name] = fn(self.expr)
+        return self._forms[name]
+
+    def child(self, name: Hashable, fn: Callable[[sp.Expr], sp.Expr]) -> "NormalizedExpr":
+        """派生出新的载体（如应用假设后的表达式），其自身的派生形式同样被缓存。"""
+        return self.derive(("child", name), lambda e: NormalizedExpr(fn(e)))
+
+    def _raw_form(self, name: str, fn: Callable[[sp.Expr], Any]) -> Any:
+        if self.raw is None:
+            return None
+        if name not in self._forms:
+            self._forms[name] = fn(self.raw)
+        return self._forms[name]
+
+    @property
+    def expr(self) -> sp.Expr | None:
+        if self.level == "full":
+            return self.simplified
+        if self.level == "cheap":
+            return self.cheap
+        return self.raw
+
+    def _fallback(self, fn: Callable[[sp.Expr], sp.Expr]) -> Callable[[sp.Expr], sp.Expr]:
+        # 超时（SymbolicTimeout）或失败时退回原始表达式，并标记为退化
+        def _safe(e: sp.Expr) -> sp.Expr:
+            try:
+                return fn(e)
+            except Exception:  # noqa: BLE001
+                self.degraded = True
+                return e
+        return _safe
+
+    @property
+    def cheap(self) -> sp.Expr | None:
+        return self._raw_form("cheap", self._fallback(_cheap_cached))
+
+    @property
+    def simplified(self) -> sp.Expr | None:
+        # 经缓存与沙箱执行
+        return self._raw_form("simplified", self._fallback(_simplify_cached))
+
+    @property
+    def expanded(self) -> sp.Expr | None:
+        return self._raw_form("expanded", sp.expand)
+
+    @property
+    def evaluated(self) -> sp.Expr | None:
+        return self._raw_form("evaluated", lambda e: e.doit(deep=True))
+
+    @property
+    def free_symbols(self) -> List[sp.Symbol]:
+        if self.expr is None:
+            return []
+        return self.derive("free_symbols", lambda e: sorted(e.free_symbols, key=lambda s: s.name))
+
+    def with_assumptions(self, assumptions: Dict | None) -> "NormalizedExpr":
+        from equallab.assumptions.config import apply_assumptions
+        key = json.dumps(assumptions or {}, sort_keys=True)
+        return self.child(("assumptions", key), lambda e: apply_assumptions(e, assumptions))
+
+    def lambdified(self, symbols: Sequence[sp.Symbol] | None = None) -> Callable | None:
+        """按给定参数顺序（缺省为自由符号）lambdify 的 NumPy 函数；无法编译时为 None。"""
+        from equallab.similarity.numeric import compile_numeric
+        symbols = tuple(symbols) if symbols is not None else tuple(self.free_symbols)
+        return self.derive(("lambdified", symbols), lambda e: compile_numeric([e], symbols))
+
+    @property
+    def fingerprint(self):
+        from equallab.similarity.structure import expr_fingerprint
+        return self.derive("fingerprint", expr_fingerprint)
@@ -1,67 +1,174 @@
 import re
+from typing import List
 
 
-_MATH_MODE = re.compile(r"\$(.*?)\$|\\\((.*?)\\\)|\\\[(.*?)\\\]", re.DOTALL)
+# 整串数学模式外壳：开定界符 -> 闭定界符（$$ 需先于 $ 判断）
+_WRAPPERS = (("$$", "$$"), ("$", "$"), ("\\(", "\\)"), ("\\[", "\\]"))
+
+# 整词宏别名（只匹配完整控制词，\chi / \theta 等不受影响）
+_ALIASES = {
+    "dfrac": "\\frac",
+    "tfrac": "\\frac",
+    "ln": "\\log",
+    # 三角/双曲函数常见别名统一
+    "tg": "\\tan",
+    "ctg": "\\cot",
+    "arctg": "\\arctan",
+    "arccotg": "\\arccot",
+    "ch": "\\cosh",
+    "sh": "\\sinh",
+    "th": "\\tanh",
+    # 间距
+    "quad": " ",
+    "qquad": "  ",
+}
+_SPACING_SYMBOLS = {",", ";", "!"}
+# 去壳宏：\mathrm{x} -> x
+_UNWRAP = {"mathrm", "operatorname"}
+
+# 需要改写的词法单元：绝对值定界符 / 需处理的控制词（整词）/ 控制符（含换行符 \\，避免误读其后的字母）/ ~；
+# 其余文本（含其它控制词）按片段原样拷贝，不进入 Python 层逐个处理
+_SPECIAL_WORDS = "|".join(sorted(set(_ALIASES) | _UNWRAP | {"abs", "log"}, key=len, reverse=True))
+_TOKENS = (
+    r"(?P<absl>\\left\s*(?:\||\\lvert(?![A-Za-z]))|\\lvert(?![A-Za-z]))"
+    r"|(?P<absr>\\right\s*(?:\||\\rvert(?![A-Za-z]))|\\rvert(?![A-Za-z]))"
+    rf"|\\(?P<word>{_SPECIAL_WORDS})(?![A-Za-z])"
+    r"|\\(?P<sym>[^A-Za-z])"
+    r"|(?P<tilde>~)"
+)
+_TOKEN = re.compile(_TOKENS, re.DOTALL)
+# 处于 \abs{ / \mathrm{ 等改写组内时，还需跟踪花括号以找到对应的闭括号
+_TOKEN_BRACES = re.compile(_TOKENS + r"|(?P<brace>[{}])", re.DOTALL)
+
+_SPACES = re.compile(r"\s*")
+_LOG_E = re.compile(r"\s*\(\s*e\s*\^\s*")
+_CLOSE_PAREN = re.compile(r"\s*\)")
+
+_ABS_OPEN = "\\left| "
+_ABS_CLOSE = " \\right|"
 
 
 def _strip_math_wrappers(s: str) -> str:
-    # 若包含数学模式外壳，提取内部；若多段，仅保留原串（交给解析处理）
-    m = _MATH_MODE.fullmatch(s)
-    if m:
-        inner = next((g for g in m.groups() if g is not None), s)
-        return inner
+    # 若整串为单段数学模式外壳，提取内部；若多段，仅保留原串（交给解析处理）
+    for left, right in _WRAPPERS:
+        if len(s) >= len(left) + len(right) and s.startswith(left) and s.endswith(right):
+            inner = s[len(left):len(s) - len(right)]
+            if left not in inner and right not in inner:
+                return inner
+            return s
     return s
 
 
+def _group_end(s: str, pos: int) -> int:
+    """s[pos] 为 '{'，返回与之匹配的 '}' 下标；未闭合返回 -1。"""
+    depth = 0
+    i = pos
+    n = len(s)
+    while i < n:
+        c = s[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return -1
+
+
+def _log_of_exp(s: str, pos: int) -> tuple[str, int] | None:
+    r"""
+    pos 位于 \ln / \log 之后：识别 (e^{...}) 或 (e^x)（单个字母/数字指数），
+    返回 (指数内容, 右括号之后的位置)；不匹配返回 None。
+    """
+    m = _LOG_E.match(s, pos)
+    if not m:
+        return None
+    i = m.end()
+    if i < len(s) and s[i] == "{":
+        end = _group_end(s, i)
+        if end < 0:
+            return None
+        inner, j = s[i + 1:end], end + 1
+    elif i < len(s) and s[i].isalnum():
+        inner, j = s[i], i + 1
+    else:
+        return None
+    close = _CLOSE_PAREN.match(s, j)
+    if not close:
+        return None
+    return _clean(inner).strip(), close.end()
+
+
+def _clean(s: str) -> str:
+    out: List[str] = []
+    # 改写组的花括号栈：记录每个 '{' 闭合时应输出的内容（普通组 "}"、\abs 组为右竖线、去壳组为空）
+    closers: List[str] = []
+    pos, n = 0, len(s)
+    while pos < n:
+        m = (_TOKEN_BRACES if closers else _TOKEN).search(s, pos)
+        if m is None:
+            out.append(s[pos:])
+            break
+        out.append(s[pos:m.start()])
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "word":
+            name = m.group(kind)
+            if name in ("ln", "log"):
+                hit = _log_of_exp(s, pos)
+                if hit is not None:
+                    out.append(hit[0])
+                    pos = hit[1]
+                else:
+                    out.append("\\log")
+            elif name in _ALIASES:
+                out.append(_ALIASES[name])
+            else:
+                j = _SPACES.match(s, pos).end()
+                # 只改写闭合的组；未闭合的 \abs{ / \mathrm{ 原样保留，交给解析器报错，不把残缺输入“修好”
+                if j < n and s[j] == "{" and _group_end(s, j) >= 0:
+                    pos = _SPACES.match(s, j + 1).end()
+                    if name == "abs":
+                        out.append(_ABS_OPEN)
+                        closers.append(_ABS_CLOSE)
+                    else:
+                        closers.append("")
+                else:
+                    out.append(m.group(0))
+        elif kind == "brace":
+            if m.group(kind) == "{":
+                out.append("{")
+                closers.append("}")
+            else:
+                out.append(closers.pop())
+        elif kind == "sym":
+            if m.group(kind) not in _SPACING_SYMBOLS:
+                out.append(m.group(0))
+        elif kind == "tilde":
+            out.append(" ")
+        elif kind == "absl":
+            out.append(_ABS_OPEN)
+        elif kind == "absr":
+            out.append(_ABS_CLOSE)
+        else:
+            out.append(m.group(0))
+    return "".join(out)
+
+
 def clean_latex(s: str) -> str:
     r"""
-    轻量 LaTeX 清洗：
-    - 去除 $...$ / \( ... \) / \[ ... \]
+    轻量 LaTeX 清洗（单遍、花括号感知的词法扫描）：
+    - 去除 $...$ / $$...$$ / \( ... \) / \[ ... \]
     - 常见空格与间距命令移除：\, \; \! ~ \quad \qquad
-    - 常见等价宏替换：\dfrac/\tfrac -> \frac
+    - 常见等价宏替换（整词匹配）：\dfrac/\tfrac -> \frac，\ln -> \log，\tg/\ch/\th 等别名
+    - 绝对值归一为 \left| x \right|：\left|...\right|、\lvert...\rvert、\left\lvert...\right\rvert、\abs{...}
+    - \ln(e^{x}) / \log(e^x) -> x；去壳 \mathrm{} 与 \operatorname{}
     - 注意：不移除必要花括号，不将 \cdot 替换为 *（交由 parse_latex 处理）
     """
     s = _strip_math_wrappers(s)
-
-    replacements = {
-        r"\\dfrac": r"\\frac",
-        r"\\tfrac": r"\\frac",
-        r"\\ln": r"\\log",
-        # 三角/双曲函数常见别名统一
-        r"\\tg": r"\\tan",
-        r"\\ctg": r"\\cot",
-        r"\\arctg": r"\\arctan",
-        r"\\arccotg": r"\\arccot",
-        r"\\ch": r"\\cosh",
-        r"\\sh": r"\\sinh",
-        r"\\th": r"\\tanh",
-        # 间距与不换行空格
-        r"\\,": "",
-        r"\\;": "",
-        r"\\!": "",
-        r"\\quad": " ",
-        r"\\qquad": "  ",
-        r"~": " ",
-    }
-    for pat, val in replacements.items():
-        s = re.sub(pat, val, s)
-
-    # 处理绝对值：双向归一化为 \left| x \right|
-    s = re.sub(r"\\left\|\s*(.*?)\s*\\right\|", r"\\left| \1 \\right|", s, flags=re.DOTALL)
-    s = re.sub(r"\\lvert\s*(.*?)\s*\\rvert", r"\\left| \1 \\right|", s, flags=re.DOTALL)
-    # 支持 \abs{...} 与 \left\lvert ... \right\rvert
-    s = re.sub(r"\\abs\s*\{\s*(.*?)\s*\}", r"\\left| \1 \\right|", s, flags=re.DOTALL)
-    s = re.sub(r"\\left\\lvert\s*(.*?)\s*\\right\\rvert", r"\\left| \1 \\right|", s, flags=re.DOTALL)
-
-    # 处理 ln/log(e^{x}) -> x, ln/log(e^x) -> x
-    s = re.sub(r"\\(?:ln|log)\s*\(\s*e\s*\^\s*\{\s*([^}]+)\s*\}\s*\)", r"\1", s)
-    s = re.sub(r"\\(?:ln|log)\s*\(\s*e\s*\^\s*([^\)]+)\)", r"\1", s)
-    # 去壳 \mathrm{} 与 \operatorname{}
-    s = re.sub(r"\\mathrm\s*\{\s*([^}]+)\s*\}", r"\1", s)
-    s = re.sub(r"\\operatorname\s*\{\s*([^}]+)\s*\}", r"\1", s)
-
     # 压缩多空格
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
-
-
+    return " ".join(_clean(s).split())
@@ -0,0 +1,401 @@
+from __future__ import annotations
+
+from typing import List, Tuple
+import re
+
+import sympy as sp
+from sympy.printing.str import StrPrinter
+
+
+class LatexUnsupported(ValueError):
+    """输入超出原生解析器支持的子集（或存在歧义），调用方应回退到 parse_latex。"""
+
+
+# 原生解析器覆盖的子集按 sympy.parsing.latex（ANTLR 语法 LaTeX.g4）的语义构造表达式，
+# 结果与 parse_latex 逐节点一致；任何不确定的构造均抛 LatexUnsupported，交由 parse_latex 处理。
+
+_TOKEN = re.compile(
+    r"(?P<ws>\s+)"
+    r"|(?P<lbar>\\left\|)"
+    r"|(?P<rbar>\\right\|)"
+    r"|\\(?P<cmd>[A-Za-z]+)"
+    r"|\\(?P<esc>[{}])"
+    r"|\\(?P<space>[,:;!])"
+    r"|(?P<digit>[0-9])"
+    r"|(?P<letter>[A-Za-z])"
+    r"|(?P<op>[-+*/:^_=!()\[\]{}|.])"
+)
+# 'd' 后接字母或控制词时 ANTLR 词法会将其识别为微分记号（dx），不在本子集内
+_DIFFERENTIAL = re.compile(r"d[ \t\r\n]*(?:[A-Za-z]|\\[A-Za-z])")
+
+_SKIP_CMDS = {
+    "left", "right", "thinspace", "medspace", "thickspace", "quad", "qquad",
+    "negthinspace", "negmedspace", "negthickspace",
+}
+_MUL_CMDS = {"cdot", "times"}
+_DIV_CMDS = {"div"}
+_FRAC_CMDS = {"frac", "dfrac", "tfrac"}
+_FUNCS = {
+    "exp", "log", "lg", "ln",
+    "sin", "cos", "tan", "csc", "sec", "cot",
+    "arcsin", "arccos", "arctan", "arccsc", "arcsec", "arccot",
+    "sinh", "cosh", "tanh", "arsinh", "arcosh", "artanh",
+}
+_TRIG = {"sin", "cos", "tan", "csc", "sec", "cot", "sinh", "cosh", "tanh"}
+# 作为符号原子的控制词（希腊字母等），\infty 为 oo
+_SYMBOLS = {
+    "alpha", "beta", "gamma", "delta", "epsilon", "varepsilon", "zeta", "eta", "theta", "vartheta",
+    "iota", "kappa", "lambda", "mu", "nu", "xi", "omicron", "pi", "varpi", "rho", "varrho",
+    "sigma", "varsigma", "tau", "upsilon", "phi", "varphi", "chi", "psi", "omega",
+    "Gamma", "Delta", "Theta", "Lambda", "Xi", "Pi", "Sigma", "Upsilon", "Phi", "Psi", "Omega",
+    "infty",
+}
+
+Token = Tuple[str, str]
+
+
+def _tokenize(text: str) -> List[Token]:
+    tokens: List[Token] = []
+    bars = 0
+    pos, n = 0, len(text)
+    while pos < n:
+        m = _TOKEN.match(text, pos)
+        if m is None:
+            raise LatexUnsupported(f"unsupported character {text[pos]!r}")
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == "letter" and value == "d" and _DIFFERENTIAL.match(text, pos):
+            raise LatexUnsupported("differential")
+        pos = m.end()
+        if kind in ("ws", "space"):
+            continue
+        if kind == "cmd":
+            if value in _SKIP_CMDS:
+                continue
+            if not (value in _FUNCS or value in _SYMBOLS or value in _FRAC_CMDS
+                    or value in _MUL_CMDS or value in _DIV_CMDS or value == "sqrt"):
+                raise LatexUnsupported(f"unsupported command \\{value}")
+        elif kind == "esc":
+            kind, value = "op", "\\" + value
+        elif kind == "op" and value == "|":
+            bars += 1
+        tokens.append((kind, value))
+    # 多于一对 |...| 时配对存在歧义
+    if bars > 2:
+        raise LatexUnsupported("ambiguous absolute value bars")
+    return tokens
+
+
+def _implicit_product(items: List[sp.Expr]) -> sp.Expr:
+    # 与 parse_latex 的 convert_postfix_list 相同：右结合的未求值乘积；
+    # 两侧均为纯数时夹在中间的 x 视为乘号
+    acc = items[-1]
+    for i in range(len(items) - 2, -1, -1):
+        res = items[i]
+        if i > 0 and str(res) == "x" and not (items[i - 1].atoms(sp.Symbol) or items[i + 1].atoms(sp.Symbol)):
+            continue
+        acc = sp.Mul(res, acc, evaluate=False)
+    return acc
+
+
+class _Parser:
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.pos = 0
+        self.in_bar = False
+
+    # --- 记号操作 ---
+    def peek(self, offset: int = 0) -> Token | None:
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else None
+
+    def at(self, kind: str, value: str | None = None, offset: int = 0) -> bool:
+        tok = self.peek(offset)
+        return tok is not None and tok[0] == kind and (value is None or tok[1] == value)
+
+    def next(self) -> Token:
+        tok = self.peek()
+        if tok is None:
+            raise LatexUnsupported("unexpected end of input")
+        self.pos += 1
+        return tok
+
+    def expect(self, kind: str, value: str | None = None) -> Token:
+        if not self.at(kind, value):
+            raise LatexUnsupported(f"expected {value or kind}")
+        return self.next()
+
+    # --- 语法规则 ---
+    def parse(self) -> sp.Basic:
+        lhs = self.expr()
+        if self.at("op", "="):
+            self.next()
+            rhs = self.expr()
+            result: sp.Basic = sp.Eq(lhs, rhs)
+        else:
+            result = lhs
+        if self.peek() is not None:
+            raise LatexUnsupported(f"unexpected {self.peek()[1]!r}")
+        return result
+
+    def expr(self) -> sp.Expr:
+        left = self.mp(nofunc=False)
+        while self.at("op", "+") or self.at("op", "-"):
+            op = self.next()[1]
+            right = self.mp(nofunc=False)
+            if op == "+":
+                left = sp.Add(left, right, evaluate=False)
+            elif right.is_Atom:
+                left = sp.Add(left, -1 * right, evaluate=False)
+            else:
+                left = sp.Add(left, sp.Mul(-1, right, evaluate=False), evaluate=False)
+        return left
+
+    def _mulop(self) -> str | None:
+        tok = self.peek()
+        if tok is None:
+            return None
+        if tok == ("op", "*") or (tok[0] == "cmd" and tok[1] in _MUL_CMDS):
+            return "mul"
+        if tok in (("op", "/"), ("op", ":")) or (tok[0] == "cmd" and tok[1] in _DIV_CMDS):
+            return "div"
+        return None
+
+    def mp(self, nofunc: bool) -> sp.Expr:
+        left = self.unary(nofunc)
+        while (op := self._mulop()) is not None:
+            self.next()
+            right = self.unary(nofunc)
+            if op == "mul":
+                left = sp.Mul(left, right, evaluate=False)
+            else:
+                left = sp.Mul(left, sp.Pow(right, -1, evaluate=False), evaluate=False)
+        return left
+
+    def unary(self, nofunc: bool) -> sp.Expr:
+        if self.at("op", "+"):
+            self.next()
+            return self.unary(nofunc)
+        if self.at("op", "-"):
+            self.next()
+            return -self.unary(nofunc)
+        # 函数参数（无括号）中只有首个因子可以是函数
+        items = [self.postfix(allow_func=True)]
+        while self._starts_comp(allow_func=not nofunc):
+            items.append(self.postfix(allow_func=not nofunc))
+        return _implicit_product(items)
+
+    def _starts_comp(self, allow_func: bool) -> bool:
+        tok = self.peek()
+        if tok is None:
+            return False
+        kind, value = tok
+        if kind in ("digit", "letter", "lbar"):
+            return True
+        if kind == "op":
+            if value == "|":
+                return not self.in_bar
+            return value in ("(", "[", "{", "\\{")
+        if kind == "cmd":
+            if value in _SYMBOLS or value in _FRAC_CMDS:
+                return True
+            return allow_func and (value in _FUNCS or value == "sqrt")
+        return False
+
+    def postfix(self, allow_func: bool) -> sp.Expr:
+        e = self.exp(allow_func)
+        while self.at("op", "!"):
+            self.next()
+            e = sp.factorial(e, evaluate=False)
+        if self.at("op", "|") and (self.at("op", "^", 1) or self.at("op", "_", 1)):
+            raise LatexUnsupported("evaluation bar")
+        return e
+
+    def exp(self, allow_func: bool) -> sp.Expr:
+        base = self.comp(allow_func)
+        while self.at("op", "^"):
+            self.next()
+            exponent = self.braced() if self.at("op", "{") else self.atom()
+            if self.at("op", "_"):
+                # parse_latex 丢弃幂之后的下标
+                self.subexpr()
+            base = sp.Pow(base, exponent, evaluate=False)
+        return base
+
+    def braced(self) -> sp.Expr:
+        self.expect("op", "{")
+        e = self.expr()
+        self.expect("op", "}")
+        return e
+
+    def subexpr(self) -> sp.Expr:
+        self.next()  # '_' 或 '^'
+        return self.braced() if self.at("op", "{") else self.atom()
+
+    def comp(self, allow_func: bool) -> sp.Expr:
+        kind, value = self.peek() or ("", "")
+        if kind == "op":
+            closing = {"(": ")", "[": "]", "{": "}", "\\{": "\\}"}.get(value)
+            if closing is not None:
+                self.next()
+                saved, self.in_bar = self.in_bar, False
+                e = self.expr()
+                self.in_bar = saved
+                self.expect("op", closing)
+                return e
+            if value == "|" and not self.in_bar:
+                self.next()
+                self.in_bar = True
+                e = self.expr()
+                self.in_bar = False
+                self.expect("op", "|")
+                return sp.Abs(e, evaluate=False)
+        elif kind == "lbar":
+            self.next()
+            saved, self.in_bar = self.in_bar, False
+            e = self.expr()
+            self.in_bar = saved
+            self.expect("rbar")
+            return sp.Abs(e, evaluate=False)
+        elif kind == "cmd" and allow_func:
+            if value in _FUNCS:
+                self.next()
+                return self.func(value)
+            if value == "sqrt":
+                self.next()
+                return self.sqrt()
+        if allow_func and (kind == "letter" or (kind == "cmd" and value in _SYMBOLS)):
+            call = self.call()
+            if call is not None:
+                return call
+        return self.atom()
+
+    def _symbol_name(self) -> str:
+        kind, name = self.next()
+        if self.at("op", "_"):
+            name += "_{" + StrPrinter().doprint(self.subexpr()) + "}"
+        return name
+
+    def atom(self) -> sp.Expr:
+        kind, value = self.peek() or ("", "")
+        if kind == "letter" or (kind == "cmd" and value in _SYMBOLS):
+            if value == "infty":
+                self.next()
+                if self.at("op", "_"):
+                    raise LatexUnsupported("subscripted infinity")
+                return sp.oo
+            return sp.Symbol(self._symbol_name())
+        if kind == "digit":
+            return self.number()
+        if kind == "cmd" and value in _FRAC_CMDS:
+            self.next()
+            return self.frac()
+        raise LatexUnsupported(f"unexpected {value!r}")
+
+    def number(self) -> sp.Expr:
+        digits = []
+        while self.at("digit"):
+            digits.append(self.next()[1])
+        if self.at("op", "."):
+            self.next()
+            if not self.at("digit"):
+                raise LatexUnsupported("malformed number")
+            digits.append(".")
+            while self.at("digit"):
+                digits.append(self.next()[1])
+        text = "".join(digits)
+        if len(text) > 1 and text[0] == "0" and text[1] != ".":
+            raise LatexUnsupported("number with leading zero")
+        return sp.Number(text)
+
+    def frac(self) -> sp.Expr:
+        upper = sp.Number(self.next()[1]) if self.at("digit") else self.braced()
+        lower = sp.Number(self.next()[1]) if self.at("digit") else self.braced()
+        inverse_denom = sp.Pow(lower, -1, evaluate=False)
+        if upper == 1:
+            return inverse_denom
+        return sp.Mul(upper, inverse_denom, evaluate=False)
+
+    def sqrt(self) -> sp.Expr:
+        root = None
+        if self.at("op", "["):
+            self.next()
+            root = self.expr()
+            self.expect("op", "]")
+        base = self.braced()
+        if root is not None:
+            return sp.root(base, root, evaluate=False)
+        return sp.sqrt(base, evaluate=False)
+
+    def call(self) -> sp.Expr | None:
+        # f(x) / x_1(x) / \alpha(x)：parse_latex 将紧跟圆括号的符号视为未定义函数调用
+        start = self.pos
+        fname = self._symbol_name()
+        if not self.at("op", "("):
+            self.pos = start
+            return None
+        self.next()
+        saved, self.in_bar = self.in_bar, False
+        arg = self.expr()
+        self.in_bar = saved
+        self.expect("op", ")")
+        return sp.Function(fname)(arg)
+
+    def func(self, name: str) -> sp.Expr:
+        sub = sup = None
+        for _ in range(2):
+            if self.at("op", "_") and sub is None:
+                sub = self.subexpr()
+            elif self.at("op", "^") and sup is None:
+                sup = self.subexpr()
+            else:
+                break
+        if self.at("op", "("):
+            self.next()
+            saved, self.in_bar = self.in_bar, False
+            arg = self.expr()
+            self.in_bar = saved
+            self.expect("op", ")")
+        else:
+            arg = self.mp(nofunc=True)
+
+        # 以下与 parse_latex 的 convert_func 一致
+        expr = None
+        if name in ("arcsin", "arccos", "arctan", "arccsc", "arcsec", "arccot"):
+            name = "a" + name[3:]
+            expr = getattr(sp.functions, name)(arg, evaluate=False)
+        if name in ("arsinh", "arcosh", "artanh"):
+            name = "a" + name[2:]
+            expr = getattr(sp.functions, name)(arg, evaluate=False)
+        if name == "exp":
+            expr = sp.exp(arg, evaluate=False)
+        if name in ("log", "lg", "ln"):
+            if sub is not None:
+                base = sub
+            elif name == "lg":
+                base = 10
+            else:
+                base = sp.E
+            expr = sp.log(arg, base, evaluate=False)
+        should_pow = True
+        if name in _TRIG:
+            if sup == -1:
+                name = "a" + name
+                should_pow = False
+            expr = getattr(sp.functions, name)(arg, evaluate=False)
+        if sup and should_pow:
+            expr = sp.Pow(expr, sup, evaluate=False)
+        return expr
+
+
+def parse_latex_native(text: str) -> sp.Basic:
+    r"""
+    手写递归下降 LaTeX 解析器，覆盖常见子集：\frac、\sqrt、幂与下标、三角/对数函数、
+    |x| 与 \left| x \right|、隐式乘法、\cdot / \times / \div、等式。
+    构造结果与 sympy.parsing.latex.parse_latex 一致（未求值形式）；另支持 \left| x \right| 作为绝对值。
+    超出子集时抛出 LatexUnsupported。
+    """
+    text = text.strip()
+    if not text:
+        raise LatexUnsupported("empty input")
+    return _Parser(_tokenize(text)).parse()
@@ -1,8 +1,23 @@
-import re
 import unicodedata
 
 
-_SPACE_RE = re.compile(r"\s+", re.UNICODE)
+# 常见符号替换（NFKC 之后一次 str.translate 完成）
+_TRANSLATE = str.maketrans({
+    "×": "*",
+    "⋅": "*",
+    "·": "*",
+    "•": "*",
+    "÷": "/",
+    "−": "-",
+    "—": "-",
+    "–": "-",
+    "，": ",",
+    "；": ";",
+    "（": "(",
+    "）": ")",
+    "【": "[",
+    "】": "]",
+})
 
 
 def preprocess_text(text: str) -> str:
@@ -12,34 +27,14 @@ def preprocess_text(text: str) -> str:
     - 统一换行与空白压缩
     - 常见全角到半角
     - 替换常见 Unicode 符号为 ASCII: ×→*, ÷→/，“·/•”→·或省略
+    纯 ASCII 输入跳过归一与符号替换。
     """
     if not text:
         return ""
 
-    s = unicodedata.normalize("NFKC", text)
-
-    # 常见符号替换
-    replacements = {
-        "×": "*",
-        "⋅": "*",
-        "·": "*",
-        "•": "*",
-        "÷": "/",
-        "−": "-",
-        "—": "-",
-        "–": "-",
-        "，": ",",
-        "；": ";",
-        "（": "(",
-        "）": ")",
-        "【": "[",
-        "】": "]",
-    }
-    for k, v in replacements.items():
-        s = s.replace(k, v)
+    s = text
+    if not s.isascii():
+        s = unicodedata.normalize("NFKC", s).translate(_TRANSLATE)
 
     # 空白规范
-    s = _SPACE_RE.sub(" ", s).strip()
-    return s
-
-
+    return " ".join(s.split())
@@ -4,7 +4,6 @@ from typing import Tuple, Optional
 import re
 
 import sympy as sp
-from sympy.parsing.latex import parse_latex
 from sympy.parsing.sympy_parser import (
     parse_expr,
     standard_transformations,
@@ -12,18 +11,97 @@ from sympy.parsing.sympy_parser import (
     convert_xor,
 )
 
+from equallab.cache import cached_transform, cached_value
+from equallab.sandbox import SymbolicTimeout, run_symbolic
+from .latex_parser import parse_latex_native
+
+
+# 规范化级别：none 仅解析；cheap 仅展开/通分/约分；full 完整 simplify
+CANONICAL_LEVELS = ("none", "cheap", "full")
+
+# 解析器标识（见 parse_raw_detailed）
+PARSER_NATIVE = "native"
+PARSER_LATEX = "parse_latex"
+PARSER_TEXT = "parse_expr"
+
+
+def _simplify_cached(expr: sp.Expr) -> sp.Expr:
+    # simplify 可能失控：经沙箱执行，结果按 α-换名规范形缓存；超时（SymbolicTimeout）照常抛出且不缓存
+    return cached_transform("simplify", expr, lambda e: run_symbolic(sp.simplify, e))
+
+
+def _simplify(expr: sp.Expr) -> sp.Expr:
+    # 超出预算时退回未化简的表达式
+    try:
+        return _simplify_cached(expr)
+    except SymbolicTimeout:
+        return expr
+
+
+def _cheap_form(expr: sp.Expr) -> sp.Expr:
+    return sp.cancel(sp.together(sp.expand(expr)))
+
+
+def _cheap_cached(expr: sp.Expr) -> sp.Expr:
+    # 轻量规范形（expand/together/cancel），同样经沙箱执行并按 α-换名规范形缓存
+    return cached_transform("cheap", expr, lambda e: run_symbolic(_cheap_form, e))
+
+
+def _cheap(expr: sp.Expr) -> sp.Expr:
+    try:
+        return _cheap_cached(expr)
+    except SymbolicTimeout:
+        return expr
 
-def parse_to_sympy(text: str, assume_latex: bool = False) -> Tuple[Optional[sp.Expr], Optional[str]]:
-    """
-    将文本解析为 SymPy 表达式。
-    - 优先：当 assume_latex=True 时，尝试 parse_latex
-    - 回退：尝试 sympify（支持简易纯文本表达式）
-    返回 (expr, error_message)
-    """
-    if not text:
-        return None, "empty input"
 
+def canonicalize(expr: sp.Expr, level: str = "full") -> sp.Expr:
+    """按 level（见 CANONICAL_LEVELS）返回表达式的规范形。"""
+    if level == "none":
+        return expr
+    if level == "cheap":
+        return _cheap(expr)
+    if level == "full":
+        return _simplify(expr)
+    raise ValueError(f"unknown canonical level: {level}")
+
+
+def _braces_balanced(text: str) -> bool:
+    depth = 0
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c == "\\":
+            # 跳过转义的 \{ / \}
+            i += 2
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth < 0:
+                return False
+        i += 1
+    return depth == 0
+
+
+def _parse_latex(text: str) -> Tuple[sp.Basic, str]:
+    # 原生解析器覆盖常见子集；不支持的构造回退到 ANTLR parse_latex（首次调用需加载语法，较慢）
+    try:
+        return parse_latex_native(text), PARSER_NATIVE
+    except Exception:  # noqa: BLE001
+        # 超出子集（LatexUnsupported）或构造失败时均交给 parse_latex，由其给出最终结果或错误
+        pass
+    # 非严格模式的 parse_latex 遇到未闭合/多余的花括号会静默截断（\abs{x 得到 abs），先行拒绝
+    if not _braces_balanced(text):
+        raise ValueError("unbalanced braces")
+    from sympy.parsing.latex import parse_latex
+    return parse_latex(text), PARSER_LATEX
+
+
+def _parse_raw(text: str, assume_latex: bool) -> Tuple[Optional[sp.Expr], Optional[str], str]:
+    # 仅解析，不化简；返回 (expr, error_message, 解析器标识)
     if assume_latex:
+        parser = PARSER_LATEX
         try:
             # 将自由符号 e 预替换为 E，使 e^x 解析为 E**x
             # 注意：仅在明显的幂或函数上下文中替换，避免误伤变量名
@@ -33,18 +111,17 @@ def parse_to_sympy(text: str, assume_latex: bool = False) -> Tuple[Optional[sp.E
             abs_full = re.fullmatch(r"\s*(?:\\left\|\s*(?P<inner1>.+?)\s*\\right\||\\lvert\s*(?P<inner2>.+?)\s*\\rvert)\s*", patched, flags=re.DOTALL)
             if abs_full:
                 inner = abs_full.group('inner1') or abs_full.group('inner2')
-                inner_expr, inner_err = parse_to_sympy(inner, assume_latex=True)
+                inner_expr, inner_err, inner_parser = _parse_raw(inner, assume_latex=True)
                 if inner_err is None and inner_expr is not None:
-                    expr = sp.Abs(inner_expr)
-                    return sp.simplify(expr), None
+                    return sp.Abs(inner_expr), None, inner_parser
 
-            expr = parse_latex(patched)
+            expr, parser = _parse_latex(patched)
             if isinstance(expr, sp.Equality):
                 expr = expr.lhs - expr.rhs
-            return sp.simplify(expr), None
+            return expr, None, parser
         except Exception as e:  # noqa: BLE001
             # 对于明确是 LaTeX 的输入，直接返回解析错误，不回退到纯文本解析，避免误判
-            return None, f"latex_parse_error: {e}"
+            return None, f"latex_parse_error: {e}", parser
 
     try:
         transformations = (
@@ -52,9 +129,43 @@ def parse_to_sympy(text: str, assume_latex: bool = False) -> Tuple[Optional[sp.E
             convert_xor,
             implicit_multiplication_application,
         )
-        expr = parse_expr(text, transformations=transformations, evaluate=True)
-        return sp.simplify(expr), None
+        return parse_expr(text, transformations=transformations, evaluate=True), None, PARSER_TEXT
     except Exception as e:  # noqa: BLE001
-        return None, str(e)
+        return None, str(e), PARSER_TEXT
+
+
+def parse_raw_detailed(text: str, assume_latex: bool = False) -> Tuple[Optional[sp.Expr], Optional[str], Optional[str]]:
+    """
+    解析为 SymPy 表达式但不化简；结果按输入串缓存。
+    返回 (expr, error_message, parser)，parser 为实际处理该输入的解析器：
+    "native"（原生 LaTeX 解析器）/ "parse_latex"（ANTLR 回退）/ "parse_expr"（纯文本）。
+    """
+    if not text:
+        return None, "empty input", None
+    return cached_value("parse", (text, bool(assume_latex)), lambda: _parse_raw(text, assume_latex))
+
 
+def parse_raw(text: str, assume_latex: bool = False) -> Tuple[Optional[sp.Expr], Optional[str]]:
+    """解析为 SymPy 表达式但不化简；结果按输入串缓存。返回 (expr, error_message)"""
+    expr, err, _ = parse_raw_detailed(text, assume_latex)
+    return expr, err
 
+
+def parse_to_sympy(text: str, assume_latex: bool = False, canonical: str = "full") -> Tuple[Optional[sp.Expr], Optional[str]]:
+    """
+    将文本解析为 SymPy 表达式，并按 canonical 级别规范化（none / cheap / full，缺省 full 即 simplify）。
+    - 优先：当 assume_latex=True 时，先用原生解析器（见 latex_parser），不支持的构造回退到 parse_latex
+    - 回退：尝试 sympify（支持简易纯文本表达式）
+    - 解析结果按输入串缓存，化简结果按 α-换名后的规范形缓存（见 equallab.cache）
+    返回 (expr, error_message)
+    """
+    if canonical not in CANONICAL_LEVELS:
+        raise ValueError(f"unknown canonical level: {canonical}")
+    expr, err = parse_raw(text, assume_latex)
+    if err is not None:
+        return None, err
+    try:
+        return canonicalize(expr, canonical), None
+    except Exception as e:  # noqa: BLE001
+        prefix = "latex_parse_error: " if assume_latex else ""
+        return None, f"{prefix}{e}"
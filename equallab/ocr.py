@@ -0,0 +1,445 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from functools import lru_cache
+from typing import Any, Dict, Hashable, Sequence, Tuple
+
+from .cache import CanonicalCache, env_int
+from .disk_cache import get_disk_cache
+
+
+logger = logging.getLogger("equallab.ocr")
+
+# 响应 JSON 中依次尝试的字段：公式识别优先 latex，化学识别优先 text
+LATEX_FIELDS: Tuple[str, ...] = ("latex", "data", "result", "prediction")
+TEXT_FIELDS: Tuple[str, ...] = ("text", "data", "result", "prediction", "latex")
+
+# 视为暂时性故障、值得重试的状态码
+_RETRY_STATUS = frozenset({500, 502, 503, 504})
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def decode_response(content_type: str, body: str, fields: Sequence[str] = LATEX_FIELDS) -> str:
+    """
+    OCR 响应解码：JSON（Content-Type 含 application/json）按 fields 顺序取第一个非空字段，
+    字段值可为字符串、字符串列表（取第一个）或带同名键的对象；列表响应取第一项。其余情况按纯文本处理。
+    """
+    if "application/json" not in (content_type or ""):
+        return body.strip()
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body.strip()
+    if isinstance(data, dict):
+        cand = next((data[k] for k in fields if data.get(k)), None)
+    else:
+        cand = data
+    if isinstance(cand, list):
+        cand = cand[0] if cand else ""
+    if isinstance(cand, dict):
+        cand = next((cand[k] for k in fields if cand.get(k)), "")
+    return cand.strip() if isinstance(cand, str) else ""
+
+
+@lru_cache(maxsize=1024)
+def _file_digest(path: str, stat_key: Tuple[int, int, int, int]) -> str:
+    # stat_key = (st_dev, st_ino, st_size, st_mtime_ns)：文件未变化时不重复读取与哈希
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def image_key(image_path: str) -> Tuple[str, ...]:
+    """
+    图片的缓存标识：本地可读时为内容哈希 ("sha256", hex)，同一照片换路径/文件名仍命中；
+    能 stat 但不可读时为 ("stat", path, mtime_ns, size)；本地不可见（仅 OCR 服务端可见的路径）时为 ("path", path)。
+    """
+    try:
+        st = os.stat(image_path)
+    except OSError:
+        return ("path", image_path)
+    try:
+        return ("sha256", _file_digest(image_path, (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)))
+    except OSError:
+        return ("stat", image_path, st.st_mtime_ns, st.st_size)
+
+
+class OcrCache:
+    """
+    OCR 结果缓存（缓存服务端原始响应 (Content-Type, 正文)，解码在命中后进行，公式/化学两种字段顺序共用同一条目）：
+    - 内存层：CanonicalCache（LRU，受条目数与字节数约束）
+    - 磁盘层：已配置 EQUALLAB_DISK_CACHE 时复用同一 SQLite 磁盘缓存，跨进程/重启共享；命中后回填内存层
+    - ttl 秒后过期（<= 0 表示永不过期），过期条目按未命中处理
+    - 仅 OCR 服务端可见的图片（image_key 为 ("path", path)）无法得知文件是否被原地覆盖，
+      改用较短的 path_ttl（<= 0 表示不缓存这类图片）
+    只缓存成功（200）的响应。max_items=0 表示关闭。
+    """
+
+    def __init__(self, max_items: int = 1024, max_bytes: int = 16 * 1024 * 1024, ttl: float = 86400.0, disk: bool = True, path_ttl: float = 60.0):
+        self.memory = CanonicalCache(max_items=max_items, max_bytes=max_bytes)
+        self.ttl = ttl
+        self.path_ttl = path_ttl
+        self.disk = disk
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.coalesced = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory.max_items > 0
+
+    @staticmethod
+    def _by_path(key: Hashable) -> bool:
+        # 键的最后一项为 image_key（见 OcrClient._cache_key）
+        ident = key[-1] if isinstance(key, tuple) and key else None
+        return isinstance(ident, tuple) and ident[:1] == ("path",)
+
+    def _ttl(self, key: Hashable) -> float:
+        if self._by_path(key):
+            return self.path_ttl if self.ttl <= 0 else min(self.ttl, self.path_ttl)
+        return self.ttl
+
+    def _fresh(self, key: Hashable, stored_at: float) -> bool:
+        ttl = self._ttl(key)
+        return ttl <= 0 or time.time() - stored_at < ttl
+
+    def get(self, key: Hashable) -> Tuple[str, str] | None:
+        found, item = self.memory.get(key)
+        if found:
+            if self._fresh(key, item[1]):
+                with self._lock:
+                    self.hits += 1
+                return item[0]
+            with self._lock:
+                self.expired += 1
+        disk = get_disk_cache() if self.disk else None
+        if disk is not None:
+            found, item = disk.get(("ocr", key))
+            if found and self._fresh(key, item[1]):
+                self.memory.put(key, item)
+                with self._lock:
+                    self.disk_hits += 1
+                return item[0]
+            if found:
+                with self._lock:
+                    self.expired += 1
+        return None
+
+    def put(self, key: Hashable, value: Tuple[str, str]) -> None:
+        if self.path_ttl <= 0 and self._by_path(key):
+            return
+        item = (value, time.time())
+        self.memory.put(key, item)
+        disk = get_disk_cache() if self.disk else None
+        if disk is not None:
+            disk.put(("ocr", key), item)
+
+    def note_miss(self) -> None:
+        # 未命中由真正发往服务端的调用方记录；等待同一图片进行中请求的调用方记为 coalesced
+        with self._lock:
+            self.misses += 1
+
+    def note_coalesced(self) -> None:
+        with self._lock:
+            self.coalesced += 1
+
+    def clear(self) -> None:
+        # 只清内存层；磁盘层与 normalize 结果共用，由 `equallab cache clear` 管理
+        self.memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "memory": self.memory.stats(),
+                "ttl": self.ttl,
+                "path_ttl": self.path_ttl,
+                "disk": self.disk and get_disk_cache() is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "coalesced": self.coalesced,
+                # 未发往 OCR 服务的比例；coalesced（等待进行中请求后命中）已计入 hits
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else None,
+            }
+
+
+_ocr_cache = OcrCache(
+    max_items=env_int("EQUALLAB_OCR_CACHE_MAX_ITEMS", 1024),
+    ttl=_env_float("EQUALLAB_OCR_CACHE_TTL", 86400.0),
+    path_ttl=_env_float("EQUALLAB_OCR_CACHE_PATH_TTL", 60.0),
+)
+
+
+def get_ocr_cache() -> OcrCache:
+    return _ocr_cache
+
+
+class OcrClient:
+    """
+    OCR 服务（如 TexTeller web，接口形如 GET {server_url}?path={image_path}）的 HTTP 客户端：
+    - 复用同一 requests.Session 及其连接池（keep-alive），避免每张图片重新建立 TCP 连接
+    - 连接超时与读取超时分别配置
+    - 连接失败 / 连接超时 / 5xx 时按指数退避（full jitter）重试，至多 retries 次；读取超时不重试（服务端仍在计算）
+    - afetch/arecognize 为 asyncio 版本（httpx.AsyncClient，每个事件循环一个连接池），等待 OCR 时不占用线程
+    - 结果按 (服务地址, image_key) 缓存（见 OcrCache，缺省为进程内共享的 get_ocr_cache()）；
+      同一图片的并发请求只有一个真正发往服务端，其余等待其结果
+    未显式传入的参数取自环境变量 TEXTELLER_SERVER_URL、EQUALLAB_OCR_CONNECT_TIMEOUT（秒，缺省 3.05）、
+    EQUALLAB_OCR_READ_TIMEOUT（缺省 15）、EQUALLAB_OCR_RETRIES（缺省 2）、EQUALLAB_OCR_BACKOFF（缺省 0.5）、
+    EQUALLAB_OCR_POOL_SIZE（保持的 keep-alive 连接数，缺省 16）。
+    """
+
+    def __init__(
+        self,
+        server_url: str | None = None,
+        connect_timeout: float | None = None,
+        read_timeout: float | None = None,
+        retries: int | None = None,
+        backoff: float | None = None,
+        pool_size: int | None = None,
+        cache: OcrCache | None = None,
+    ):
+        self.server_url = server_url or os.getenv("TEXTELLER_SERVER_URL")
+        self.connect_timeout = connect_timeout if connect_timeout is not None else _env_float("EQUALLAB_OCR_CONNECT_TIMEOUT", 3.05)
+        self.read_timeout = read_timeout if read_timeout is not None else _env_float("EQUALLAB_OCR_READ_TIMEOUT", 15.0)
+        self.retries = retries if retries is not None else env_int("EQUALLAB_OCR_RETRIES", 2)
+        self.backoff = backoff if backoff is not None else _env_float("EQUALLAB_OCR_BACKOFF", 0.5)
+        self.pool_size = pool_size if pool_size is not None else env_int("EQUALLAB_OCR_POOL_SIZE", 16)
+        self._session = None
+        self._async_clients: "weakref.WeakKeyDictionary[Any, Any]" = weakref.WeakKeyDictionary()
+        self._pid = None
+        self._lock = threading.Lock()
+        self.cache = cache if cache is not None else get_ocr_cache()
+        # 进行中的请求：缓存键 -> threading.Event（同步）/ (事件循环 id, 缓存键) -> asyncio.Future（异步）
+        self._inflight: Dict[Hashable, threading.Event] = {}
+        self._ainflight: Dict[Hashable, Any] = {}
+        self.requests = 0
+        self.retried = 0
+
+    def _get_session(self):
+        # fork 之后不能复用父进程的连接
+        with self._lock:
+            if self._session is None or self._pid != os.getpid():
+                import requests  # 仅 OCR 路径需要，避免拖慢其它入口的导入
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session, self._pid = session, os.getpid()
+            return self._session
+
+    def _delay(self, attempt: int) -> float:
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    def _check_url(self) -> None:
+        if not self.server_url:
+            raise RuntimeError(
+                "TEXTELLER_SERVER_URL 未设置，请配置指向 OCR 服务的 HTTP 接口，例如 http://127.0.0.1:8502/predict"
+            )
+
+    def _response(self, status: int, content_type: str, text: str, last: bool) -> Tuple[str, str] | None:
+        # 200 返回 (Content-Type, 正文)；可重试的 5xx 且仍有重试次数时返回 None；其余抛出 RuntimeError
+        if status == 200:
+            return content_type or "", text
+        if status not in _RETRY_STATUS or last:
+            raise RuntimeError(f"OCR 服务返回非 200 状态码: {status}, 响应片段: {(text or '')[:200]}")
+        logger.info("OCR server returned %s, retrying", status)
+        return None
+
+    def _cache_key(self, image_path: str) -> Hashable:
+        # 同一图片在不同 OCR 服务（模型/版本）上的结果不同，服务地址也是键的一部分
+        return (self.server_url, image_key(image_path))
+
+    def fetch(self, image_path: str) -> Tuple[str, str]:
+        """识别一张图片，返回 (Content-Type, 响应正文)：先查缓存，未命中时请求服务端（含重试）；失败抛出 RuntimeError。"""
+        self._check_url()
+        if not self.cache.enabled:
+            return self._fetch(image_path)
+        key = self._cache_key(image_path)
+        while True:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            with self._lock:
+                pending = self._inflight.get(key)
+                if pending is None:
+                    done = self._inflight[key] = threading.Event()
+            if pending is None:
+                self.cache.note_miss()
+                break
+            # 同一图片已有请求在进行：等它结束后重新查缓存（它失败时由本线程重试）
+            self.cache.note_coalesced()
+            pending.wait()
+        try:
+            out = self._fetch(image_path)
+            self.cache.put(key, out)
+            return out
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            done.set()
+
+    def _fetch(self, image_path: str) -> Tuple[str, str]:
+        import requests
+
+        session = self._get_session()
+        for attempt in range(self.retries + 1):
+            self.requests += 1
+            last = attempt == self.retries
+            try:
+                resp = session.get(
+                    self.server_url,
+                    params={"path": image_path},
+                    timeout=(self.connect_timeout, self.read_timeout),
+                )
+            except requests.ConnectionError as e:
+                # 含连接超时与复用已被服务端关闭的 keep-alive 连接；ReadTimeout 不在此列
+                if last:
+                    raise RuntimeError(f"HTTP 请求 OCR 服务失败: {e}")
+                logger.info("OCR request failed (%s), retrying", e)
+            except requests.RequestException as e:  # noqa: BLE001
+                raise RuntimeError(f"HTTP 请求 OCR 服务失败: {e}")
+            else:
+                out = self._response(resp.status_code, resp.headers.get("Content-Type"), resp.text, last)
+                if out is not None:
+                    return out
+            self.retried += 1
+            time.sleep(self._delay(attempt))
+        raise AssertionError("unreachable")
+
+    def recognize(self, image_path: str, fields: Sequence[str] = LATEX_FIELDS) -> str:
+        """识别图片并解码为字符串（见 decode_response）；可能为空串，由调用方决定如何处理。"""
+        return decode_response(*self.fetch(image_path), fields=fields)
+
+    def _get_async_client(self):
+        # httpx.AsyncClient 绑定创建它的事件循环；按循环各建一个，循环结束后随之回收
+        import asyncio
+        import httpx  # 仅异步 OCR 路径需要
+
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout, pool=None),
+                limits=httpx.Limits(max_connections=None, max_keepalive_connections=self.pool_size),
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def afetch(self, image_path: str) -> Tuple[str, str]:
+        """fetch 的 asyncio 版本：缓存、合并并发请求、重试策略与错误信息均相同；文件哈希在执行器中计算。"""
+        import asyncio
+
+        self._check_url()
+        loop = asyncio.get_running_loop()
+        if not self.cache.enabled:
+            return await self._afetch(image_path)
+        # 文件哈希与磁盘层读写都是阻塞 I/O，放入执行器
+        key = await loop.run_in_executor(None, self._cache_key, image_path)
+        slot = (id(loop), key)
+        while True:
+            cached = await loop.run_in_executor(None, self.cache.get, key)
+            if cached is not None:
+                return cached
+            pending = self._ainflight.get(slot)
+            if pending is None:
+                done = self._ainflight[slot] = loop.create_future()
+                self.cache.note_miss()
+                break
+            self.cache.note_coalesced()
+            await asyncio.shield(pending)
+        try:
+            out = await self._afetch(image_path)
+            await loop.run_in_executor(None, self.cache.put, key, out)
+            return out
+        finally:
+            self._ainflight.pop(slot, None)
+            done.set_result(None)
+
+    async def _afetch(self, image_path: str) -> Tuple[str, str]:
+        import asyncio
+        import httpx
+
+        client = self._get_async_client()
+        for attempt in range(self.retries + 1):
+            self.requests += 1
+            last = attempt == self.retries
+            try:
+                resp = await client.get(self.server_url, params={"path": image_path})
+            except (httpx.NetworkError, httpx.ConnectTimeout, httpx.RemoteProtocolError) as e:
+                # 与同步版本一致：连接类错误重试，读取超时等其它错误直接失败
+                if last:
+                    raise RuntimeError(f"HTTP 请求 OCR 服务失败: {e!r}")
+                logger.info("OCR request failed (%r), retrying", e)
+            except httpx.HTTPError as e:
+                raise RuntimeError(f"HTTP 请求 OCR 服务失败: {e!r}")
+            else:
+                out = self._response(resp.status_code, resp.headers.get("Content-Type"), resp.text, last)
+                if out is not None:
+                    return out
+            self.retried += 1
+            await asyncio.sleep(self._delay(attempt))
+        raise AssertionError("unreachable")
+
+    async def arecognize(self, image_path: str, fields: Sequence[str] = LATEX_FIELDS) -> str:
+        return decode_response(*(await self.afetch(image_path)), fields=fields)
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环上的异步连接池（如应用关闭时）。"""
+        import asyncio
+
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "server_url": self.server_url,
+            "connect_timeout": self.connect_timeout,
+            "read_timeout": self.read_timeout,
+            "retries": self.retries,
+            "requests": self.requests,
+            "retried": self.retried,
+        }
+
+
+_client: OcrClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_ocr_client() -> OcrClient:
+    """进程内共享的 OCR 客户端（按环境变量配置，首次使用时创建）。"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OcrClient()
+        return _client
+
+
+def configure_ocr_client(server_url: str | None = None, **kwargs: Any) -> OcrClient:
+    """显式配置共享客户端（覆盖环境变量），返回新客户端。"""
+    global _client
+    with _client_lock:
+        _client = OcrClient(server_url, **kwargs)
+        return _client
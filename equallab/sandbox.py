@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import importlib
+import logging
+import multiprocessing as mp
+import os
+import pickle
+import threading
+from typing import Any, Callable, List
+
+try:
+    import resource  # 仅 POSIX 可用
+except ImportError:  # pragma: no cover - Windows
+    resource = None  # type: ignore[assignment]
+
+# multiprocessing 默认的 pickler 无法传递未定义函数（f(x) 中的 f），进出工作进程的数据统一用 serialization.dumps
+from .serialization import dumps
+
+
+logger = logging.getLogger("equallab.sandbox")
+
+# 子进程启动时预加载的模块，避免首个请求承担 SymPy 导入开销
+_PRELOAD = ("sympy", "equallab.similarity.equivalence", "equallab.normalization.to_sympy")
+# 工作进程启动（含预加载）的等待上限；启动耗时不计入单次调用的预算
+_STARTUP_TIMEOUT = 60.0
+
+
+class SymbolicTimeout(TimeoutError):
+    """符号计算超出墙钟或内存预算，工作进程已被杀死并重建。"""
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _worker_main(conn, memory_mb: int) -> None:
+    if memory_mb and resource is not None:
+        limit = memory_mb * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError):
+            pass
+    for mod in _PRELOAD:
+        try:
+            importlib.import_module(mod)
+        except Exception:  # noqa: BLE001
+            pass
+    conn.send_bytes(dumps(("ready", None)))
+    while True:
+        try:
+            func, args = pickle.loads(conn.recv_bytes())
+        except (EOFError, OSError):
+            break
+        try:
+            reply = ("ok", func(*args))
+        except MemoryError:
+            reply = ("oom", None)
+        except Exception as e:  # noqa: BLE001
+            reply = ("err", e)
+        try:
+            data = dumps(reply)
+        except Exception as e:  # noqa: BLE001
+            # 结果或异常无法序列化
+            data = dumps(("err", RuntimeError(f"unpicklable sandbox result: {e!r}")))
+        conn.send_bytes(data)
+
+
+class _Worker:
+    def __init__(self, ctx, memory_mb: int):
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_main, args=(child, memory_mb), daemon=True)
+        self.proc.start()
+        child.close()
+        self.ready = False
+
+    def wait_ready(self) -> None:
+        if self.ready:
+            return
+        if not self.conn.poll(_STARTUP_TIMEOUT):
+            raise OSError("sandbox worker failed to start")
+        self.conn.recv_bytes()
+        self.ready = True
+
+    def call(self, payload: bytes, timeout: float) -> Any:
+        self.wait_ready()
+        self.conn.send_bytes(payload)
+        if not self.conn.poll(timeout):
+            raise SymbolicTimeout(f"symbolic computation exceeded {timeout:g}s")
+        try:
+            status, value = pickle.loads(self.conn.recv_bytes())
+        except (EOFError, OSError):
+            # 子进程被内核杀死（通常是超出内存预算）
+            raise SymbolicTimeout("sandbox worker died (memory budget exceeded?)")
+        if status == "oom":
+            raise SymbolicTimeout("symbolic computation exceeded memory budget")
+        if status == "err":
+            raise value
+        return value
+
+    def kill(self) -> None:
+        try:
+            self.proc.kill()
+            self.proc.join(1)
+        finally:
+            self.conn.close()
+
+
+class SymbolicSandbox:
+    """
+    受监管的符号计算工作进程池：
+    - 每次调用有硬性墙钟上限（timeout 秒）与内存上限（memory_mb，RLIMIT_AS）
+    - 超限的工作进程被杀死，并在后台重建，调用方收到 SymbolicTimeout
+    - 最多 max_workers 个并发调用，其余调用排队
+    """
+
+    def __init__(self, timeout: float = 10.0, memory_mb: int = 1024, max_workers: int = 2):
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.max_workers = max_workers
+        self._ctx = mp.get_context("spawn")
+        self._idle: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    def warm(self) -> None:
+        """预先启动全部工作进程。"""
+        with self._lock:
+            missing = self.max_workers - len(self._idle)
+        for _ in range(missing):
+            self._replenish()
+
+    def _replenish(self) -> None:
+        worker = _Worker(self._ctx, self.memory_mb)
+        try:
+            worker.wait_ready()
+        except (EOFError, OSError):
+            worker.kill()
+            return
+        self._release(worker)
+
+    def _release(self, worker: _Worker) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_workers:
+                self._idle.append(worker)
+                return
+        worker.kill()
+
+    def _acquire(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.proc.is_alive():
+                    return worker
+                worker.kill()
+        return _Worker(self._ctx, self.memory_mb)
+
+    def run(self, func: Callable, *args: Any, timeout: float | None = None) -> Any:
+        """
+        在工作进程中执行 func(*args)；func 与参数须可 pickle（模块级函数、SymPy 表达式等）。
+        无法序列化的调用（如含 lambda）退回当前进程执行，不受预算约束。
+        """
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            payload = dumps((func, args))
+        except Exception as e:  # noqa: BLE001
+            logger.debug("running %r in-process, arguments not picklable: %r", func, e)
+            return func(*args)
+        with self._slots:
+            worker = self._acquire()
+            try:
+                result = worker.call(payload, timeout)
+            except SymbolicTimeout as e:
+                logger.warning("killing sandbox worker pid=%s: %s", worker.proc.pid, e)
+                worker.kill()
+                threading.Thread(target=self._replenish, daemon=True).start()
+                raise
+            except (EOFError, OSError, BrokenPipeError):
+                worker.kill()
+                raise
+            except BaseException:
+                # func 自身抛出的异常：工作进程状态完好，归还
+                self._release(worker)
+                raise
+            self._release(worker)
+            return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            workers, self._idle = self._idle, []
+        for w in workers:
+            w.kill()
+
+
+_sandbox: SymbolicSandbox | None = None
+_sandbox_lock = threading.Lock()
+_enabled = os.getenv("EQUALLAB_SANDBOX", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def get_sandbox() -> SymbolicSandbox:
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is None:
+            _sandbox = SymbolicSandbox(
+                timeout=_env_float("EQUALLAB_SYMBOLIC_TIMEOUT", 10.0),
+                memory_mb=int(_env_float("EQUALLAB_SYMBOLIC_MEMORY_MB", 1024)),
+                max_workers=max(1, int(_env_float("EQUALLAB_SANDBOX_WORKERS", min(4, os.cpu_count() or 1)))),
+            )
+        return _sandbox
+
+
+def enable_sandbox(enabled: bool = True, warm: bool = True) -> None:
+    """开启/关闭符号计算子进程隔离（默认关闭；环境变量 EQUALLAB_SANDBOX=1 或 Web 服务启动时开启）。"""
+    global _enabled
+    _enabled = enabled
+    if enabled and warm:
+        threading.Thread(target=get_sandbox().warm, daemon=True).start()
+
+
+def sandbox_enabled() -> bool:
+    return _enabled
+
+
+def run_symbolic(func: Callable, *args: Any, timeout: float | None = None) -> Any:
+    """
+    执行一次可能失控的符号计算：开启隔离时在受监管子进程中执行（超限抛出 SymbolicTimeout），
+    否则在当前进程直接调用。
+    """
+    if not _enabled:
+        return func(*args)
+    return get_sandbox().run(func, *args, timeout=timeout)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import ast
+import io
+import pickle
+import sys
+from typing import Any, Dict
+
+
+def _unevaluated(cls, *args):
+    return cls(*args, evaluate=False)
+
+
+def _sympy_types():
+    # 仅当进程已导入 SymPy 时才可能遇到 SymPy 对象；不为此主动导入（cache stats/clear 等入口用不到）
+    if "sympy" not in sys.modules:
+        return None
+    import sympy as sp
+    from sympy.core.function import UndefinedFunction
+
+    Pickler._types = (sp.Function, UndefinedFunction, (sp.Add, sp.Mul, sp.Pow, sp.Function))
+    return Pickler._types
+
+
+class Pickler(pickle.Pickler):
+    """
+    保持 SymPy 表达式树形的 pickler（供沙箱进程间传递与磁盘缓存使用）：
+    - 解析得到的未定义函数（f(x) 中的 f）是动态类，按名称查找会失败，改为按 Function(name) 重建
+    - 默认 pickle 经构造函数重建会再次求值，把 evaluate=False 解析得到的未求值树（x + x、log(x, E) 等）化简；
+      Add/Mul/Pow/函数以 evaluate=False 按原参数重建
+    反序列化用普通 pickle.loads 即可。
+    """
+
+    _types = None
+
+    def reducer_override(self, obj):
+        types = Pickler._types or _sympy_types()
+        if types is None:
+            return NotImplemented
+        function, undefined, unevaluated = types
+        if isinstance(obj, undefined):
+            return function, (obj.__name__,), None, None, None, None
+        if isinstance(obj, unevaluated):
+            return _unevaluated, (type(obj), *obj.args)
+        return NotImplemented
+
+
+def dumps(obj: Any) -> bytes:
+    """用 Pickler 序列化 obj（最高协议）。"""
+    buf = io.BytesIO()
+    Pickler(buf, protocol=pickle.HIGHEST_PROTOCOL).dump(obj)
+    return buf.getvalue()
+
+
+def _basic_classes(sp) -> Dict[str, type]:
+    global _BASIC_CLASSES
+    if _BASIC_CLASSES is None:
+        classes: Dict[str, type] = {}
+        stack = [sp.Basic]
+        while stack:
+            cls = stack.pop()
+            classes.setdefault(cls.__name__, cls)
+            stack.extend(cls.__subclasses__())
+        _BASIC_CLASSES = classes
+    return _BASIC_CLASSES
+
+
+_BASIC_CLASSES: Dict[str, type] | None = None
+
+
+def _srepr_node(node: ast.AST, sp) -> Any:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str, bool, type(None))):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _srepr_node(node.operand, sp)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return -value if isinstance(node.op, ast.USub) else value
+    elif isinstance(node, (ast.Tuple, ast.List)):
+        return tuple(_srepr_node(e, sp) for e in node.elts)
+    elif isinstance(node, ast.Name):
+        # 只认 SymPy 类与 sympy 顶层单例（Symbol、Add、pi、oo ……）；ExprCondPair 等未在顶层导出的类按类名查找
+        value = getattr(sp, node.id, None)
+        if isinstance(value, sp.Basic) or (isinstance(value, type) and issubclass(value, sp.Basic)):
+            return value
+        value = _basic_classes(sp).get(node.id)
+        if value is not None:
+            return value
+        raise ValueError(f"srepr: name not allowed: {node.id}")
+    elif isinstance(node, ast.Call):
+        func = _srepr_node(node.func, sp)
+        if not (isinstance(func, type) and issubclass(func, sp.Basic)):
+            raise ValueError("srepr: call target is not a SymPy class")
+        args = [_srepr_node(a, sp) for a in node.args]
+        kwargs = {}
+        for kw in node.keywords:
+            if kw.arg is None:
+                raise ValueError("srepr: ** arguments not allowed")
+            kwargs[kw.arg] = _srepr_node(kw.value, sp)
+        return func(*args, **kwargs)
+    raise ValueError(f"srepr: unsupported syntax: {type(node).__name__}")
+
+
+def from_srepr(text: str) -> Any:
+    """
+    由 sympy.srepr 文本重建表达式，不经 eval/sympify：
+    只接受 SymPy 类的调用、SymPy 单例与字面量，其余语法（属性访问、下标、任意名字）一律 ValueError。
+    与 sympify(srepr) 一样按求值构造（srepr 中 Mul 的因子按打印顺序排列，未求值重建得到的树与原式不相等）。
+    """
+    import sympy as sp
+
+    try:
+        tree = ast.parse(text, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"srepr: {e}") from e
+    return _srepr_node(tree.body, sp)
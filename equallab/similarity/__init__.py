@@ -1,11 +1,17 @@
 from .equivalence import are_equivalent, EquivalenceResult
-from .structure import structure_similarity
+from .structure import structure_similarity, expr_fingerprint, StructureFingerprint
+from .tree_edit import tree_edit_distance, tree_edit_similarity, TreeEditResult
 from .scorer import similarity, SimilarityResult
 
 __all__ = [
     "are_equivalent",
     "EquivalenceResult",
     "structure_similarity",
+    "expr_fingerprint",
+    "StructureFingerprint",
+    "tree_edit_distance",
+    "tree_edit_similarity",
+    "TreeEditResult",
     "similarity",
     "SimilarityResult",
 ]
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+import numpy as np
+import sympy as sp
+
+from .equivalence import _prepare, are_equivalent
+from .numeric import compile_numeric, evaluate, sample_matrix
+
+
+# 数值指纹的分格：t = asinh(v * rtol / _ATOL) / rtol 取整（rtol = 10 ** -digits）。
+# |v| 远小于 _ATOL / rtol 时格宽约为 _ATOL（绝对容差），远大于时约为 rtol * |v|（相对容差）；
+# 0 位于格子中心，1e-17 与 -3e-18 这类舍入噪声落在同一格
+_ATOL = 1e-10
+# 距格边界不足 _MARGIN 格的分量视为贴近边界：等价表达式的值可能落在相邻格，相邻格也作为候选键
+_MARGIN = 0.01
+# 单个表达式至多展开的贴近边界分量数（候选键至多 2 ** _MAX_NEAR 个）
+_MAX_NEAR = 8
+
+
+def _cell_keys(values: np.ndarray, digits: int) -> List[Tuple]:
+    """values 为一个表达式在各采样点上的复数值；返回候选键列表，首个为值本身所在格，其余为贴近边界时的相邻格组合。"""
+    rtol = 10.0 ** -digits
+    parts = np.concatenate([values.real, values.imag])
+    finite = np.concatenate([np.isfinite(values)] * 2)
+    with np.errstate(all="ignore"):
+        t = np.arcsinh(np.where(finite, parts, 0.0) * (rtol / _ATOL)) / rtol
+    cells = np.rint(t)
+    offset = t - cells
+    keys = [tuple(int(c) if f else None for c, f in zip(cells, finite))]
+    for i in np.flatnonzero(finite & (np.abs(offset) > 0.5 - _MARGIN))[:_MAX_NEAR]:
+        step = 1 if offset[i] > 0 else -1
+        keys += [k[:i] + (k[i] + step,) + k[i + 1:] for k in keys]
+    return keys
+
+
+def numeric_fingerprints(exprs: Sequence[sp.Expr], samples: int = 16, digits: int = 8, seed: int = 2024, assumptions: Dict | None = None) -> List[List[Tuple] | None]:
+    """
+    在一组固定的随机实数点上对每个表达式求值（同名符号取同一值），将值向量分格（见 _cell_keys）作为桶键。
+    每个表达式返回候选键列表（首个为所在格）；无法数值求值的表达式返回 None。
+    """
+    prepared = [_prepare(e, assumptions) for e in exprs]
+    by_name: Dict[str, sp.Symbol] = {}
+    for e in prepared:
+        for s in e.free_symbols:
+            by_name.setdefault(s.name, s)
+    names = sorted(by_name)
+    # 全部取浮点样本点，避免整数点恰好落在可去奇点上
+    points = sample_matrix([by_name[n] for n in names], samples, seed=seed, int_points=0)
+
+    keys: List[List[Tuple] | None] = []
+    seen: Dict[sp.Expr, List[Tuple] | None] = {}
+    for e in prepared:
+        # 重复提交的相同表达式只求值一次
+        if e in seen:
+            keys.append(seen[e])
+            continue
+        own = {s.name: s for s in e.free_symbols}
+        args = [own.get(n, sp.Dummy(n)) for n in names]
+        func = compile_numeric([e], args)
+        vals = evaluate(func, points) if func is not None else None
+        key = _cell_keys(vals[0], digits) if vals is not None else None
+        seen[e] = key
+        keys.append(key)
+    return keys
+
+
+def cluster_expressions(exprs: Sequence[sp.Expr], samples: int = 16, digits: int = 8, assumptions: Dict | None = None, confirm: bool = True) -> List[List[int]]:
+    """
+    将 N 个表达式划分为等价类（返回下标列表，类内首个下标为代表）：
+    - 每个表达式只数值求值一次，按数值指纹分格（线性于 N），贴近格边界的值同时登记相邻格
+    - confirm=True 时仅与同格各类代表做 are_equivalent 确认；无法数值求值的表达式归入同一回退组
+    """
+    keys = numeric_fingerprints(exprs, samples=samples, digits=digits, assumptions=assumptions)
+    classes: List[List[int]] = []
+    # 候选键 -> 登记在该格的类（classes 下标）；类在其代表的全部候选键下登记，新表达式只按所在格查找：
+    # 与代表等价的值若落在不同格，代表必然贴近该格边界，相邻格已在其候选键中
+    registry: Dict[Hashable, List[int]] = defaultdict(list)
+    fallback: List[int] = []
+    same: Dict[sp.Expr, int] = {}
+
+    def _join(i: int, candidates: List[int]) -> bool:
+        # 结构相同的表达式直接归入同一类；否则与候选类的代表做符号确认（confirm=False 时直接归入首个候选类）
+        if exprs[i] in same:
+            c = same[exprs[i]]
+        else:
+            c = next((c for c in candidates if not confirm or are_equivalent(exprs[classes[c][0]], exprs[i], assumptions=assumptions).is_equivalent), None)
+            if c is None:
+                return False
+        classes[c].append(i)
+        same.setdefault(exprs[i], c)
+        return True
+
+    for i, cand in enumerate(keys):
+        # 无法数值求值的表达式归入同一回退组
+        candidates = fallback if cand is None else registry.get(cand[0], [])
+        if _join(i, candidates):
+            continue
+        same[exprs[i]] = len(classes)
+        if cand is None:
+            fallback.append(len(classes))
+        else:
+            for key in cand:
+                registry[key].append(len(classes))
+        classes.append([i])
+    return classes
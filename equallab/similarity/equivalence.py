@@ -1,12 +1,32 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, Iterable, List, Tuple
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Sequence, Tuple
 
+import json
 import random
+import time
 import sympy as sp
 
 from equallab.assumptions.config import apply_assumptions
+from equallab.cache import cached_transform
+from equallab.normalization.carrier import NormalizedExpr
+from equallab.sandbox import SymbolicTimeout, run_symbolic
+from .numeric import confirm_mismatch, numeric_check, numeric_refute
+from .pit import pit_equal
+
+# SymPy 逐点回退路径的采样上限（NumPy 路径不受此限制）
+_SLOW_PATH_SAMPLES = 8
+
+# 默认阶段顺序：由便宜到昂贵，任一阶段得出结论即短路返回
+#   identical: 预处理后结构相同（哈希比较）
+#   pit:       有理函数输入的有限域随机恒等检验（精确整数运算，附假阳性概率上界）
+#   probe:     少量数值探针，快速否定明显不等价的输入；不一致的点经高精度复核后才判定不等价
+#   cheap:     expand/cancel 代数归一
+#   simplify:  doit → trigsimp → simplify → 对数展开/合并 的完整化简
+#   sample:    完整数值采样
+DEFAULT_STAGES: Tuple[str, ...] = ("identical", "pit", "probe", "cheap", "simplify", "sample")
+
 
 @dataclass
 class EquivalenceResult:
@@ -15,6 +35,9 @@ class EquivalenceResult:
     samples_total: int
     samples_success: int
     message: str | None = None
+    timings: Dict[str, float] = field(default_factory=dict)  # 各阶段耗时（毫秒）
+    timeout: bool = False  # 符号阶段超出预算，结论退化为数值判定
+    error_bound: float | None = None  # 随机化判定（pit）的假阳性概率上界
 
 
 def _symbol_list(expr: sp.Expr) -> List[sp.Symbol]:
@@ -38,67 +61,92 @@ def _safe_eval(expr: sp.Expr, subs: Dict[sp.Symbol, int]) -> Tuple[sp.Expr | Non
         v = sp.N(expr.subs(subs))
         if v.has(sp.zoo, sp.oo, sp.nan):
             return None, "non-finite"
+        if not v.is_number:
+            # 含未定义函数等无法取数值的部分（如 f(1)），该点无法比较
+            return None, "non-numeric"
         return v, None
     except Exception as e:  # noqa: BLE001
         return None, str(e)
 
 
-def are_equivalent(expr1: sp.Expr, expr2: sp.Expr, samples: int = 8, tol: float = 1e-8, assumptions: Dict | None = None) -> EquivalenceResult:
-    # 预处理：将自由符号统一设为实数，并将 sqrt(z**2) -> Abs(z)
-    def _assume_real(e: sp.Expr) -> sp.Expr:
-        symbols = {s for s in e.free_symbols}
-        mapping = {s: sp.Symbol(s.name, real=True) for s in symbols}
-        return e.xreplace(mapping)
+def _assume_real(e: sp.Expr) -> sp.Expr:
+    symbols = {s for s in e.free_symbols}
+    mapping = {s: sp.Symbol(s.name, real=True) for s in symbols}
+    return e.xreplace(mapping)
+
+
+def _sqrt_to_abs(e: sp.Expr) -> sp.Expr:
+    z = sp.Wild('z')
+    pattern1 = sp.sqrt(z**2)
+    pattern2 = (z**2) ** sp.Rational(1, 2)
+    e = e.replace(pattern1, sp.Abs(z))
+    e = e.replace(pattern2, sp.Abs(z))
+    return e
 
-    def _sqrt_to_abs(e: sp.Expr) -> sp.Expr:
-        z = sp.Wild('z')
-        pattern1 = sp.sqrt(z**2)
-        pattern2 = (z**2) ** sp.Rational(1, 2)
-        e = e.replace(pattern1, sp.Abs(z))
-        e = e.replace(pattern2, sp.Abs(z))
-        return e
 
-    def _log_E_pow(e: sp.Expr) -> sp.Expr:
-        z = sp.Wild('z')
-        pattern = sp.log(sp.E**z)
-        return e.replace(pattern, z)
+def _log_E_pow(e: sp.Expr) -> sp.Expr:
+    z = sp.Wild('z')
+    pattern = sp.log(sp.E**z)
+    return e.replace(pattern, z)
 
-    # 应用外部假设
+
+def _prepare(expr: sp.Expr, assumptions: Dict | None) -> sp.Expr:
+    # 预处理：应用外部假设（缺省将自由符号统一设为实数），并将 sqrt(z**2) -> Abs(z)
     if assumptions:
-        expr1 = apply_assumptions(expr1, assumptions)
-        expr2 = apply_assumptions(expr2, assumptions)
+        expr = apply_assumptions(expr, assumptions)
     else:
-        expr1 = _assume_real(expr1)
-        expr2 = _assume_real(expr2)
-    expr1 = _sqrt_to_abs(expr1)
-    expr2 = _sqrt_to_abs(expr2)
+        expr = _assume_real(expr)
+    return _sqrt_to_abs(expr)
 
-    # 1) 符号化简判定
-    try:
-        # 先执行显式计算（积分/求和/极限等），再做常见三角代数简化
-        e1 = sp.simplify(sp.trigsimp(expr1.doit(deep=True), deep=True))
-        e2 = sp.simplify(sp.trigsimp(expr2.doit(deep=True), deep=True))
-        # 显式归一化
-        e1 = _log_E_pow(_sqrt_to_abs(e1))
-        e2 = _log_E_pow(_sqrt_to_abs(e2))
-        # 日志/指数：展开与合并
-        e1 = sp.simplify(sp.logcombine(sp.expand_log(e1, force=True), force=True))
-        e2 = sp.simplify(sp.logcombine(sp.expand_log(e2, force=True), force=True))
-        diff = sp.simplify(sp.together(e1 - e2))
-        if diff == 0 or getattr(diff, "is_zero", False) or diff.equals(0):
-            return EquivalenceResult(True, "symbolic", 0, 0, None)
-        # 某些表达式 simplify 后仍可进一步判断
-        if sp.simplify(diff) == 0 or sp.simplify(diff).equals(0):
-            return EquivalenceResult(True, "symbolic", 0, 0, None)
-    except Exception:
-        diff = expr1 - expr2
-
-    # 2) 数值采样
-    symbols = set(expr1.free_symbols) | set(expr2.free_symbols)
+
+def _cheap_form(e: sp.Expr) -> sp.Expr:
+    # 仅做多项式展开与有理式约分，不触发 doit/simplify
+    return sp.cancel(sp.expand(e))
+
+
+def _full_form(e: sp.Expr) -> sp.Expr:
+    # 先执行显式计算（积分/求和/极限等），再做常见三角代数简化
+    e = sp.simplify(sp.trigsimp(e.doit(deep=True), deep=True))
+    # 显式归一化
+    e = _log_E_pow(_sqrt_to_abs(e))
+    # 日志/指数：展开与合并
+    return sp.simplify(sp.logcombine(sp.expand_log(e, force=True), force=True))
+
+
+def _is_zero(diff: sp.Expr) -> bool:
+    return diff == 0 or bool(getattr(diff, "is_zero", False)) or diff.equals(0)
+
+
+def _cheap_stage(c1: NormalizedExpr, c2: NormalizedExpr) -> sp.Expr:
+    f1 = c1.derive("equiv-cheap", lambda e: cached_transform("equiv-cheap", e, lambda x: run_symbolic(_cheap_form, x)))
+    f2 = c2.derive("equiv-cheap", lambda e: cached_transform("equiv-cheap", e, lambda x: run_symbolic(_cheap_form, x)))
+    return run_symbolic(sp.cancel, f1 - f2)
+
+
+def _diff_zero(f1: sp.Expr, f2: sp.Expr) -> sp.Tuple:
+    diff = sp.simplify(sp.together(f1 - f2))
+    if _is_zero(diff):
+        return sp.Tuple(sp.true, diff)
+    # 某些表达式 simplify 后仍可进一步判断
+    d2 = sp.simplify(diff)
+    return sp.Tuple(sp.true if (d2 == 0 or d2.equals(0)) else sp.false, diff)
+
+
+def _simplify_stage(c1: NormalizedExpr, c2: NormalizedExpr) -> Tuple[bool, sp.Expr]:
+    # 单侧完整化简在载体上记忆化，并与两侧差式化简一样按 α-换名后的规范形进程级缓存
+    f1 = c1.derive("equiv-full", lambda e: cached_transform("equiv-full", e, lambda x: run_symbolic(_full_form, x)))
+    f2 = c2.derive("equiv-full", lambda e: cached_transform("equiv-full", e, lambda x: run_symbolic(_full_form, x)))
+    ok, diff = cached_transform("equiv-diff", sp.Tuple(f1, f2), lambda t: run_symbolic(_diff_zero, *t))
+    return bool(ok), diff
+
+
+def _sample(diff: sp.Expr, symbols: set, samples: int, tol: float) -> EquivalenceResult:
     # 常量表达式：直接比较
     if not symbols:
         try:
             val = sp.N(diff)
+            if not val.is_number:
+                return EquivalenceResult(False, "numeric-none", 0, 0, "expression has no numeric value")
             if sp.Abs(val) < tol:
                 return EquivalenceResult(True, "numeric-const", 0, 0, None)
             return EquivalenceResult(False, "numeric-const", 0, 0, None)
@@ -107,7 +155,17 @@ def are_equivalent(expr1: sp.Expr, expr2: sp.Expr, samples: int = 8, tol: float
 
     # 分母为 0 的过滤依据
     denom = sp.denom(sp.together(diff))
+    sym_list = sorted(symbols | diff.free_symbols, key=lambda s: s.name)
+
+    # 优先走 NumPy 向量化路径：一次 lambdify，批量求值并用数组掩码过滤
+    outcome = numeric_check(diff, denom, sym_list, samples, tol)
+    if outcome is not None:
+        if outcome.tried == 0:
+            return EquivalenceResult(False, "numeric-none", 0, 0, "no valid samples")
+        return EquivalenceResult(outcome.success == outcome.tried, "numeric", outcome.tried, outcome.success, None)
 
+    # 回退：SymPy 逐点代入
+    samples = min(samples, _SLOW_PATH_SAMPLES)
     successes = 0
     tried = 0
     for sub in _generate_samples(symbols, n=samples):
@@ -131,6 +189,92 @@ def are_equivalent(expr1: sp.Expr, expr2: sp.Expr, samples: int = 8, tol: float
     if tried == 0:
         return EquivalenceResult(False, "numeric-none", 0, 0, "no valid samples")
 
-    return EquivalenceResult(successes == tried, "numeric", tried, successes, None)
+    return EquivalenceResult(successes == tried, "numeric-sympy", tried, successes, None)
+
+
+def are_equivalent(
+    expr1: sp.Expr | NormalizedExpr,
+    expr2: sp.Expr | NormalizedExpr,
+    samples: int = 64,
+    tol: float = 1e-8,
+    assumptions: Dict | None = None,
+    stages: Sequence[str] | None = None,
+    probe_samples: int = 6,
+) -> EquivalenceResult:
+    """
+    分阶段等价判定（见 DEFAULT_STAGES），由便宜到昂贵依次执行，任一阶段得出结论即返回。
+    stages 可裁剪或调整阶段；各阶段耗时（毫秒）写入结果的 timings。
+    符号阶段经 run_symbolic 执行：若超出沙箱预算，跳过其余符号阶段，以数值采样结论返回并置 timeout=True。
+    输入可为 NormalizedExpr：预处理结果与各阶段的单侧派生形式缓存在载体上，供同一请求内复用。
+    """
+    stages = tuple(stages) if stages is not None else DEFAULT_STAGES
+    unknown = set(stages) - set(DEFAULT_STAGES)
+    if unknown:
+        raise ValueError(f"unknown equivalence stages: {sorted(unknown)}")
+
+    timings: Dict[str, float] = {}
+    timed_out = False
+
+    def _done(res: EquivalenceResult) -> EquivalenceResult:
+        res.timings = timings
+        if timed_out:
+            res.timeout = True
+            res.message = res.message or "symbolic stage timed out; numeric verdict"
+        return res
+
+    key = ("prepared", json.dumps(assumptions or {}, sort_keys=True, default=str))
+    c1 = NormalizedExpr.wrap(expr1).child(key, lambda e: _prepare(e, assumptions))
+    c2 = NormalizedExpr.wrap(expr2).child(key, lambda e: _prepare(e, assumptions))
+    expr1, expr2 = c1.expr, c2.expr
+    symbols = set(expr1.free_symbols) | set(expr2.free_symbols)
+    sym_list = sorted(symbols, key=lambda s: s.name)
+    diff = expr1 - expr2
+
+    for stage in stages:
+        start = time.perf_counter()
+        try:
+            if stage == "identical":
+                if expr1 == expr2:
+                    return _done(EquivalenceResult(True, "identical", 0, 0, None))
+
+            elif stage == "probe":
+                probe = numeric_refute(c1.lambdified(sym_list), c2.lambdified(sym_list), sym_list, n=probe_samples)
+                # 双精度下的灾难性相消（如 (x+10**8)**2 - 10**16 - 2*10**8*x）会给出假的不一致，逐点高精度复核
+                if probe is not None and probe.success < probe.tried and confirm_mismatch(expr1, expr2, sym_list, probe.mismatches):
+                    return _done(EquivalenceResult(False, "numeric-probe", probe.tried, probe.success, None))
+
+            elif stage == "pit":
+                pit = pit_equal(expr1, expr2, sym_list)
+                if pit is not None:
+                    res = EquivalenceResult(pit.equal, "pit", pit.trials, pit.trials if pit.equal else pit.trials - 1, None)
+                    res.error_bound = pit.error_bound
+                    return _done(res)
+
+            elif stage == "cheap" and not timed_out:
+                try:
+                    d = _cheap_stage(c1, c2)
+                    if d == 0:
+                        return _done(EquivalenceResult(True, "symbolic-cheap", 0, 0, None))
+                    diff = d
+                except SymbolicTimeout:
+                    timed_out = True
+                except Exception:  # noqa: BLE001
+                    pass
+
+            elif stage == "simplify" and not timed_out:
+                try:
+                    ok, d = _simplify_stage(c1, c2)
+                    if ok:
+                        return _done(EquivalenceResult(True, "symbolic", 0, 0, None))
+                    diff = d
+                except SymbolicTimeout:
+                    timed_out = True
+                except Exception:  # noqa: BLE001
+                    pass
 
+            elif stage == "sample":
+                return _done(_sample(diff, symbols, samples, tol))
+        finally:
+            timings[stage] = round((time.perf_counter() - start) * 1000, 3)
 
+    return _done(EquivalenceResult(False, "undecided", 0, 0, "no stage reached a verdict"))
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+import hashlib
+import json
+import threading
+import numpy as np
+import sympy as sp
+
+from ..serialization import from_srepr
+from .structure import expr_fingerprint, label_of
+
+
+# MinHash 使用的梅森素数模数；特征哈希取 32 位、系数取 31 位，保证 a*x + b 不溢出 uint64
+_MERSENNE = np.uint64((1 << 61) - 1)
+
+
+def _stable_hash(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def structure_features(expr: sp.Basic) -> Set[str]:
+    """结构指纹中的节点标签与边标签集合（稳定字符串，可跨进程持久化）。"""
+    fp = expr_fingerprint(expr)
+    feats = {f"N:{label_of(k)}" for k in fp.nodes}
+    feats.update(f"E:{label_of(u)}>{label_of(v)}" for u, v in fp.edges)
+    return feats
+
+
+class ExpressionIndex:
+    """
+    参考表达式库的近邻索引：
+    - 每条参考表达式存储其结构特征的 MinHash 签名（num_perm 个哈希），按 bands 分段做 LSH 分桶
+    - query 只检查与查询落入同一桶的候选，按估计 Jaccard 排序返回 top-k（亚线性）
+    - 候选再交给 are_equivalent 做精确判定
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._exprs: Dict[str, sp.Expr] = {}
+        self._sigs: Dict[str, np.ndarray] = {}
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = defaultdict(set)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._sigs)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._sigs
+
+    def signature(self, expr: sp.Basic) -> np.ndarray:
+        feats = structure_features(expr)
+        xs = np.fromiter((_stable_hash(f) for f in feats), dtype=np.uint64, count=len(feats))
+        if xs.size == 0:
+            return np.full(self.num_perm, _MERSENNE, dtype=np.uint64)
+        return ((np.outer(self._a, xs) + self._b[:, None]) % _MERSENNE).min(axis=1)
+
+    def _band_keys(self, sig: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for band in range(self.bands):
+            yield band, sig[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key: str, expr: sp.Expr) -> None:
+        sig = self.signature(expr)
+        with self._lock:
+            if key in self._sigs:
+                self.remove(key)
+            self._exprs[key] = expr
+            self._sigs[key] = sig
+            for bk in self._band_keys(sig):
+                self._buckets[bk].add(key)
+
+    def remove(self, key: str) -> bool:
+        with self._lock:
+            sig = self._sigs.pop(key, None)
+            if sig is None:
+                return False
+            self._exprs.pop(key, None)
+            for bk in self._band_keys(sig):
+                bucket = self._buckets.get(bk)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[bk]
+            return True
+
+    def get(self, key: str) -> sp.Expr | None:
+        return self._exprs.get(key)
+
+    def query(self, expr: sp.Basic, k: int = 10) -> List[Tuple[str, float]]:
+        """返回 [(key, 估计 Jaccard)]，按相似度降序，至多 k 个。"""
+        sig = self.signature(expr)
+        with self._lock:
+            candidates: Set[str] = set()
+            for bk in self._band_keys(sig):
+                candidates |= self._buckets.get(bk, set())
+            scored = [(key, float(np.mean(self._sigs[key] == sig))) for key in candidates]
+        scored.sort(key=lambda t: (-t[1], t[0]))
+        return scored[:k]
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            data = {
+                "num_perm": self.num_perm,
+                "bands": self.bands,
+                "seed": self.seed,
+                "entries": {key: {"expr": sp.srepr(self._exprs[key]), "sig": self._sigs[key].tolist()} for key in self._sigs},
+            }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "ExpressionIndex":
+        """
+        读取 save 写出的索引文件。表达式经 from_srepr 重建（不 eval 文件内容），
+        但签名按原样采信、表达式按求值构造，文件仍应来自可信来源（由本服务 /index/save 生成）。
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(num_perm=data["num_perm"], bands=data["bands"], seed=data["seed"])
+        for key, entry in data.get("entries", {}).items():
+            sig = np.asarray(entry["sig"], dtype=np.uint64)
+            index._exprs[key] = from_srepr(entry["expr"])
+            index._sigs[key] = sig
+            for bk in index._band_keys(sig):
+                index._buckets[bk].add(key)
+        return index
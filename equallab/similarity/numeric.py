@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, List, Sequence
+
+import numpy as np
+import sympy as sp
+
+
+# 与旧版逐点采样保持一致的整数取值域（避开 0）
+_INT_DOMAIN = np.array([-3, -2, -1, 1, 2, 3], dtype=float)
+# 分母绝对值低于该阈值的样本视为落在极点上
+_DENOM_EPS = 1e-12
+
+
+@dataclass
+class NumericOutcome:
+    tried: int
+    success: int
+    mismatches: np.ndarray | None = None  # numeric_refute：两侧不一致的采样点，形如 (len(symbols), k)
+
+
+def sample_matrix(symbols: Sequence[sp.Symbol], n: int, seed: int = 42, int_points: int = 8) -> np.ndarray:
+    """
+    生成形如 (len(symbols), n) 的采样矩阵（complex128，取值均为实数）：
+    - 前 int_points 列取自整数域 [-3..3]\\{0}，其余列为 ±[0.25, 3] 内的随机浮点，降低命中可去奇点的概率
+    - 遵循符号假设：integer 只取整数，positive/nonnegative 只取正值
+    """
+    rng = np.random.default_rng(seed)
+    n_int = min(n, int_points)
+    out = np.empty((len(symbols), n), dtype=np.complex128)
+    for i, s in enumerate(symbols):
+        if s.is_integer:
+            row = rng.choice(np.arange(-9, 10)[np.arange(-9, 10) != 0], size=n).astype(float)
+        else:
+            ints = rng.choice(_INT_DOMAIN, size=n_int)
+            floats = rng.uniform(0.25, 3.0, size=n - n_int) * rng.choice([-1.0, 1.0], size=n - n_int)
+            row = np.concatenate([ints, floats])
+        if s.is_positive or s.is_nonnegative:
+            row = np.abs(row)
+        out[i] = row
+    return out
+
+
+def compile_numeric(exprs: Sequence[sp.Expr], symbols: Sequence[sp.Symbol]) -> Callable | None:
+    """将若干表达式一次性 lambdify 为 NumPy 函数；无法编译时返回 None。"""
+    try:
+        return sp.lambdify(list(symbols), list(exprs), modules="numpy")
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def evaluate(func: Callable, points: np.ndarray) -> List[np.ndarray] | None:
+    """在全部采样点上批量求值，结果统一广播为长度 n 的复数数组；求值失败返回 None。"""
+    n = points.shape[1]
+    try:
+        with np.errstate(all="ignore"):
+            vals = func(*points)
+        return [np.broadcast_to(np.asarray(v, dtype=np.complex128), (n,)) for v in vals]
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def numeric_check(diff: sp.Expr, denom: sp.Expr, symbols: Sequence[sp.Symbol], samples: int, tol: float, seed: int = 42) -> NumericOutcome | None:
+    """
+    向量化数值采样：diff 与其分母各 lambdify 一次，在 samples*3 个候选点上整体求值，
+    用数组掩码剔除非有限值与分母为 0 的点后取前 samples 个有效点比较。
+    无法走 NumPy 路径（如含未求值积分、不支持的函数）时返回 None，由调用方回退到 SymPy 逐点求值。
+    """
+    func = compile_numeric([diff, denom], symbols)
+    if func is None:
+        return None
+    points = sample_matrix(symbols, samples * 3, seed=seed)
+    vals = evaluate(func, points)
+    if vals is None:
+        return None
+    dvals, den = vals
+    valid = np.isfinite(dvals) & np.isfinite(den) & (np.abs(den) > _DENOM_EPS)
+    idx = np.flatnonzero(valid)[:samples]
+    ok = np.abs(dvals[idx]) < tol
+    return NumericOutcome(int(idx.size), int(ok.sum()))
+
+
+def numeric_refute(func1: Callable | None, func2: Callable | None, symbols: Sequence[sp.Symbol], n: int = 6, rtol: float = 1e-6, seed: int = 7) -> NumericOutcome | None:
+    """
+    快速数值反驳：func1/func2 为两侧按 symbols 顺序 lambdify 的函数（见 compile_numeric），各求值 n 个点，
+    只在两侧均为有限实数的点上比较（避免对数/根式分支差异导致误判）。
+    success 为一致的点数，不一致的点记入 mismatches。双精度下的相消误差可能造成假的不一致，
+    判定不等价前须用 confirm_mismatch 高精度复核。无法编译或求值时返回 None。
+    """
+    if func1 is None or func2 is None:
+        return None
+    points = sample_matrix(symbols, n, seed=seed)
+    v1 = evaluate(func1, points)
+    v2 = evaluate(func2, points)
+    if v1 is None or v2 is None:
+        return None
+    a, b = v1[0], v2[0]
+    real = (np.abs(a.imag) <= 1e-12 * (1 + np.abs(a.real))) & (np.abs(b.imag) <= 1e-12 * (1 + np.abs(b.real)))
+    valid = np.isfinite(a) & np.isfinite(b) & real
+    close = np.abs(a[valid] - b[valid]) <= rtol * (1 + np.abs(a[valid]) + np.abs(b[valid]))
+    return NumericOutcome(int(valid.sum()), int(close.sum()), points[:, np.flatnonzero(valid)[~close]])
+
+
+def confirm_mismatch(expr1: sp.Expr, expr2: sp.Expr, symbols: Sequence[sp.Symbol], points: np.ndarray, rtol: float = 1e-6, digits: int = 50) -> bool:
+    """
+    在 points 的各列上以精确有理数代入、digits 位精度重新求值两侧，任一点确认不一致即返回 True。
+    求值失败、非数值或出现复数的点不作结论（分支差异同 numeric_refute）。
+    """
+    for col in points.T:
+        subs = {s: sp.Rational(float(v.real)) for s, v in zip(symbols, col)}
+        try:
+            v1 = sp.N(expr1.subs(subs), digits)
+            v2 = sp.N(expr2.subs(subs), digits)
+            if not (v1.is_number and v2.is_number) or v1.has(sp.zoo, sp.oo, sp.nan) or v2.has(sp.zoo, sp.oo, sp.nan):
+                continue
+            if not (v1.is_real and v2.is_real):
+                continue
+            if abs(v1 - v2) > rtol * (1 + abs(v1) + abs(v2)):
+                return True
+        except Exception:  # noqa: BLE001
+            continue
+    return False
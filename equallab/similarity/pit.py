@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import random
+import sympy as sp
+
+
+# 对 n < 3.3e24 确定性的 Miller-Rabin 底数
+_MR_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+_PRIME_BITS = 61
+_POOL_SIZE = 32
+# 单次求值命中极点（分母 ≡ 0）时的重抽上限
+_MAX_RESAMPLE = 8
+
+_rng = random.SystemRandom()
+_prime_pool: List[int] = []
+
+
+class _Unsupported(Exception):
+    """表达式不是有理系数的有理函数。"""
+
+
+@dataclass
+class PitOutcome:
+    equal: bool
+    trials: int
+    error_bound: float  # equal=True 时的假阳性概率上界；equal=False 为确定结论，恒为 0
+
+
+def _is_probable_prime(n: int) -> bool:
+    if n < 2:
+        return False
+    for p in _MR_BASES:
+        if n % p == 0:
+            return n == p
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+    for a in _MR_BASES:
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _random_prime(bits: int = _PRIME_BITS) -> int:
+    while True:
+        n = _rng.getrandbits(bits) | (1 << (bits - 1)) | 1
+        if _is_probable_prime(n):
+            return n
+
+
+def _pick_prime() -> int:
+    # 维护一个随机大素数池，避免每次比较都重新生成
+    if len(_prime_pool) < _POOL_SIZE:
+        _prime_pool.append(_random_prime())
+        return _prime_pool[-1]
+    return _rng.choice(_prime_pool)
+
+
+def _degree(e: sp.Basic, memo: Dict[sp.Basic, int]) -> int:
+    """有理函数 分子次数 + 分母次数 的上界；遇到非有理结构抛出 _Unsupported。"""
+    if e in memo:
+        return memo[e]
+    if isinstance(e, sp.Symbol):
+        d = 1
+    elif isinstance(e, sp.Rational):  # 含 Integer
+        d = 0
+    elif isinstance(e, (sp.Add, sp.Mul)):
+        d = sum(_degree(a, memo) for a in e.args)
+    elif isinstance(e, sp.Pow) and isinstance(e.exp, sp.Integer):
+        d = abs(int(e.exp)) * _degree(e.base, memo)
+    else:
+        raise _Unsupported(type(e).__name__)
+    memo[e] = d
+    return d
+
+
+def _eval_mod(e: sp.Basic, point: Dict[sp.Symbol, int], p: int, memo: Dict[sp.Basic, int]) -> int:
+    """在 GF(p) 上求值；分母为 0 时抛出 ZeroDivisionError。"""
+    if e in memo:
+        return memo[e]
+    if isinstance(e, sp.Symbol):
+        v = point[e]
+    elif isinstance(e, sp.Integer):
+        v = int(e) % p
+    elif isinstance(e, sp.Rational):
+        q = e.q % p
+        if q == 0:
+            raise ZeroDivisionError
+        v = e.p * pow(q, -1, p) % p
+    elif isinstance(e, sp.Add):
+        v = sum(_eval_mod(a, point, p, memo) for a in e.args) % p
+    elif isinstance(e, sp.Mul):
+        v = 1
+        for a in e.args:
+            v = v * _eval_mod(a, point, p, memo) % p
+    elif isinstance(e, sp.Pow):
+        n = int(e.exp)
+        b = _eval_mod(e.base, point, p, memo)
+        if n < 0:
+            if b == 0:
+                raise ZeroDivisionError
+            b, n = pow(b, -1, p), -n
+        v = pow(b, n, p)
+    else:
+        raise _Unsupported(type(e).__name__)
+    memo[e] = v
+    return v
+
+
+def pit_equal(expr1: sp.Expr, expr2: sp.Expr, symbols: Sequence[sp.Symbol], trials: int = 3, max_error: float = 1e-12) -> PitOutcome | None:
+    """
+    随机多项式恒等检验（Schwartz–Zippel）：在随机大素数 p 的有限域上、随机点处对两侧精确求值。
+    - 适用于有理系数的多项式/有理函数（仅 + × 与整数次幂）；否则返回 None
+    - 任一试验两侧取值不同 ⇒ 两式确定不等价
+    - 全部相同 ⇒ 等价，假阳性概率不超过 ∏ deg/p（deg 为差式分子次数上界）；该上界超过 max_error 时返回 None
+    """
+    memo: Dict[sp.Basic, int] = {}
+    try:
+        deg = _degree(expr1, memo) + _degree(expr2, memo)
+    except _Unsupported:
+        return None
+
+    bound = 1.0
+    done = 0
+    for _ in range(trials):
+        for _attempt in range(_MAX_RESAMPLE):
+            p = _pick_prime()
+            point = {s: _rng.randrange(p) for s in symbols}
+            try:
+                v1 = _eval_mod(expr1, point, p, {})
+                v2 = _eval_mod(expr2, point, p, {})
+            except ZeroDivisionError:
+                continue
+            break
+        else:
+            return None
+        done += 1
+        if v1 != v2:
+            return PitOutcome(False, done, 0.0)
+        bound *= min(1.0, deg / p)
+
+    if bound > max_error:
+        return None
+    return PitOutcome(True, done, bound)
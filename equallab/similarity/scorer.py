@@ -1,11 +1,26 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict
 
 import sympy as sp
 
+from equallab.normalization.carrier import NormalizedExpr
 from .equivalence import are_equivalent
 from .structure import structure_similarity
+from .tree_edit import tree_edit_similarity
+
+
+# 树编辑相似度低于该值时不再求精确距离（DP 按对应上界截断），结构分取该上界
+TREE_EDIT_MIN_SIMILARITY = 0.5
+
+# 可选结构度量：名称 -> (expr1, expr2) -> [0, 1]
+STRUCTURE_METRICS: Dict[str, Callable[[sp.Expr, sp.Expr], float]] = {
+    "jaccard": structure_similarity,
+    "tree_edit": partial(tree_edit_similarity, min_similarity=TREE_EDIT_MIN_SIMILARITY),
+}
+DEFAULT_METRIC_WEIGHTS: Dict[str, float] = {"jaccard": 1.0}
 
 
 @dataclass
@@ -15,16 +30,36 @@ class SimilarityResult:
     detail: dict
 
 
-def similarity(expr1: sp.Expr, expr2: sp.Expr, w_equiv: float = 0.7, assumptions: dict | None = None) -> SimilarityResult:
-    eq = are_equivalent(expr1, expr2, assumptions=assumptions)
-    struct = structure_similarity(sp.simplify(expr1), sp.simplify(expr2))
+def _structure_score(expr1: sp.Expr, expr2: sp.Expr, metric_weights: Dict[str, float]) -> tuple[float, Dict[str, float]]:
+    unknown = set(metric_weights) - set(STRUCTURE_METRICS)
+    if unknown:
+        raise ValueError(f"unknown structure metrics: {sorted(unknown)}")
+    scores = {name: STRUCTURE_METRICS[name](expr1, expr2) for name, w in metric_weights.items() if w > 0}
+    total = sum(metric_weights[name] for name in scores)
+    if not total:
+        return 0.0, scores
+    return sum(metric_weights[name] * s for name, s in scores.items()) / total, scores
+
+
+def similarity(expr1: sp.Expr | NormalizedExpr, expr2: sp.Expr | NormalizedExpr, w_equiv: float = 0.7, assumptions: dict | None = None, metric_weights: Dict[str, float] | None = None) -> SimilarityResult:
+    """
+    综合得分 = w_equiv * 等价分 + (1 - w_equiv) * 结构分；
+    结构分为 metric_weights 中各度量（见 STRUCTURE_METRICS）的加权平均，缺省仅用 jaccard。
+    传入 NormalizedExpr 时，等价判定与结构分均基于其 canonical 级别对应的形式（并复用已缓存结果）；
+    直接传入 sympy 表达式时按 full 级别（simplify 后）处理。
+    """
+    metric_weights = metric_weights or DEFAULT_METRIC_WEIGHTS
+    c1, c2 = NormalizedExpr.wrap(expr1, level="full"), NormalizedExpr.wrap(expr2, level="full")
+    eq = are_equivalent(c1, c2, assumptions=assumptions)
+    struct, metrics = _structure_score(c1.expr, c2.expr, metric_weights)
 
     if eq.is_equivalent:
         # 等价直接返回满分
         return SimilarityResult(True, 1.0, {
             "equivalence": eq.__dict__,
             "structure": struct,
-            "weights": {"equiv": w_equiv, "struct": 1 - w_equiv},
+            "structure_metrics": metrics,
+            "weights": {"equiv": w_equiv, "struct": 1 - w_equiv, "metrics": metric_weights},
         })
 
     eq_score = 0.0
@@ -35,8 +70,7 @@ def similarity(expr1: sp.Expr, expr2: sp.Expr, w_equiv: float = 0.7, assumptions
         detail={
             "equivalence": eq.__dict__,
             "structure": struct,
-            "weights": {"equiv": w_equiv, "struct": 1 - w_equiv},
+            "structure_metrics": metrics,
+            "weights": {"equiv": w_equiv, "struct": 1 - w_equiv, "metrics": metric_weights},
         },
     )
-
-
@@ -1,60 +1,103 @@
 from __future__ import annotations
 
-from typing import Dict, Tuple
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Tuple
 
+import threading
 import sympy as sp
-import networkx as nx
-
-
-def _expr_to_graph(expr: sp.Expr) -> nx.DiGraph:
-    g = nx.DiGraph()
-
-    def add_node(e: sp.Expr) -> int:
-        idx = id(e)
-        if idx in g:
-            return idx
-        label = type(e).__name__
-        if isinstance(e, sp.Symbol):
-            label = f"Sym:{e.name}"
-        elif isinstance(e, sp.Integer):
-            label = f"Int:{int(e)}"
-        elif isinstance(e, sp.Rational):
-            label = f"Rat:{e.p}/{e.q}"
-        elif isinstance(e, sp.Float):
-            label = "Float"
-        g.add_node(idx, label=label)
+
+
+
+# 节点标签驻留表：标签字符串 <-> 紧凑整数 id（进程内有效）
+_LABEL_IDS: Dict[str, int] = {}
+_LABELS: List[str] = []
+_intern_lock = threading.Lock()
+
+# 开启深度时，节点键为 (label_id << _DEPTH_BITS) | depth
+_DEPTH_BITS = 8
+_MAX_DEPTH = (1 << _DEPTH_BITS) - 1
+
+
+def _intern(label: str) -> int:
+    idx = _LABEL_IDS.get(label)
+    if idx is None:
+        with _intern_lock:
+            idx = _LABEL_IDS.get(label)
+            if idx is None:
+                idx = len(_LABELS)
+                _LABELS.append(label)
+                _LABEL_IDS[label] = idx
+    return idx
+
+
+def label_of(key: int, depth: bool = False) -> str:
+    """由节点键还原标签字符串（depth=True 时去掉深度位）。"""
+    return _LABELS[key >> _DEPTH_BITS if depth else key]
+
+
+def _label(e: sp.Basic) -> str:
+    if isinstance(e, sp.Symbol):
+        return f"Sym:{e.name}"
+    if isinstance(e, sp.Integer):
+        return f"Int:{int(e)}"
+    if isinstance(e, sp.Rational):
+        return f"Rat:{e.p}/{e.q}"
+    if isinstance(e, sp.Float):
+        return "Float"
+    return type(e).__name__
+
+
+@dataclass(frozen=True)
+class StructureFingerprint:
+    nodes: Dict[int, int]             # 节点键 -> 出现次数
+    edges: Dict[Tuple[int, int], int]  # (父节点键, 子节点键) -> 出现次数
+    size: int                         # 节点总数（含重复子树）
+    depth: bool = False
+
+
+def _build(expr: sp.Basic, depth: bool) -> StructureFingerprint:
+    nodes: Counter = Counter()
+    edges: Counter = Counter()
+    # 单次迭代遍历；共享子树按出现次数计数，不按对象 id 合并
+    stack = [(expr, 0, None)]
+    while stack:
+        e, d, parent = stack.pop()
+        key = _intern(_label(e))
+        if depth:
+            key = (key << _DEPTH_BITS) | min(d, _MAX_DEPTH)
+        nodes[key] += 1
+        if parent is not None:
+            edges[(parent, key)] += 1
         for arg in e.args:
-            child_idx = add_node(arg)
-            g.add_edge(idx, child_idx)
-        return idx
+            stack.append((arg, d + 1, key))
+    return StructureFingerprint(dict(nodes), dict(edges), sum(nodes.values()), depth)
+
 
-    add_node(expr)
-    return g
+# 指纹只是派生数据，单独用小 LRU 缓存，不占用共享的 CanonicalCache（避免挤掉解析/规范化结果）
+@lru_cache(maxsize=2048)
+def expr_fingerprint(expr: sp.Basic, depth: bool = False) -> StructureFingerprint:
+    """表达式结构指纹：节点标签与边标签的多重集（驻留整数），按 (expr, depth) 缓存。"""
+    return _build(expr, depth)
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    inter = len(a & b)
+    union = len(a | b)
+    return inter / union if union else 0.0
 
 
 def structure_similarity(expr1: sp.Expr, expr2: sp.Expr) -> float:
     """
     结构相似度（0-1）：
-    - 将表达式树转为有向图
+    - 将表达式树压缩为节点/边标签指纹
     - 使用节点标签与边的 Jaccard 相似度的简单组合
     """
-    g1 = _expr_to_graph(expr1)
-    g2 = _expr_to_graph(expr2)
-
-    nodes1 = {g1.nodes[n]["label"] for n in g1.nodes}
-    nodes2 = {g2.nodes[n]["label"] for n in g2.nodes}
-    edges1 = {(g1.nodes[u]["label"], g1.nodes[v]["label"]) for u, v in g1.edges}
-    edges2 = {(g2.nodes[u]["label"], g2.nodes[v]["label"]) for u, v in g2.edges}
-
-    def jaccard(a: set, b: set) -> float:
-        if not a and not b:
-            return 1.0
-        inter = len(a & b)
-        union = len(a | b)
-        return inter / union if union else 0.0
-
-    node_sim = jaccard(nodes1, nodes2)
-    edge_sim = jaccard(edges1, edges2)
+    f1 = expr_fingerprint(expr1)
+    f2 = expr_fingerprint(expr2)
+    node_sim = _jaccard(set(f1.nodes), set(f2.nodes))
+    edge_sim = _jaccard(set(f1.edges), set(f2.edges))
     return 0.5 * node_sim + 0.5 * edge_sim
-
-
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import sympy as sp
+
+from .structure import _intern, _label
+
+
+# auto 模式下精确计算的规模上限：DP 需要计算的格子数（见 _dp_cost），约 0.3 秒
+EXACT_LIMIT = 500_000
+
+
+@dataclass
+class TreeEditResult:
+    distance: int
+    exact: bool          # False 表示近似值（approx 模式或超出上界提前终止）
+    size1: int
+    size2: int
+    exceeded: bool = False  # 距离已确定超过 bound，distance 取 bound + 1
+
+
+def _annotate(expr: sp.Basic) -> Tuple[List[int], List[int], List[int]]:
+    """后序遍历：返回 (节点标签, 最左叶后序下标, 父节点标签)，父标签在根处为 -1。"""
+    labels: List[int] = []
+    lml: List[int] = []
+    parents: List[int] = []
+    # 栈元素：[节点, 下一个子节点下标, 第一个子节点的最左叶, 父节点标签]
+    stack = [[expr, 0, None, -1]]
+    while stack:
+        top = stack[-1]
+        node, i = top[0], top[1]
+        if i < len(node.args):
+            top[1] += 1
+            stack.append([node.args[i], 0, None, _intern(_label(node))])
+            continue
+        stack.pop()
+        idx = len(labels)
+        labels.append(_intern(_label(node)))
+        leftmost = top[2] if top[2] is not None else idx
+        lml.append(leftmost)
+        parents.append(top[3])
+        if stack and stack[-1][2] is None:
+            stack[-1][2] = leftmost
+    return labels, lml, parents
+
+
+def _keyroots(lml: List[int]) -> List[int]:
+    last = {}
+    for i, l in enumerate(lml):
+        last[l] = i
+    return sorted(last.values())
+
+
+def _pair_pruned(li: int, i: int, lj: int, j: int, bound: int | None) -> bool:
+    # 代价不超过 bound 的映射中，匹配的节点对后序下标之差与子树大小之差均不超过 bound，
+    # 因而最左叶下标之差不超过 2 * bound；关键根对 (i, j) 的最左路径上不存在这样的节点对时整对跳过
+    if bound is None:
+        return False
+    return abs(li - lj) > 2 * bound or lj > i + bound or li > j + bound
+
+
+def _dp_cost(lml1: List[int], lml2: List[int], bound: int | None = None) -> int:
+    """
+    Zhang–Shasha 需要计算的格子数（上界）：每对关键根的子树大小之积求和，等于两侧关键根子树大小之和的乘积；
+    深度大的树可达 O(n1² n2²)，远超 n1 * n2。给定 bound 时只计跳过剪枝后的关键根对的带状区域（见 _zhang_shasha）。
+    """
+    if bound is None:
+        return sum(i - lml1[i] + 1 for i in _keyroots(lml1)) * sum(j - lml2[j] + 1 for j in _keyroots(lml2))
+    cost = 0
+    for i in _keyroots(lml1):
+        for j in _keyroots(lml2):
+            li, lj = lml1[i], lml2[j]
+            if not _pair_pruned(li, i, lj, j, bound):
+                m, n = i - li + 1, j - lj + 1
+                # 行数不超过 n + bound，每行至多 2 * bound + 1 格
+                cost += min(m, n + bound) * min(n, 2 * bound + 1)
+    return cost
+
+
+def _zhang_shasha(lab1: List[int], lml1: List[int], lab2: List[int], lml2: List[int], bound: int | None = None) -> int:
+    """
+    精确距离；给定 bound 时返回 min(距离, bound + 1)，并在 DP 中剪去不可能落在代价 <= bound 的映射上的部分：
+    - 跳过 _pair_pruned 的关键根对
+    - 森林距离 fd[x][y] 不小于两森林节点数之差 |x - y|，只计算 |x - y| <= bound 的带
+    未计算的格子与子树距离均按 bound + 1 截断。
+    """
+    n1, n2 = len(lab1), len(lab2)
+    cap = n1 + n2 if bound is None else bound + 1
+    td = [[cap] * n2 for _ in range(n1)]
+    for i in _keyroots(lml1):
+        for j in _keyroots(lml2):
+            li, lj = lml1[i], lml2[j]
+            if _pair_pruned(li, i, lj, j, bound):
+                continue
+            # 第 x 行的带为 x - cap < y < x + cap；x >= n + cap - 1 的行整行在带外
+            m, n = min(i - li + 2, j - lj + 1 + cap), j - lj + 2
+            fd = [[cap] * n for _ in range(m)]
+            for x in range(min(m, cap)):
+                fd[x][0] = x
+            for y in range(min(n, cap)):
+                fd[0][y] = y
+            for x in range(1, m):
+                i1 = li + x - 1
+                row, prev = fd[x], fd[x - 1]
+                for y in range(max(1, x - cap + 1), min(n, x + cap)):
+                    j1 = lj + y - 1
+                    if lml1[i1] == li and lml2[j1] == lj:
+                        cost = 0 if lab1[i1] == lab2[j1] else 1
+                        row[y] = min(prev[y] + 1, row[y - 1] + 1, prev[y - 1] + cost, cap)
+                        td[i1][j1] = row[y]
+                    else:
+                        p, q = lml1[i1] - li, lml2[j1] - lj
+                        row[y] = min(prev[y] + 1, row[y - 1] + 1, fd[p][q] + td[i1][j1], cap)
+    return td[n1 - 1][n2 - 1]
+
+
+def _overlap(a: List, b: List) -> int:
+    return sum((Counter(a) & Counter(b)).values())
+
+
+def tree_edit_distance(expr1: sp.Basic, expr2: sp.Basic, bound: int | None = None, mode: str = "auto", min_similarity: float | None = None) -> TreeEditResult:
+    """
+    有序树编辑距离（Zhang–Shasha，插入/删除/重标记代价均为 1）。
+    - bound：距离上界；标签多重集下界 max(n1, n2) - |标签交集| 已超过 bound 时不做 DP，直接返回 bound + 1；
+             否则 DP 只计算仍可能不超过 bound 的带状区域（见 _zhang_shasha）
+    - mode：exact 精确 DP；approx 线性近似（按 (父标签, 标签) 多重集重叠估计）；
+            auto 在 DP 格子数（见 _dp_cost）不超过 EXACT_LIMIT 时精确，否则近似
+    - min_similarity：按相似度给出的上界，等价于 bound = floor((1 - min_similarity) * max(n1, n2))，与 bound 取较小者
+    """
+    if mode not in {"auto", "exact", "approx"}:
+        raise ValueError(f"unknown tree edit mode: {mode}")
+    lab1, lml1, par1 = _annotate(expr1)
+    lab2, lml2, par2 = _annotate(expr2)
+    n1, n2 = len(lab1), len(lab2)
+    if min_similarity is not None:
+        limit = int((1 - min_similarity) * max(n1, n2))
+        bound = limit if bound is None else min(bound, limit)
+
+    # 每个未以同标签匹配的节点至少需要一次编辑
+    lower = max(n1, n2) - _overlap(lab1, lab2)
+    if bound is not None and lower > bound:
+        return TreeEditResult(bound + 1, False, n1, n2, exceeded=True)
+
+    if mode == "approx" or (mode == "auto" and _dp_cost(lml1, lml2, bound) > EXACT_LIMIT):
+        approx = max(n1, n2) - _overlap(list(zip(par1, lab1)), list(zip(par2, lab2)))
+        if bound is not None and approx > bound:
+            return TreeEditResult(bound + 1, False, n1, n2, exceeded=True)
+        return TreeEditResult(approx, False, n1, n2)
+
+    dist = _zhang_shasha(lab1, lml1, lab2, lml2, bound)
+    if bound is not None and dist > bound:
+        return TreeEditResult(bound + 1, True, n1, n2, exceeded=True)
+    return TreeEditResult(dist, True, n1, n2)
+
+
+def tree_edit_similarity(expr1: sp.Basic, expr2: sp.Basic, bound: int | None = None, mode: str = "auto", min_similarity: float | None = None) -> float:
+    """
+    1 - 距离 / max(n1, n2)，截断到 [0, 1]。
+    距离超过 bound（或相似度低于 min_similarity）时按 bound + 1 计算，结果是真实相似度的上界。
+    """
+    res = tree_edit_distance(expr1, expr2, bound=bound, mode=mode, min_similarity=min_similarity)
+    size = max(res.size1, res.size2)
+    return max(0.0, 1.0 - res.distance / size) if size else 1.0
@@ -1,28 +1,56 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+from collections.abc import Mapping
+from typing import Any, Dict, List, Literal, Tuple
 
+import json
 import logging
+import os
+import threading
 import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-from .api import normalize as _normalize, similarity as _similarity, image_latex_similarity as _image_latex_similarity
-from .api import chem_image_similarity as _chem_image_similarity
+from .api import normalize as _normalize, similarity as _similarity, aimage_latex_similarity as _aimage_latex_similarity
+from .api import achem_image_similarity as _achem_image_similarity, aimage_similarity_batch as _aimage_similarity_batch
+from .api import index_add as _index_add, index_query as _index_query
 from .assumptions.config import parse_assumptions_json
+from .cache import get_cache
+from .disk_cache import get_disk_cache
+from .ocr import get_ocr_cache, get_ocr_client
+from .sandbox import enable_sandbox, get_sandbox, sandbox_enabled
+from .similarity.index import ExpressionIndex
 from .chem import (
     normalize_formula,
     formulas_equivalent,
+    formula_batch,
+    formula_similarity_info,
+    FormulaIndex,
     balance_reaction_info,
-    reactions_equivalent,
+    balance_cache_stats,
+    BalanceError,
+    reaction_equivalence_info,
 )
 
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
 logger = logging.getLogger("equallab.web")
 
-app = FastAPI(title="EqualLab API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Web 服务默认将符号计算放入受监管子进程，避免单个失控请求长期占用工作线程；EQUALLAB_SANDBOX=0 可关闭
+    if os.getenv("EQUALLAB_SANDBOX", "1").strip().lower() not in {"0", "false", "no", "off"}:
+        enable_sandbox()
+    yield
+    await get_ocr_client().aclose()
+    if sandbox_enabled():
+        get_sandbox().shutdown()
+
+
+app = FastAPI(title="EqualLab API", version="0.1.0", lifespan=lifespan)
 
 
 @app.middleware("http")
@@ -39,15 +67,37 @@ async def logging_middleware(request: Request, call_next):
         return JSONResponse(status_code=500, content={"detail": str(e)})
 
 
+CanonicalLevel = Literal["none", "cheap", "full"]
+
+
 class NormalizeReq(BaseModel):
     input: str
     is_latex: bool | None = None
+    canonical: CanonicalLevel = "full"
 
 
 class SimilarityReq(BaseModel):
     a: str
     b: str
     assumptions: Dict[str, Any] | None = None
+    metric_weights: Dict[str, float] | None = None
+    canonical: CanonicalLevel = "full"
+
+
+class IndexQueryReq(BaseModel):
+    input: str
+    k: int = 10
+    confirm: bool = True
+    assumptions: Dict[str, Any] | None = None
+
+
+class IndexAddReq(BaseModel):
+    key: str
+    input: str
+
+
+class IndexKeyReq(BaseModel):
+    key: str
 
 
 class ChemEqReq(BaseModel):
@@ -58,6 +108,17 @@ class ChemEqReq(BaseModel):
 class ChemBalanceReq(BaseModel):
     reaction: str
 
+
+class ChemIndexQueryReq(BaseModel):
+    input: str
+    k: int = 10
+
+
+class ChemBatchReq(BaseModel):
+    formulas: List[str] = []
+    pairs: List[Tuple[str, str]] = []
+
+
 class ImageSimReq(BaseModel):
     image_path: str
     latex: str
@@ -70,9 +131,21 @@ class ChemImageSimReq(BaseModel):
     type: str  # "formula" | "reaction"
 
 
+class ImageBatchItem(BaseModel):
+    image_path: str
+    expected: str
+    type: str = "latex"  # "latex" | "formula" | "reaction"；非法取值只让该条目失败
+    assumptions: Dict[str, Any] | None = None
+
+
+class ImageBatchReq(BaseModel):
+    items: List[ImageBatchItem]
+    concurrency: int | None = None
+
+
 @app.post("/normalize")
 def normalize(req: NormalizeReq):
-    out = _normalize(req.input, is_latex=req.is_latex)
+    out = _normalize(req.input, is_latex=req.is_latex, canonical=req.canonical)
     if out.get("expr") is not None:
         out = dict(out)
         out["expr"] = str(out["expr"])  # ensure JSON-serializable
@@ -81,7 +154,7 @@ def normalize(req: NormalizeReq):
 
 @app.post("/similarity")
 def similarity(req: SimilarityReq):
-    out = _similarity(req.a, req.b, assumptions=req.assumptions)
+    out = _similarity(req.a, req.b, assumptions=req.assumptions, metric_weights=req.metric_weights, canonical=req.canonical)
     # make nested expr JSON-serializable
     a = dict(out.get("a", {}))
     b = dict(out.get("b", {}))
@@ -95,6 +168,69 @@ def similarity(req: SimilarityReq):
     return out
 
 
+_index: ExpressionIndex | None = None
+_index_path = os.getenv("EQUALLAB_INDEX_PATH")
+# 同步端点运行在线程池中：并发的首个请求不能各自加载/新建索引（否则 /index/add 写入落在被丢弃的实例上）
+_index_lock = threading.Lock()
+
+
+def _get_index() -> ExpressionIndex:
+    # 参考表达式索引：EQUALLAB_INDEX_PATH 指向的文件存在时从中加载
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if _index_path and os.path.exists(_index_path):
+                    _index = ExpressionIndex.load(_index_path)
+                else:
+                    _index = ExpressionIndex()
+    return _index
+
+
+@app.post("/index/query")
+def index_query(req: IndexQueryReq):
+    out = _index_query(_get_index(), req.input, k=req.k, confirm=req.confirm, assumptions=req.assumptions)
+    inp = dict(out["input"])
+    if inp.get("expr") is not None:
+        inp["expr"] = str(inp["expr"])
+    out = dict(out)
+    out["input"] = inp
+    return out
+
+
+@app.post("/index/add")
+def index_add(req: IndexAddReq):
+    try:
+        n = _index_add(_get_index(), req.key, req.input)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    return {"key": req.key, "expr": str(n["expr"]), "size": len(_get_index())}
+
+
+@app.post("/index/remove")
+def index_remove(req: IndexKeyReq):
+    return {"key": req.key, "removed": _get_index().remove(req.key), "size": len(_get_index())}
+
+
+@app.post("/index/save")
+def index_save():
+    if not _index_path:
+        return JSONResponse(status_code=400, content={"detail": "EQUALLAB_INDEX_PATH is not set"})
+    _get_index().save(_index_path)
+    return {"path": _index_path, "size": len(_get_index())}
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    disk = get_disk_cache()
+    return {
+        **get_cache().stats(),
+        "disk": disk.stats() if disk is not None else None,
+        "balance": balance_cache_stats(),
+        "ocr": get_ocr_cache().stats(),
+    }
+
+
 @app.post("/chem/formula/norm")
 def chem_norm(req: NormalizeReq):
     return {"composition": normalize_formula(req.input)}
@@ -105,9 +241,81 @@ def chem_eq(req: ChemEqReq):
     return {"equivalent": formulas_equivalent(req.a, req.b)}
 
 
+@app.post("/chem/formula/batch")
+def chem_batch(req: ChemBatchReq):
+    """一次请求处理多个化学式：组成、摩尔质量（g/mol）与成对等价。"""
+    return formula_batch(req.formulas, req.pairs)
+
+
+@app.post("/chem/formula/similarity")
+def chem_similarity(req: ChemEqReq):
+    try:
+        return formula_similarity_info(req.a, req.b)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+
+
+_chem_index: FormulaIndex | None = None
+_chem_index_path = os.getenv("EQUALLAB_CHEM_INDEX_PATH")
+_chem_index_lock = threading.Lock()
+
+
+def _get_chem_index() -> FormulaIndex:
+    # 参考化合物索引：EQUALLAB_CHEM_INDEX_PATH 指向的文件存在时从中加载（初始化加锁，同 _get_index）
+    global _chem_index
+    if _chem_index is None:
+        with _chem_index_lock:
+            if _chem_index is None:
+                if _chem_index_path and os.path.exists(_chem_index_path):
+                    _chem_index = FormulaIndex.load(_chem_index_path)
+                else:
+                    _chem_index = FormulaIndex()
+    return _chem_index
+
+
+@app.post("/chem/index/query")
+def chem_index_query(req: ChemIndexQueryReq):
+    index = _get_chem_index()
+    try:
+        exact = index.lookup(req.input)
+        matches = index.query(req.input, k=req.k)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    return {
+        "input": req.input,
+        "exact": exact,
+        "matches": [{"key": key, "formula": index.get(key), "score": score} for key, score in matches],
+    }
+
+
+@app.post("/chem/index/add")
+def chem_index_add(req: IndexAddReq):
+    try:
+        _get_chem_index().add(req.key, req.input)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    return {"key": req.key, "formula": req.input, "size": len(_get_chem_index())}
+
+
+@app.post("/chem/index/remove")
+def chem_index_remove(req: IndexKeyReq):
+    return {"key": req.key, "removed": _get_chem_index().remove(req.key), "size": len(_get_chem_index())}
+
+
+@app.post("/chem/index/save")
+def chem_index_save():
+    if not _chem_index_path:
+        return JSONResponse(status_code=400, content={"detail": "EQUALLAB_CHEM_INDEX_PATH is not set"})
+    _get_chem_index().save(_chem_index_path)
+    return {"path": _chem_index_path, "size": len(_get_chem_index())}
+
+
 @app.post("/chem/reaction/balance")
 def chem_balance(req: ChemBalanceReq):
-    rc, pc, reag, prod, method = balance_reaction_info(req.reaction)
+    try:
+        rc, pc, reag, prod, method = balance_reaction_info(req.reaction)
+    except BalanceError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e), "kind": e.kind})
     return {
         "reactants": [{"coef": c, "species": s} for c, s in zip(rc, reag)],
         "products": [{"coef": c, "species": s} for c, s in zip(pc, prod)],
@@ -117,29 +325,58 @@ def chem_balance(req: ChemBalanceReq):
 
 @app.post("/chem/reaction/eq")
 def chem_eqrxn(req: ChemEqReq):
-    return {"equivalent": reactions_equivalent(req.a, req.b)}
+    try:
+        info = reaction_equivalence_info(req.a, req.b)
+    except BalanceError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e), "kind": e.kind})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    return info
 
 
 @app.post("/image/similarity")
-def image_similarity(req: ImageSimReq):
-    out = _image_latex_similarity(req.image_path, req.latex, assumptions=req.assumptions, use_onnx=req.use_onnx)
+async def image_similarity(req: ImageSimReq):
+    # 异步等待 OCR，不占用线程池；只有 SymPy 比对进入执行器
+    out = await _aimage_latex_similarity(req.image_path, req.latex, assumptions=req.assumptions, use_onnx=req.use_onnx)
+    return _image_latex_json(out)
+
+
+def _image_latex_json(out: Dict[str, Any]) -> Dict[str, Any]:
     # 使内部 result 的 expr 可序列化
     res = dict(out["result"]) if isinstance(out.get("result"), dict) else out["result"]
-    a = dict(res.get("a", {})) if isinstance(res.get("a", {}), dict) else {}
-    b = dict(res.get("b", {})) if isinstance(res.get("b", {}), dict) else {}
+    # a/b 为 NormalizedExpr（Mapping，非 dict）
+    a = dict(res.get("a", {})) if isinstance(res.get("a", {}), Mapping) else {}
+    b = dict(res.get("b", {})) if isinstance(res.get("b", {}), Mapping) else {}
     if a.get("expr") is not None:
-        a["expr"] = str(a["expr"]) 
+        a["expr"] = str(a["expr"])
     if b.get("expr") is not None:
-        b["expr"] = str(b["expr"]) 
+        b["expr"] = str(b["expr"])
     res["a"] = a
     res["b"] = b
     return {"image_latex": out["image_latex"], "input_latex": out["input_latex"], "result": res}
 
 
+@app.post("/image/similarity/batch")
+async def image_similarity_batch(req: ImageBatchReq):
+    """
+    批量图片比对，以 NDJSON 流式返回：每条结果在其 OCR 返回并比对完成后立即输出一行（按完成顺序，带 index），
+    单条失败输出 {"ok": false, "error": ...} 而不中断整批。
+    """
+    items = [item.model_dump() for item in req.items]
+
+    async def lines():
+        async for out in _aimage_similarity_batch(items, concurrency=req.concurrency):
+            if out.get("ok") and out["type"] == "latex":
+                out["result"] = _image_latex_json(out["result"])
+            yield json.dumps(out, ensure_ascii=False, default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @app.post("/chem/image/similarity")
-def chem_image_similarity_endpoint(req: ChemImageSimReq):
+async def chem_image_similarity_endpoint(req: ChemImageSimReq):
     """化学：一步到位的图片识别 + 等价判断。"""
-    out = _chem_image_similarity(req.image_path, req.text, req.type)
+    out = await _achem_image_similarity(req.image_path, req.text, req.type)
     # 直接返回业务结果结构：{"image_text","input_text","type","result":{...}}
     return out
 
@@ -0,0 +1,74 @@
+"""
+冷启动开销检查：用 `python -X importtime` 运行典型入口，统计进程内全部导入的耗时（各模块 self 时间之和，
+取多次运行的最小值），并检查是否加载了该入口不需要的重依赖。任一入口超出预算或加载了禁止的模块时以非零码退出。
+
+用法：python startup_check.py [--repeat 3] [--scale 1.0]
+较慢的机器/CI 可用 --scale（或环境变量 EQUALLAB_STARTUP_SCALE）按比例放宽预算。
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# (名称, python 参数, 预算 ms, 不应加载的顶层包)
+_LIGHT = ("sympy", "numpy", "scipy", "chempy", "requests")
+CHECKS = [
+    ("import equallab", ["-c", "import equallab"], 150, _LIGHT + ("typer", "rich", "fastapi")),
+    ("import equallab.chem", ["-c", "import equallab.chem"], 200, _LIGHT),
+    ("cli --help", ["-m", "equallab.cli", "--help"], 500, _LIGHT),
+    ("cli chem norm", ["-m", "equallab.cli", "chem", "norm", "H2O"], 500, _LIGHT),
+    ("cli chem balance", ["-m", "equallab.cli", "chem", "balance", "H2 + O2 -> H2O"], 500, _LIGHT),
+    ("cli norm", ["-m", "equallab.cli", "norm", "x", "--canonical", "none"], 1500, ("scipy", "chempy", "requests", "numpy")),
+]
+
+
+def measure(args):
+    """运行一次，返回 (导入总耗时 ms, 已加载的顶层包集合, 按累计耗时排序的前几个模块)。"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{proc.stderr[-2000:]}")
+    total_us = 0
+    packages = set()
+    top = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, self_us, cumulative_us, name = [p.strip() for p in line.replace("import time:", "|", 1).split("|")]
+        total_us += int(self_us)
+        packages.add(name.split(".")[0])
+        top.append((int(cumulative_us), name))
+    top.sort(reverse=True)
+    return total_us / 1000, packages, top[:5]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=float(os.getenv("EQUALLAB_STARTUP_SCALE", "1.0")))
+    opts = parser.parse_args()
+
+    failed = False
+    for name, args, budget_ms, forbidden in CHECKS:
+        runs = [measure(args) for _ in range(max(1, opts.repeat))]
+        ms, packages, top = min(runs, key=lambda r: r[0])
+        limit = budget_ms * opts.scale
+        loaded = sorted(set(forbidden) & packages)
+        ok = ms <= limit and not loaded
+        failed = failed or not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {name:<22} {ms:7.1f} ms (budget {limit:.0f} ms)")
+        if loaded:
+            print(f"     unexpected imports: {', '.join(loaded)}")
+        if not ok:
+            for cumulative_us, module in top:
+                print(f"     {cumulative_us / 1000:7.1f} ms  {module}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
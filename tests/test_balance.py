@@ -0,0 +1,78 @@
+import pytest
+
+from equallab.chem import BalanceError, balance_reaction_info
+from equallab.chem.balance import balance_matrix
+
+
+# (反应式, 反应物系数, 产物系数)：与 chempy.balance_stoichiometry 的结果一致
+STANDARD = [
+    ("H2 + O2 -> H2O", [2, 1], [2]),
+    ("CH4 + O2 -> CO2 + H2O", [1, 2], [1, 2]),
+    ("C3H8 + O2 -> CO2 + H2O", [1, 5], [3, 4]),
+    ("Fe + O2 -> Fe2O3", [4, 3], [2]),
+    # 括号后的整组倍数
+    ("Ca3(PO4)2 + H2SO4 -> CaSO4 + H3PO4", [1, 3], [3, 2]),
+    ("Al2(SO4)3 + Ca(OH)2 -> Al(OH)3 + CaSO4", [1, 3], [2, 3]),
+    # 氧化还原
+    ("KMnO4 + HCl -> KCl + MnCl2 + H2O + Cl2", [2, 16], [2, 2, 8, 5]),
+    ("K2Cr2O7 + HCl -> KCl + CrCl3 + H2O + Cl2", [1, 14], [2, 2, 7, 3]),
+    ("Cu + HNO3 -> Cu(NO3)2 + NO + H2O", [3, 8], [3, 2, 4]),
+    # 大系数
+    ("C57H110O6 + O2 -> CO2 + H2O", [2, 163], [114, 110]),
+    (
+        "K4Fe(CN)6 + KMnO4 + H2SO4 -> KHSO4 + Fe2(SO4)3 + MnSO4 + HNO3 + CO2 + H2O",
+        [10, 122, 299],
+        [162, 5, 122, 60, 60, 188],
+    ),
+]
+
+
+@pytest.mark.parametrize("reaction, reag, prod", STANDARD)
+def test_integer_balancer(reaction, reag, prod):
+    rc, pc, _r, _p, method = balance_reaction_info(reaction, method="integer")
+    assert (rc, pc, method) == (reag, prod, "integer")
+
+
+@pytest.mark.parametrize("reaction, reag, prod", STANDARD)
+def test_agrees_with_chempy(reaction, reag, prod):
+    chempy = pytest.importorskip("chempy")
+    left, right = reaction.split(" -> ")
+    r_species, p_species = left.split(" + "), right.split(" + ")
+    R, P = chempy.balance_stoichiometry(set(r_species), set(p_species))
+    assert [int(R[s]) for s in r_species] == reag
+    assert [int(P[s]) for s in p_species] == prod
+
+
+def test_balance_matrix_minimal_positive():
+    # 2 H2 + O2 -> 2 H2O：行为 H、O
+    assert balance_matrix([[2, 0, 2], [0, 2, 1]], 2) == [2, 1, 2]
+
+
+@pytest.mark.parametrize("A, n_reactants", [
+    # H2 + O2 -> H2O + H2O2：两个独立反应叠加
+    ([[2, 0, 2, 2], [0, 2, 1, 2]], 2),
+    # 无约束的两物种
+    ([[0, 0]], 1),
+])
+def test_underdetermined(A, n_reactants):
+    with pytest.raises(BalanceError) as exc:
+        balance_matrix(A, n_reactants)
+    assert exc.value.kind == "underdetermined"
+
+
+@pytest.mark.parametrize("A, n_reactants", [
+    # H2 -> O2：元素不守恒，只有零解
+    ([[2, 0], [0, 2]], 1),
+    # H2O + H2 -> O2：唯一解含负系数
+    ([[2, 2, 0], [1, 0, 2]], 2),
+    ([], 0),
+])
+def test_infeasible(A, n_reactants):
+    with pytest.raises(BalanceError) as exc:
+        balance_matrix(A, n_reactants)
+    assert exc.value.kind == "infeasible"
+
+
+def test_balance_error_is_value_error():
+    with pytest.raises(ValueError):
+        balance_reaction_info("H2 -> O2")
@@ -0,0 +1,85 @@
+import sympy as sp
+
+from equallab.cache import CanonicalCache, cached_transform, canonicalize, env_int
+
+
+def test_alpha_renaming_shares_form():
+    x, t = sp.symbols("x t")
+    c1, back1 = canonicalize(x**2 + 1)
+    c2, back2 = canonicalize(t**2 + 1)
+    assert c1 == c2
+    assert c1.xreplace(back1) == x**2 + 1
+    assert c2.xreplace(back2) == t**2 + 1
+
+
+def test_alpha_renaming_keeps_assumptions():
+    p = sp.Symbol("p", positive=True)
+    x = sp.Symbol("x")
+    cp, _ = canonicalize(sp.sqrt(p**2))
+    cx, _ = canonicalize(sp.sqrt(x**2))
+    # 假设不同则规范形不同，不会共享缓存条目
+    assert cp != cx
+    (v,) = cp.free_symbols
+    assert v.is_positive
+
+
+def test_cached_transform_maps_back():
+    x, t = sp.symbols("x t")
+    calls = []
+
+    def fn(e):
+        calls.append(e)
+        return sp.expand(e)
+
+    assert cached_transform("test-expand", (x + 1) ** 2, fn) == x**2 + 2 * x + 1
+    assert cached_transform("test-expand", (t + 1) ** 2, fn) == t**2 + 2 * t + 1
+    assert len(calls) == 1
+
+
+def test_item_eviction():
+    c = CanonicalCache(max_items=2)
+    c.put("a", 1)
+    c.put("b", 2)
+    assert c.get("a") == (True, 1)  # a 变为最近使用
+    c.put("c", 3)
+    assert c.get("b") == (False, None)
+    assert c.get("a") == (True, 1) and c.get("c") == (True, 3)
+    assert c.stats()["evictions"] == 1
+
+
+def test_byte_eviction():
+    c = CanonicalCache(max_items=100, max_bytes=2000)
+    for i in range(10):
+        c.put(i, "x" * 500)
+    stats = c.stats()
+    assert stats["bytes"] <= 2000
+    assert 0 < stats["items"] < 10
+    assert c.get(9)[0] and not c.get(0)[0]
+    # 单个超限条目不写入
+    c.put("big", "x" * 5000)
+    assert c.get("big") == (False, None)
+
+
+def test_zero_items_disables():
+    c = CanonicalCache(max_items=0)
+    c.put("a", 1)
+    assert c.get("a") == (False, None)
+    assert c.stats()["items"] == 0
+
+
+def test_configure_shrinks():
+    c = CanonicalCache(max_items=10)
+    for i in range(5):
+        c.put(i, i)
+    c.configure(max_items=2)
+    assert c.stats()["items"] == 2
+    assert c.get(4) == (True, 4)
+
+
+def test_env_int(monkeypatch):
+    monkeypatch.setenv("EQUALLAB_TEST_INT", "12")
+    assert env_int("EQUALLAB_TEST_INT", 3) == 12
+    monkeypatch.setenv("EQUALLAB_TEST_INT", "many")
+    assert env_int("EQUALLAB_TEST_INT", 3) == 3
+    monkeypatch.delenv("EQUALLAB_TEST_INT")
+    assert env_int("EQUALLAB_TEST_INT", 3) == 3
@@ -0,0 +1,52 @@
+import pytest
+import sympy as sp
+
+from equallab.api import normalize, similarity
+
+
+x = sp.Symbol("x")
+
+
+@pytest.mark.parametrize("level, expected", [
+    ("none", sp.sin(x) ** 2 + sp.cos(x) ** 2),
+    ("cheap", sp.sin(x) ** 2 + sp.cos(x) ** 2),
+    ("full", sp.Integer(1)),
+])
+def test_trig_identity_simplified_only_at_full(level, expected):
+    out = normalize("sin(x)**2+cos(x)**2", canonical=level)
+    assert out.level == level
+    assert out.expr == expected
+
+
+@pytest.mark.parametrize("level, expected", [
+    ("none", (x + 1) ** 2),
+    ("cheap", x**2 + 2 * x + 1),
+    ("full", (x + 1) ** 2),
+])
+def test_polynomial_forms(level, expected):
+    assert normalize("(x+1)**2", canonical=level).expr == expected
+
+
+@pytest.mark.parametrize("level", ["none", "cheap", "full"])
+def test_verdict_independent_of_level(level):
+    # 等价判定在需要时自行推导更重的形式
+    assert similarity("sin(x)**2+cos(x)**2", "1", canonical=level)["equivalent"] is True
+    assert similarity("sin(x)", "cos(x)", canonical=level)["equivalent"] is False
+
+
+def test_unknown_level_rejected():
+    with pytest.raises(ValueError):
+        normalize("x", canonical="bogus")
+    with pytest.raises(ValueError):
+        similarity("x", "x", canonical="bogus")
+
+
+def test_web_rejects_unknown_level():
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    from equallab.web import app
+
+    client = TestClient(app)
+    assert client.post("/normalize", json={"input": "x", "canonical": "cheap"}).status_code == 200
+    assert client.post("/normalize", json={"input": "x", "canonical": "bogus"}).status_code == 422
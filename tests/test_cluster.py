@@ -0,0 +1,33 @@
+import numpy as np
+import sympy as sp
+
+from equallab.api import cluster
+from equallab.similarity.cluster import _ATOL, _cell_keys, cluster_expressions
+
+x = sp.Symbol("x")
+
+
+def test_zero_noise_shares_cell():
+    a = _cell_keys(np.array([1e-17 + 0j, 2.0 + 0j]), 8)
+    b = _cell_keys(np.array([-3e-18 + 0j, 2.0 + 0j]), 8)
+    assert a[0] == b[0]
+
+
+def test_boundary_straddle_finds_neighbour():
+    # 取恰好位于格边界（半整数）上的值，两侧各偏一点点
+    rtol = 1e-8
+    v = _ATOL / rtol * np.sinh(1000.5 * rtol)
+    lo = _cell_keys(np.array([v * (1 - 1e-13) + 0j]), 8)
+    hi = _cell_keys(np.array([v * (1 + 1e-13) + 0j]), 8)
+    assert lo[0] != hi[0]
+    assert hi[0] in lo and lo[0] in hi
+
+
+def test_cluster_without_confirm_merges_noise():
+    exprs = [sp.sin(x) ** 2 + sp.cos(x) ** 2 - 1, sp.Integer(0), x - x + 0, x + 1, 1 + x]
+    assert cluster_expressions(exprs, confirm=False) == [[0, 1, 2], [3, 4]]
+
+
+def test_cluster_confirms():
+    out = cluster(["(x+1)^2", "x^2+2*x+1", "x^2+1", "sin(x)^2+cos(x)^2", "1"])
+    assert [c["members"] for c in out["classes"]] == [[0, 1], [2], [3, 4]]
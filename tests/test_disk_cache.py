@@ -0,0 +1,90 @@
+import sqlite3
+import threading
+import time
+
+from equallab import disk_cache
+from equallab.disk_cache import DiskCache
+
+
+def _scan(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+
+def test_totals_track_puts_replaces_and_clear(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    cache = DiskCache(path)
+    for i in range(10):
+        cache.put(("k", i), "v" * i)
+    # 覆盖写入同一键只调整字节数，不重复计数
+    cache.put(("k", 3), "w" * 500)
+    stats = cache.stats()
+    assert (stats["items"], stats["bytes"]) == _scan(path)
+    assert stats["items"] == 10
+    assert cache.get(("k", 3)) == (True, "w" * 500)
+    cache.clear()
+    assert (cache.stats()["items"], cache.stats()["bytes"]) == (0, 0)
+
+
+def test_eviction_uses_totals(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    cache = DiskCache(path, max_items=20)
+    for i in range(50):
+        cache.put(("k", i), i)
+    stats = cache.stats()
+    assert stats["items"] <= 20
+    assert (stats["items"], stats["bytes"]) == _scan(path)
+    assert stats["evictions"] == 50 - stats["items"]
+    # 最早写入的条目先被淘汰
+    assert cache.get(("k", 0)) == (False, None)
+    assert cache.get(("k", 49)) == (True, 49)
+
+
+def test_totals_shared_across_connections(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    a, b = DiskCache(path), DiskCache(path)
+    a.put("x", 1)
+    b.put("y", 2)
+    assert a.stats()["items"] == b.stats()["items"] == 2
+
+
+def test_existing_file_without_totals(tmp_path):
+    # 旧版本创建的文件没有 totals 表：首次打开时统计一次
+    path = str(tmp_path / "old.sqlite")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE entries (key BLOB PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, atime REAL NOT NULL) WITHOUT ROWID")
+        conn.executemany("INSERT INTO entries VALUES (?, ?, ?, 0)", [(bytes([i]), b"", 10) for i in range(5)])
+    cache = DiskCache(path)
+    assert (cache.stats()["items"], cache.stats()["bytes"]) == (5, 50)
+    cache.put("new", 1)
+    assert cache.stats()["items"] == 6
+
+
+def test_singleton_created_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("EQUALLAB_DISK_CACHE", str(tmp_path / "shared.sqlite"))
+    monkeypatch.setattr(disk_cache, "_disk_cache", None)
+    monkeypatch.setattr(disk_cache, "_disk_cache_ready", False)
+    created = []
+    init = DiskCache.__init__
+    barrier = threading.Barrier(8)
+
+    def slow_init(self, *args, **kwargs):
+        # 放大初始化窗口，使无锁实现必然出现多个实例
+        created.append(self)
+        time.sleep(0.05)
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(DiskCache, "__init__", slow_init)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(disk_cache.get_disk_cache())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(created) == 1
+    assert all(r is created[0] for r in results)
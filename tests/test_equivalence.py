@@ -0,0 +1,59 @@
+import pytest
+import sympy as sp
+
+from equallab import sandbox
+from equallab.api import similarity
+from equallab.similarity.equivalence import are_equivalent
+
+
+@pytest.fixture
+def sandboxed():
+    sandbox.enable_sandbox(True, warm=False)
+    try:
+        yield sandbox.get_sandbox()
+    finally:
+        sandbox.enable_sandbox(False)
+        sandbox.get_sandbox().shutdown()
+
+
+@pytest.mark.parametrize("canonical", ["none", "cheap", "full"])
+def test_sandbox_undefined_function(sandboxed, canonical):
+    # 未定义函数 f 是动态类，须能送入沙箱工作进程并取回结果
+    r = similarity(r"$f(x)\sin^2 x + f(x)\cos^2 x$", "$f(x)$", canonical=canonical)
+    assert r["equivalent"] is True
+
+
+def test_sandbox_undefined_function_not_equivalent(sandboxed):
+    r = similarity("$f(x)$", "$g(x)$")
+    assert r["equivalent"] is False
+
+
+CANCELLATION = [
+    ("(x+10**8)**2 - 10**16 - 2*10**8*x", "x**2"),
+    ("(exp(20*x)+1)**2 - exp(40*x) - 2*exp(20*x)", "1"),
+]
+
+
+@pytest.mark.parametrize("a, b", CANCELLATION)
+def test_probe_cancellation_not_refuted(a, b):
+    # 双精度相消误差不能让数值探针直接判定不等价
+    assert similarity(a, b, canonical="none")["equivalent"] is True
+
+
+@pytest.mark.parametrize("a, b", CANCELLATION)
+def test_probe_alone_does_not_refute_cancellation(a, b):
+    res = are_equivalent(sp.sympify(a), sp.sympify(b), stages=("probe",))
+    assert res.method == "undecided"
+
+
+def test_unevaluated_cancellation():
+    x = sp.Symbol("x")
+    e = sp.Add((x + 10**10) ** 2, -(10**20), -2 * 10**10 * x, evaluate=False)
+    assert are_equivalent(e, x**2).is_equivalent
+    assert are_equivalent(e, x**2, stages=("identical", "probe", "cheap")).is_equivalent
+
+
+def test_probe_still_refutes():
+    x = sp.Symbol("x")
+    res = are_equivalent(sp.sin(x), sp.cos(x))
+    assert (res.is_equivalent, res.method) == (False, "numeric-probe")
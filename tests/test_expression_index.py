@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+
+import pytest
+import sympy as sp
+
+from equallab.serialization import from_srepr
+from equallab.similarity.index import ExpressionIndex
+
+
+def test_save_load_roundtrip(tmp_path):
+    x, y = sp.symbols("x y")
+    f = sp.Function("f")
+    index = ExpressionIndex()
+    exprs = {"sq": (x + 1) ** 2, "trig": sp.sin(x) ** 2 + sp.cos(x) ** 2, "fn": f(x) * sp.exp(-y), "half": sp.Rational(1, 2) * x}
+    for key, expr in exprs.items():
+        index.add(key, expr)
+    path = str(tmp_path / "index.json")
+    index.save(path)
+    loaded = ExpressionIndex.load(path)
+    assert len(loaded) == len(index)
+    for key, expr in exprs.items():
+        assert loaded.get(key) == expr
+    assert loaded.query((x + 1) ** 2, k=2) == index.query((x + 1) ** 2, k=2)
+
+
+@pytest.mark.parametrize("payload", [
+    "__import__('os').system('touch pwned')",
+    "Symbol('x').__class__",
+    "open('/etc/passwd')",
+    "Symbol(**{'name': 'x'})",
+    "[c for c in ()]",
+])
+def test_load_rejects_code(tmp_path, payload):
+    path = tmp_path / "index.json"
+    path.write_text(json.dumps({"num_perm": 64, "bands": 16, "seed": 1, "entries": {"k": {"expr": payload, "sig": [0] * 64}}}))
+    with pytest.raises(ValueError):
+        ExpressionIndex.load(str(path))
+    assert not (tmp_path / "pwned").exists()
+
+
+def test_from_srepr_non_toplevel_class():
+    x = sp.Symbol("x")
+    expr = sp.Piecewise((x, x > 0), (0, True))
+    assert from_srepr(sp.srepr(expr)) == expr
+
+
+def test_web_index_created_once(monkeypatch):
+    pytest.importorskip("fastapi")
+    from equallab import web
+
+    monkeypatch.setattr(web, "_index", None)
+    monkeypatch.setattr(web, "_index_path", None)
+    created = []
+    init = ExpressionIndex.__init__
+
+    def slow_init(self, *args, **kwargs):
+        # 放大初始化窗口，使无锁实现必然出现多个实例
+        created.append(self)
+        time.sleep(0.05)
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(ExpressionIndex, "__init__", slow_init)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(web._get_index())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(created) == 1
+    assert all(r is created[0] for r in results)
+
+
+def test_web_chem_index_created_once(monkeypatch):
+    pytest.importorskip("fastapi")
+    from equallab import web
+    from equallab.chem.index import FormulaIndex
+
+    monkeypatch.setattr(web, "_chem_index", None)
+    monkeypatch.setattr(web, "_chem_index_path", None)
+    created = []
+    init = FormulaIndex.__init__
+
+    def slow_init(self, *args, **kwargs):
+        created.append(self)
+        time.sleep(0.05)
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(FormulaIndex, "__init__", slow_init)
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        web._get_chem_index().add(f"k{threading.get_ident()}", "H2O")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # 并发首个请求的写入全部落在同一实例上
+    assert len(created) == 1
+    assert len(web._chem_index) == 8
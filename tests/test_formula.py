@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from equallab.chem import composition_matrix, parse_formula
+from equallab.chem.formula import formulas_equivalent
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("H2O", {"H": 2, "O": 1}),
+    ("Ca(OH)2", {"Ca": 1, "O": 2, "H": 2}),
+    ("K4[ON(SO3)2]2", {"K": 4, "O": 14, "N": 2, "S": 4}),
+    ("CuSO4·5H2O", {"Cu": 1, "S": 1, "O": 9, "H": 10}),
+    ("Na2CO3.10H2O", {"Na": 2, "C": 1, "O": 13, "H": 20}),
+    ("2H2O", {"H": 4, "O": 2}),
+    ("Fe(s)", {"Fe": 1}),
+    ("NaCl(aq)", {"Na": 1, "Cl": 1}),
+    ("SO4^{2-}", {"S": 1, "O": 4}),
+    ("Cl-", {"Cl": 1}),
+])
+def test_parse_formula(formula, expected):
+    assert parse_formula(formula) == expected
+
+
+def test_parse_formula_returns_fresh_dict():
+    # 解析结果经 LRU 记忆化，修改返回值不能污染缓存
+    first = parse_formula("CO2")
+    first["C"] = 99
+    assert parse_formula("CO2") == {"C": 1, "O": 2}
+
+
+def test_parse_formula_invalid():
+    with pytest.raises(ValueError):
+        parse_formula("h2o")
+
+
+def test_composition_matrix():
+    A, elements = composition_matrix(["H2O", "CO2", "O2", "C6H12O6"])
+    assert elements == ["C", "H", "O"]
+    assert A.dtype == np.int64
+    assert A.tolist() == [
+        [0, 1, 0, 6],
+        [2, 0, 0, 12],
+        [1, 2, 2, 6],
+    ]
+
+
+def test_composition_matrix_empty():
+    A, elements = composition_matrix([])
+    assert A.shape == (0, 0) and elements == []
+
+
+def test_formulas_equivalent():
+    assert formulas_equivalent("H2O", "OH2")
+    assert formulas_equivalent("CuSO4·5H2O", "CuSO9H10")
+    assert not formulas_equivalent("H2O", "H2O2")
@@ -0,0 +1,64 @@
+import math
+
+import pytest
+
+from equallab.chem import formula_batch, molar_masses
+from equallab.chem.elements import ATOMIC_WEIGHTS
+
+
+def _mass(comp):
+    return sum(ATOMIC_WEIGHTS[el] * n for el, n in comp.items())
+
+
+@pytest.mark.parametrize("formula, comp", [
+    ("H2O", {"H": 2, "O": 1}),
+    # 括号后的整组倍数（_TOKEN 中的 \d+ 分支）
+    ("Ca3(PO4)2", {"Ca": 3, "P": 2, "O": 8}),
+    ("Al2(SO4)3", {"Al": 2, "S": 3, "O": 12}),
+    ("CuSO4·5H2O", {"Cu": 1, "S": 1, "O": 9, "H": 10}),
+])
+def test_molar_masses(formula, comp):
+    (mass,) = molar_masses([formula])
+    assert mass == pytest.approx(_mass(comp))
+
+
+def test_molar_masses_vectorized_order_and_unknown():
+    masses = molar_masses(["H2O", "Xx2", "CO2"])
+    assert masses[0] == pytest.approx(_mass({"H": 2, "O": 1}))
+    # 未知元素只影响所在物种
+    assert math.isnan(masses[1])
+    assert masses[2] == pytest.approx(_mass({"C": 1, "O": 2}))
+
+
+def test_formula_batch_items():
+    out = formula_batch(["Ca3(PO4)2", "Xy", "h2o", "H2O"])
+    ca, xy, bad, water = out["items"]
+    assert ca["composition"] == {"Ca": 3, "P": 2, "O": 8}
+    assert ca["molar_mass"] == pytest.approx(310.1735, abs=1e-3)
+    assert xy["molar_mass"] is None and xy["unknown_elements"] == ["Xy"]
+    assert bad["composition"] is None and bad["molar_mass"] is None and "error" in bad
+    assert water["molar_mass"] == pytest.approx(18.015)
+
+
+def test_formula_batch_pairs():
+    out = formula_batch(["H2O"], pairs=[("H2O", "OH2"), ("H2O", "H2O2"), ("H2O", "h2o"), ("CO2", "O2C")])
+    # pairs 中的化学式可不在 formulas 内；解析失败时为 None
+    assert [p["equivalent"] for p in out["pairs"]] == [True, False, None, True]
+    assert [item["formula"] for item in out["items"]] == ["H2O"]
+
+
+def test_formula_batch_empty():
+    assert formula_batch([]) == {"items": [], "pairs": []}
+
+
+def test_batch_endpoint():
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    from equallab.web import app
+
+    resp = TestClient(app).post("/chem/formula/batch", json={"formulas": ["Ca3(PO4)2"], "pairs": [["H2O", "OH2"]]})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["items"][0]["molar_mass"] == pytest.approx(310.1735, abs=1e-3)
+    assert body["pairs"][0]["equivalent"] is True
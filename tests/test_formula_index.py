@@ -0,0 +1,82 @@
+import pytest
+
+from equallab.chem.formula import parse_formula
+from equallab.chem.index import FormulaIndex, composition_hash
+from equallab.chem.similarity import composition_score, formula_similarity, formula_similarity_info
+
+
+def test_composition_score_components():
+    # 比例相同、大小不同：余弦为 1，按原子数之比扣分
+    assert composition_score({"Fe": 2, "O": 3}, {"Fe": 4, "O": 6}) == {"score": 0.5, "cosine": 1.0, "size_ratio": 0.5}
+    assert composition_score({"H": 2, "O": 1}, {"O": 1, "H": 2})["score"] == 1.0
+    assert composition_score({}, {"H": 1})["score"] == 0.0
+    assert composition_score({"Na": 1}, {"Cl": 1})["score"] == 0.0
+
+
+def test_formula_similarity():
+    assert formula_similarity("Fe2O3", "Fe3O4") == pytest.approx(0.7132, abs=1e-4)
+    info = formula_similarity_info("H2O", "OH2")
+    assert info["equivalent"] is True and info["score"] == 1.0
+    assert formula_similarity("H2O", "H2O2") < 1.0
+
+
+@pytest.fixture
+def index():
+    idx = FormulaIndex()
+    idx.add_many([
+        ("water", "H2O"), ("water2", "OH2"), ("perox", "H2O2"),
+        ("rust", "Fe2O3"), ("mag", "Fe3O4"),
+        ("salt", "NaCl"), ("b", "KCl"), ("a", "LiCl"),
+    ])
+    return idx
+
+
+def test_query_matches_composition_score(index):
+    q = parse_formula("Fe2O3")
+    for key, score in index.query("Fe2O3", k=len(index)):
+        expected = composition_score(q, parse_formula(index.get(key)))["score"]
+        assert score == pytest.approx(expected)
+
+
+def test_query_order_and_exact_hits(index):
+    top = index.query("H2O", k=3)
+    # 组成完全相同的条目恰为 1，同分按 key 排序
+    assert top[:2] == [("water", 1.0), ("water2", 1.0)]
+    assert top[2][0] == "perox"
+    assert index.query("Fe2O3", k=2) == [("rust", 1.0), ("mag", pytest.approx(formula_similarity("Fe2O3", "Fe3O4")))]
+
+
+def test_query_ties_at_kth_place_by_key(index):
+    # 三个氯化物与 MgCl2 同分；第 k 名并列时按 key 字典序截断
+    top = index.query("MgCl2", k=2)
+    assert [key for key, _ in top] == ["a", "b"]
+    assert top[0][1] == top[1][1] > 0
+
+
+def test_query_all_zero_scores(index):
+    # 查询元素不在库中：全部得 0，结果按 key 排序取前 k 个
+    assert index.query("Xe", k=3) == [("a", 0.0), ("b", 0.0), ("mag", 0.0)]
+
+
+def test_query_prefix_consistent(index):
+    full = index.query("HCl", k=len(index))
+    assert full == sorted(full, key=lambda t: (-t[1], t[0]))
+    for k in range(1, len(index) + 1):
+        assert index.query("HCl", k=k) == full[:k]
+    assert index.query("HCl", k=0) == []
+
+
+def test_lookup_and_remove(index):
+    assert index.lookup("OH2") == ["water", "water2"]
+    assert composition_hash("H2O") == composition_hash("OH2")
+    assert index.remove("water")
+    assert index.query("H2O", k=1) == [("water2", 1.0)]
+    assert not index.remove("water")
+
+
+def test_save_load_roundtrip(index, tmp_path):
+    path = str(tmp_path / "formulas.json")
+    index.save(path)
+    loaded = FormulaIndex.load(path)
+    assert len(loaded) == len(index)
+    assert loaded.query("NaCl", k=3) == index.query("NaCl", k=3)
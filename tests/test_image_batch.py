@@ -0,0 +1,37 @@
+import asyncio
+import threading
+import time
+
+from equallab import api
+from equallab.ocr import get_ocr_client
+
+
+def test_early_stop_drops_queued_comparisons(monkeypatch):
+    started = []
+    lock = threading.Lock()
+
+    async def arecognize(image_path, fields):
+        return "x"
+
+    def compare(raw, expected, assumptions):
+        with lock:
+            started.append(threading.current_thread().name)
+        time.sleep(0.2)
+        return {"equivalent": True}
+
+    monkeypatch.setattr(get_ocr_client(), "arecognize", arecognize)
+    monkeypatch.setattr(api, "_image_latex_compare", compare)
+    items = [{"image_path": f"/tmp/{i}.png", "expected": "x"} for i in range(40)]
+    workers = api._get_batch_executor()._max_workers
+
+    async def first():
+        gen = api.aimage_similarity_batch(items)
+        out = await gen.__anext__()
+        await gen.aclose()
+        return out
+
+    assert asyncio.run(first())["ok"]
+    time.sleep(0.5)
+    # 已开始的比对至多两轮（首条完成前后各一轮），排队中的随取消丢弃
+    assert len(started) <= 2 * workers
+    assert all(name.startswith("equallab-batch") for name in started)
@@ -0,0 +1,129 @@
+import pytest
+
+from equallab.api import normalize
+from equallab.normalization.latex_clean import clean_latex
+from equallab.normalization.preprocess import preprocess_text
+
+
+# 回归语料：期望输出即单遍扫描器之前（逐条正则替换）的清洗结果，两者逐字节一致
+CORPUS = [
+    ("$x^2+1$", "x^2+1"),
+    (r"$\left| \dfrac{1}{x} \right|$", r"\left| \frac{1}{x} \right|"),
+    (r"\frac{\ln x}{x}", r"\frac{\log x}{x}"),
+    (r"\(x+y\)", "x+y"),
+    (r"\[x-y\]", "x-y"),
+    ("  x   +   y  ", "x + y"),
+    (r"\dfrac{1}{2}", r"\frac{1}{2}"),
+    (r"\tfrac{a}{b}", r"\frac{a}{b}"),
+    (r"\dfrac{\dfrac{1}{x}}{y}", r"\frac{\frac{1}{x}}{y}"),
+    (r"\frac{1}{x}", r"\frac{1}{x}"),
+    (r"\ln x", r"\log x"),
+    (r"\ln(x+1)", r"\log(x+1)"),
+    (r"\log x", r"\log x"),
+    (r"\log_2 x", r"\log_2 x"),
+    (r"\tg x", r"\tan x"),
+    (r"\ctg x", r"\cot x"),
+    (r"\arctg x", r"\arctan x"),
+    (r"\arccotg x", r"\arccot x"),
+    (r"\ch x", r"\cosh x"),
+    (r"\sh x", r"\sinh x"),
+    (r"\th x", r"\tanh x"),
+    (r"\tan x", r"\tan x"),
+    (r"\cosh x", r"\cosh x"),
+    (r"\sinh x", r"\sinh x"),
+    (r"\tanh x", r"\tanh x"),
+    (r"\arctan x", r"\arctan x"),
+    (r"a\,b", "ab"),
+    (r"a\;b", "ab"),
+    (r"a\!b", "ab"),
+    (r"a\quad b", "a b"),
+    (r"a\qquad b", "a b"),
+    ("a~b", "a b"),
+    (r"\left| x \right|", r"\left| x \right|"),
+    (r"\left|x-1\right|", r"\left| x-1 \right|"),
+    (r"\lvert x \rvert", r"\left| x \right|"),
+    (r"\lvert x+1\rvert", r"\left| x+1 \right|"),
+    (r"\abs{x}", r"\left| x \right|"),
+    (r"\abs{x-1}", r"\left| x-1 \right|"),
+    (r"\abs { x }", r"\left| x \right|"),
+    (r"\ln(e^{x})", "x"),
+    (r"\log(e^{2x})", "2x"),
+    (r"\ln(e^x)", "x"),
+    (r"\log ( e ^ { x+1 } )", "x+1"),
+    (r"\mathrm{d}x", "dx"),
+    (r"\mathrm{e}^x", "e^x"),
+    (r"\operatorname{sin} x", "sin x"),
+    (r"\mathrm{kg}\cdot m", r"kg\cdot m"),
+    (r"x \cdot y", r"x \cdot y"),
+    (r"a \times b", r"a \times b"),
+    (r"\sqrt{x}", r"\sqrt{x}"),
+    (r"\sin^2 x + \cos^2 x", r"\sin^2 x + \cos^2 x"),
+    (r"x \\ y", r"x \\ y"),
+    (r"\{x\}", r"\{x\}"),
+    ("x_{1}+x_{2}", "x_{1}+x_{2}"),
+]
+
+
+@pytest.mark.parametrize("text, expected", CORPUS)
+def test_corpus_matches_previous_cleaner(text, expected):
+    assert clean_latex(text) == expected
+
+
+# 与旧清洗器有意不同之处（旧结果见注释）
+@pytest.mark.parametrize("text, expected", [
+    # 别名只匹配完整控制词：旧为 \coshi^2 / \tanheta
+    (r"\chi^2", r"\chi^2"),
+    (r"\theta", r"\theta"),
+    # 旧为 \left\left| x \right \right|
+    (r"\left\lvert x \right\rvert", r"\left| x \right|"),
+    # 嵌套花括号：旧为 \left| \frac{1 \right|{2}}
+    (r"\abs{\frac{1}{2}}", r"\left| \frac{1}{2} \right|"),
+    # 只展开花括号或单字符指数：旧为 x+1
+    (r"\log(e^x+1)", r"\log(e^x+1)"),
+    # $$...$$ 整体去壳：旧为 $\frac{a}{b}$
+    (r"$$\frac{a}{b}$$", r"\frac{a}{b}"),
+])
+def test_intended_changes(text, expected):
+    assert clean_latex(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    (r"\abs{x}", r"\left| x \right|"),
+    (r"\mathrm{d}x", "dx"),
+    (r"\dfrac{1}{x}", r"\frac{1}{x}"),
+])
+def test_rewrites_closed_groups(text, expected):
+    assert clean_latex(text) == expected
+
+
+@pytest.mark.parametrize("text", [r"\abs{x", r"\mathrm{x", r"\abs{\frac{1}{x}", r"\operatorname{sin x"])
+def test_unclosed_groups_left_untouched(text):
+    assert clean_latex(text) == text
+
+
+@pytest.mark.parametrize("text", [r"$\abs{x$", r"$\mathrm{x$", r"$x}$", r"$\frac{1}{x$"])
+def test_malformed_input_rejected(text):
+    out = normalize(text)
+    assert out["expr"] is None
+    assert out["errors"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("", ""),
+    ("x + y", "x + y"),
+    ("  a\n\tb  ", "a b"),
+    # 非 ASCII：NFKC 归一后再查符号表
+    ("２ｘ＋１", "2x+1"),
+    ("（ａ＋ｂ）×ｃ", "(a+b)*c"),
+    ("a·b • c", "a*b * c"),
+    ("x⋅y", "x*y"),
+    ("6÷3", "6/3"),
+    ("x−1 – 2 — 3", "x-1 - 2 - 3"),
+    ("f（x），g（x）；h", "f(x),g(x);h"),
+    ("【1，2】", "[1,2]"),
+    ("ｘ²", "x2"),
+    ("ﬁ", "fi"),
+    ("a\u3000b", "a b"),
+])
+def test_preprocess_text(text, expected):
+    assert preprocess_text(text) == expected
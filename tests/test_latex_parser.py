@@ -0,0 +1,94 @@
+import pytest
+import sympy as sp
+from sympy.parsing.latex import parse_latex
+
+from equallab.api import normalize
+from equallab.normalization.latex_parser import LatexUnsupported, parse_latex_native
+from equallab.normalization.to_sympy import (
+    PARSER_LATEX,
+    PARSER_NATIVE,
+    PARSER_TEXT,
+    parse_raw_detailed,
+)
+
+
+PARITY = [
+    # 分式
+    r"\frac{1}{2}", r"\frac12", r"\frac{x+1}{x-1}", r"\dfrac{a}{b}",
+    # 幂
+    r"x^2", r"x^{n+1}", r"2^{x^2}", r"e^{-x}", r"-x^2",
+    # 根式
+    r"\sqrt{x}", r"\sqrt[3]{x+1}", r"\sqrt[n]{x}",
+    # 函数
+    r"\sin x", r"\sin(2x)", r"\sin^2 x + \cos^2 x", r"\sin^{-1} x",
+    r"\log_2 x", r"\ln(x+1)", r"\arctan x", r"f(x)",
+    # 隐式乘法与运算符
+    r"2xy", r"3x(x+1)", r"ab+cd", r"\pi r^2", r"\alpha\beta", r"x \cdot y \div z", r"1.5x",
+    # 下标
+    r"x_1 + x_2", r"x_{12}^2", r"a_{n+1}",
+    # 其他
+    r"|x-1|", r"x = 1", r"3!", r"\infty",
+]
+
+
+@pytest.mark.parametrize("text", PARITY)
+def test_parity_with_parse_latex(text):
+    # 原生解析器须与 parse_latex 逐节点一致（未求值形式）
+    assert sp.srepr(parse_latex_native(text)) == sp.srepr(parse_latex(text))
+
+
+def test_left_right_bars():
+    # \left| x \right| 是原生解析器的扩展（parse_latex 不接受）
+    assert sp.srepr(parse_latex_native(r"\left| x-1 \right|")) == sp.srepr(parse_latex(r"|x-1|"))
+
+
+@pytest.mark.parametrize("text", [
+    r"\int x dx",
+    r"\lim_{x\to 0} x",
+    r"\sum_{i=1}^n i",
+    r"\binom{n}{k}",
+    r"\mathrm{d}x",
+    r"dx",
+    r"|a|+|b|",
+    r"\frac{1}{x",
+    r"x}",
+    "",
+])
+def test_declines_unsupported(text):
+    with pytest.raises(LatexUnsupported):
+        parse_latex_native(text)
+
+
+@pytest.mark.parametrize("text, parser", [
+    (r"\frac{1}{x}", PARSER_NATIVE),
+    (r"\sqrt[3]{x+1}", PARSER_NATIVE),
+    (r"\int x dx", PARSER_LATEX),
+    (r"\binom{n}{k}", PARSER_LATEX),
+    (r"|a|+|b|", PARSER_LATEX),
+])
+def test_parser_field(text, parser):
+    expr, err, used = parse_raw_detailed(text, assume_latex=True)
+    assert err is None and expr is not None
+    assert used == parser
+
+
+def test_fallback_result_matches_parse_latex():
+    expr, _, used = parse_raw_detailed(r"\binom{n}{k}", assume_latex=True)
+    assert used == PARSER_LATEX
+    assert expr == parse_latex(r"\binom{n}{k}")
+
+
+def test_unbalanced_braces_rejected_after_fallback():
+    expr, err, used = parse_raw_detailed(r"\frac{1}{x", assume_latex=True)
+    assert expr is None
+    assert "unbalanced braces" in err
+    assert used == PARSER_LATEX
+
+
+def test_plain_text_parser():
+    assert parse_raw_detailed("x**2+1")[2] == PARSER_TEXT
+
+
+def test_normalize_reports_parser():
+    assert normalize(r"$\frac{1}{x}$")["parser"] == PARSER_NATIVE
+    assert normalize(r"$\binom{n}{k}$")["parser"] == PARSER_LATEX
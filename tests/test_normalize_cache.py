@@ -0,0 +1,39 @@
+import pytest
+
+from equallab import disk_cache
+from equallab.api import normalize
+from equallab.cache import get_cache
+from equallab.normalization import to_sympy
+from equallab.sandbox import SymbolicTimeout
+
+
+@pytest.fixture
+def disk(tmp_path, monkeypatch):
+    cache = disk_cache.DiskCache(str(tmp_path / "normalize.sqlite"))
+    monkeypatch.setattr(disk_cache, "_disk_cache", cache)
+    monkeypatch.setattr(disk_cache, "_disk_cache_ready", True)
+    get_cache().clear()
+    yield cache
+    get_cache().clear()
+
+
+def _timeout(*args, **kwargs):
+    raise SymbolicTimeout("forced")
+
+
+def test_timed_out_simplify_not_persisted(disk, monkeypatch):
+    text = r"$\sin^2 y + \cos^2 y$"
+    with monkeypatch.context() as m:
+        m.setattr(to_sympy, "run_symbolic", _timeout)
+        out = normalize(text)
+        assert out.degraded
+        assert out["expr"] != 1
+    assert disk.stats()["items"] == 0
+
+    # 健康的调用重新计算并写入
+    out = normalize(text)
+    assert not out.degraded
+    assert out["expr"] == 1
+    assert disk.stats()["items"] == 1
+    assert normalize(text)["expr"] == 1
+    assert disk.stats()["hits"] == 1
@@ -0,0 +1,49 @@
+import numpy as np
+import sympy as sp
+
+from equallab.similarity.equivalence import are_equivalent
+from equallab.similarity.numeric import compile_numeric, numeric_check, sample_matrix
+
+
+x, y = sp.symbols("x y")
+
+
+def _check(diff, samples=64):
+    return numeric_check(diff, sp.denom(sp.together(diff)), sorted(diff.free_symbols, key=str), samples, 1e-8)
+
+
+def test_sample_matrix_respects_assumptions():
+    n = sp.Symbol("n", integer=True)
+    p = sp.Symbol("p", positive=True)
+    m = sample_matrix([n, p, x], 40)
+    assert m.shape == (3, 40)
+    assert np.all(m.imag == 0)
+    assert np.all(m[0].real == np.round(m[0].real)) and np.all(m[0].real != 0)
+    assert np.all(m[1].real > 0)
+    # 前 8 列取自整数域 [-3..3]\{0}
+    assert set(m[2, :8].real) <= {-3, -2, -1, 1, 2, 3}
+    assert np.array_equal(m, sample_matrix([n, p, x], 40))
+
+
+def test_removable_pole_masked():
+    # x=1 处分母为 0，被掩码剔除后仍取满 64 个有效点
+    out = _check((x**2 - 1) / (x - 1) - (x + 1))
+    assert (out.tried, out.success) == (64, 64)
+
+
+def test_non_identity_fails():
+    out = _check(sp.sin(x) - x)
+    assert out.tried == 64 and out.success == 0
+
+
+def test_vectorized_path_used():
+    res = are_equivalent(sp.sin(x) ** 2 + sp.cos(x) ** 2, sp.Integer(1), stages=("sample",))
+    assert (res.is_equivalent, res.method, res.samples_total) == (True, "numeric", 64)
+
+
+def test_sympy_fallback_when_not_lambdifiable():
+    integral = sp.Integral(sp.exp(x * y), (y, 0, 1))
+    assert compile_numeric([integral], [x]) is None
+    res = are_equivalent(integral, sp.exp(x) / x, stages=("sample",))
+    # 逐点回退路径仍限制在 8 个样本
+    assert (res.is_equivalent, res.method, res.samples_total) == (False, "numeric-sympy", 8)
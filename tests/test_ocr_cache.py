@@ -0,0 +1,26 @@
+import time
+
+from equallab.ocr import OcrCache, image_key
+
+
+def test_path_keys_use_short_ttl(tmp_path, monkeypatch):
+    cache = OcrCache(ttl=86400, path_ttl=60, disk=False)
+    remote = ("http://ocr/predict", image_key("/srv/only-on-server.png"))
+    local = tmp_path / "q.png"
+    local.write_bytes(b"png")
+    content = ("http://ocr/predict", image_key(str(local)))
+    assert remote[1][0] == "path" and content[1][0] == "sha256"
+    cache.put(remote, ("text/plain", "x"))
+    cache.put(content, ("text/plain", "y"))
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert cache.get(remote) is None
+    assert cache.get(content) == ("text/plain", "y")
+
+
+def test_path_keys_not_cached_when_disabled():
+    cache = OcrCache(ttl=0, path_ttl=0, disk=False)
+    key = ("http://ocr/predict", image_key("/srv/only-on-server.png"))
+    cache.put(key, ("text/plain", "x"))
+    assert cache.get(key) is None
@@ -0,0 +1,179 @@
+import asyncio
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from equallab.ocr import OcrCache, OcrClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """OCR 桩服务：按 path 参数决定行为，flaky* 每个路径首次返回 503，down* 始终 503，bad* 返回 400，slow* 延迟响应。"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        path = parse_qs(urlparse(self.path).query).get("path", [""])[0]
+        server = self.server
+        with server.lock:
+            server.hits[path] = server.hits.get(path, 0) + 1
+            first = server.hits[path] == 1
+        if path.startswith("slow"):
+            time.sleep(0.5)
+        if path.startswith("down") or (path.startswith("flaky") and first):
+            self._send(503, "text/plain", "busy")
+        elif path.startswith("bad"):
+            self._send(400, "text/plain", "bad request")
+        else:
+            self._send(200, "application/json", '{"latex": ["$x$"]}')
+
+    def _send(self, status, content_type, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.hits, srv.lock = {}, threading.Lock()
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _client(url, **kwargs):
+    kwargs.setdefault("retries", 2)
+    # 关闭缓存，每次调用都真正请求服务端
+    return OcrClient(url, backoff=0.0, cache=OcrCache(max_items=0, disk=False), **kwargs)
+
+
+@pytest.fixture
+def url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/predict"
+
+
+@pytest.fixture
+def dead_url():
+    # 取一个当前无人监听的端口：连接被拒绝
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/predict"
+
+
+def test_sync_success(url):
+    client = _client(url)
+    assert client.recognize("ok.png") == "$x$"
+    assert (client.requests, client.retried) == (1, 0)
+
+
+def test_sync_retries_5xx(url):
+    client = _client(url)
+    assert client.recognize("flaky-sync.png") == "$x$"
+    assert (client.requests, client.retried) == (2, 1)
+
+
+def test_sync_gives_up_after_retries(url):
+    client = _client(url, retries=2)
+    with pytest.raises(RuntimeError, match="503"):
+        client.recognize("down-sync.png")
+    assert client.requests == 3
+
+
+def test_sync_4xx_not_retried(url):
+    client = _client(url)
+    with pytest.raises(RuntimeError, match="400"):
+        client.recognize("bad-sync.png")
+    assert client.requests == 1
+
+
+def test_sync_connection_error_retried(dead_url):
+    client = _client(dead_url, retries=1)
+    with pytest.raises(RuntimeError, match="HTTP"):
+        client.recognize("q.png")
+    assert (client.requests, client.retried) == (2, 1)
+
+
+def test_sync_read_timeout_not_retried(url):
+    client = _client(url, read_timeout=0.1)
+    with pytest.raises(RuntimeError, match="HTTP"):
+        client.recognize("slow-sync.png")
+    assert client.requests == 1
+
+
+def test_sync_session_reused(url):
+    client = _client(url)
+    client.recognize("ok.png")
+    session = client._get_session()
+    client.recognize("ok.png")
+    assert client._get_session() is session
+
+
+def _arun(coro):
+    return asyncio.run(coro)
+
+
+def test_async_success(url):
+    client = _client(url)
+    assert _arun(client.arecognize("ok.png")) == "$x$"
+    assert (client.requests, client.retried) == (1, 0)
+
+
+def test_async_retries_5xx(url):
+    client = _client(url)
+    assert _arun(client.arecognize("flaky-async.png")) == "$x$"
+    assert (client.requests, client.retried) == (2, 1)
+
+
+def test_async_gives_up_after_retries(url):
+    client = _client(url, retries=2)
+    with pytest.raises(RuntimeError, match="503"):
+        _arun(client.arecognize("down-async.png"))
+    assert client.requests == 3
+
+
+def test_async_4xx_not_retried(url):
+    client = _client(url)
+    with pytest.raises(RuntimeError, match="400"):
+        _arun(client.arecognize("bad-async.png"))
+    assert client.requests == 1
+
+
+def test_async_connection_error_retried(dead_url):
+    client = _client(dead_url, retries=1)
+    with pytest.raises(RuntimeError, match="HTTP"):
+        _arun(client.arecognize("q.png"))
+    assert (client.requests, client.retried) == (2, 1)
+
+
+def test_async_read_timeout_not_retried(url):
+    client = _client(url, read_timeout=0.1)
+    with pytest.raises(RuntimeError, match="HTTP"):
+        _arun(client.arecognize("slow-async.png"))
+    assert client.requests == 1
+
+
+def test_async_concurrent_requests_share_client(url):
+    client = _client(url)
+
+    async def run():
+        out = await asyncio.gather(*(client.arecognize(f"ok-{i}.png") for i in range(8)))
+        clients = set(map(id, client._async_clients.values()))
+        await client.aclose()
+        return out, clients
+
+    out, clients = _arun(run())
+    assert out == ["$x$"] * 8
+    assert len(clients) == 1
@@ -0,0 +1,49 @@
+import pytest
+import sympy as sp
+
+from equallab.similarity.equivalence import are_equivalent
+from equallab.similarity.pit import pit_equal
+
+
+x, y, z = sp.symbols("x y z")
+
+
+@pytest.mark.parametrize("a, b", [
+    ((x + y) ** 2, x**2 + 2 * x * y + y**2),
+    ((x**2 - 1) / (x - 1), x + 1),
+    (sp.Rational(1, 2) * x + sp.Rational(1, 3) * x, sp.Rational(5, 6) * x),
+    ((x + y + z) ** 10, sp.expand((x + y + z) ** 10)),
+    (1 / x + 1 / y, (x + y) / (x * y)),
+])
+def test_identities(a, b):
+    out = pit_equal(a, b, [x, y, z])
+    assert out is not None and out.equal
+    assert 0 < out.error_bound <= 1e-12
+
+
+@pytest.mark.parametrize("a, b", [
+    ((x + y) ** 2, x**2 + y**2),
+    ((x + 1) ** 20, sp.expand((x + 1) ** 20) + 1),
+    (1 / x, 1 / (x + 1)),
+])
+def test_non_identities(a, b):
+    out = pit_equal(a, b, [x, y])
+    assert out is not None and not out.equal
+    assert out.error_bound == 0.0
+
+
+@pytest.mark.parametrize("a, b", [
+    (sp.sin(x) ** 2 + sp.cos(x) ** 2, sp.Integer(1)),
+    (sp.sqrt(x), x ** sp.Rational(1, 2)),
+    (x**0.5, sp.sqrt(x)),
+    (sp.pi * x, x),
+    (sp.exp(x), x),
+])
+def test_non_rational_declined(a, b):
+    assert pit_equal(a, b, [x]) is None
+
+
+def test_pit_stage_verdict():
+    res = are_equivalent((x + y) ** 3, sp.expand((x + y) ** 3), stages=("pit",))
+    assert (res.is_equivalent, res.method) == (True, "pit")
+    assert res.error_bound is not None and res.error_bound <= 1e-12
@@ -0,0 +1,48 @@
+import pytest
+
+from equallab.chem import BalanceError, balance_reaction_info
+from equallab.chem.reaction import balance_cache_stats
+
+
+def _hits():
+    return balance_cache_stats()["hits"]
+
+
+def test_reordered_species_hit_cache():
+    rc, pc, *_ = balance_reaction_info("C3H8 + O2 -> CO2 + H2O")
+    assert (rc, pc) == ([1, 5], [3, 4])
+    before = _hits()
+    rc, pc, reag, prod, _ = balance_reaction_info("O2 + C3H8 -> H2O + CO2")
+    assert _hits() == before + 1
+    # 命中时按调用方的物种顺序取回系数
+    assert (reag, prod) == (["O2", "C3H8"], ["H2O", "CO2"])
+    assert (rc, pc) == ([5, 1], [4, 3])
+
+
+def test_alternative_spelling_and_prefix_hit_cache():
+    balance_reaction_info("CH4 + O2 -> CO2 + H2O")
+    before = _hits()
+    rc, pc, _, prod, _ = balance_reaction_info("CH4 + 2O2 -> CO2 + OH2")
+    assert _hits() == before + 1
+    assert prod == ["CO2", "OH2"]
+    assert (rc, pc) == ([1, 2], [1, 2])
+
+
+def test_errors_are_cached():
+    reaction = "Na + Cl2 -> NaCl + NaCl3"
+    with pytest.raises(BalanceError) as first:
+        balance_reaction_info(reaction)
+    before = _hits()
+    with pytest.raises(BalanceError) as second:
+        balance_reaction_info("Cl2 + Na -> NaCl3 + NaCl")
+    assert _hits() == before + 1
+    assert first.value.kind == second.value.kind == "underdetermined"
+
+
+def test_duplicate_compositions_bypass_cache():
+    # 同一侧组成相同的物种无法唯一对应，直接配平，不查也不写缓存
+    stats = balance_cache_stats()
+    with pytest.raises(BalanceError):
+        balance_reaction_info("H2O + OH2 -> H2 + O2")
+    after = balance_cache_stats()
+    assert (after["hits"], after["misses"], after["items"]) == (stats["hits"], stats["misses"], stats["items"])
@@ -0,0 +1,52 @@
+import pytest
+
+from equallab.chem import BalanceError, balance_reaction_info, reactions_equivalent
+from equallab.chem import reaction
+from equallab.chem.reaction import reaction_equivalence_info
+
+
+@pytest.mark.parametrize("a, b", [
+    ("H2 + 1/2 O2 -> H2O", "2H2 + O2 -> 2H2O"),
+    ("H2 + 0.5 O2 -> H2O", "2H2 + O2 -> 2H2O"),
+    ("1/3 N2 + H2 -> 2/3 NH3", "N2 + 3H2 -> 2NH3"),
+])
+def test_fractional_coefficients(a, b):
+    out = reaction_equivalence_info(a, b)
+    assert out["equivalent"] is True
+    assert out["a"]["balanced_as_written"] and out["a"]["source"] == "written"
+    assert out["a"]["stoichiometry"] == out["b"]["stoichiometry"]
+
+
+def test_opposite_direction_not_equivalent():
+    out = reaction_equivalence_info("2H2O -> 2H2 + O2", "2H2 + O2 -> 2H2O")
+    assert out["equivalent"] is False
+    assert out["a"]["stoichiometry"] == {"H2": -2, "H2O": 2, "O2": -1}
+
+
+def test_unbalanced_side_is_balanced():
+    out = reaction_equivalence_info("N2 + H2 -> NH3", "N2 + 3H2 -> 2NH3")
+    assert out["equivalent"] is True
+    assert out["a"]["balanced_as_written"] is False and out["a"]["source"] == "integer"
+    assert out["b"]["balanced_as_written"] is True
+
+
+def test_spelling_normalized():
+    assert reactions_equivalent("2H2 + O2 -> 2H2O", "2H2 + O2 -> 2OH2")
+    assert not reactions_equivalent("2H2 + O2 -> 2H2O", "H2 + O2 -> H2O2")
+
+
+def test_balanced_as_written_skips_balancing(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("balance_reaction_info called")
+
+    monkeypatch.setattr(reaction, "balance_reaction_info", fail)
+    assert reaction_equivalence_info("2H2 + O2 -> 2H2O", "4H2 + 2O2 -> 4H2O")["equivalent"] is True
+
+
+def test_written_combination_needs_no_unique_balancing():
+    # 两个独立反应的叠加无法唯一配平，但按书写已守恒，可直接比较
+    written = "3H2 + 2O2 -> 2H2O + H2O2"
+    with pytest.raises(BalanceError):
+        balance_reaction_info(written)
+    assert reactions_equivalent(written, "6H2 + 4O2 -> 4H2O + 2H2O2")
+    assert not reactions_equivalent(written, "H2 + O2 -> H2O2")
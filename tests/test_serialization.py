@@ -0,0 +1,26 @@
+import pickle
+
+import sympy as sp
+
+from equallab.serialization import dumps
+
+
+def test_undefined_function_roundtrip():
+    x = sp.Symbol("x")
+    f = sp.Function("f")
+    expr = f(x) * sp.sin(x) ** 2
+    assert pickle.loads(dumps(expr)) == expr
+
+
+def test_unevaluated_tree_kept():
+    x = sp.Symbol("x")
+    expr = sp.Add(x, x, evaluate=False)
+    back = pickle.loads(dumps(expr))
+    assert sp.srepr(back) == sp.srepr(expr)
+    log = sp.log(x, sp.E, evaluate=False)
+    assert sp.srepr(pickle.loads(dumps(log))) == sp.srepr(log)
+
+
+def test_plain_objects():
+    value = {"a": (1, 2.5, "x"), "b": [None]}
+    assert pickle.loads(dumps(value)) == value
@@ -0,0 +1,41 @@
+import sympy as sp
+
+from equallab.cache import get_cache
+from equallab.similarity.structure import expr_fingerprint, label_of, structure_similarity
+
+
+def test_fingerprint_counts():
+    x = sp.Symbol("x")
+    fp = expr_fingerprint(sp.sin(x) + sp.cos(x))
+    labels = {label_of(k): n for k, n in fp.nodes.items()}
+    assert labels == {"Add": 1, "sin": 1, "cos": 1, "Sym:x": 2}
+    assert fp.size == 5 and fp.depth is False
+
+
+def test_fingerprint_depth_variant_cached_separately():
+    x = sp.Symbol("x")
+    expr = sp.sin(x) ** 2
+    flat, deep = expr_fingerprint(expr), expr_fingerprint(expr, depth=True)
+    assert flat is not deep and deep.depth is True
+    assert {label_of(k, depth=True) for k in deep.nodes} == {label_of(k) for k in flat.nodes}
+    assert expr_fingerprint(expr, depth=True) is deep
+
+
+def test_fingerprint_not_in_shared_cache():
+    # 指纹走独立的 LRU，不写入共享 CanonicalCache
+    cache = get_cache()
+    before = cache.stats()
+    expr_fingerprint.cache_clear()
+    y = sp.Symbol("y_fp")
+    fp = expr_fingerprint(sp.exp(y) * y)
+    assert expr_fingerprint(sp.exp(y) * y) is fp
+    after = cache.stats()
+    assert (after["items"], after["hits"], after["misses"]) == (before["items"], before["hits"], before["misses"])
+    assert expr_fingerprint.cache_info().hits == 1
+
+
+def test_structure_similarity():
+    x, y = sp.symbols("x y")
+    assert structure_similarity(sp.sin(x) + 1, sp.sin(x) + 1) == 1.0
+    assert 0 < structure_similarity(sp.sin(x) + 1, sp.cos(x) + 1) < 1
+    assert structure_similarity(sp.sin(x), sp.exp(y)) == 0.0
@@ -0,0 +1,56 @@
+import time
+
+import pytest
+import sympy as sp
+
+from equallab.similarity.scorer import STRUCTURE_METRICS
+from equallab.similarity.tree_edit import EXACT_LIMIT, _annotate, _dp_cost, tree_edit_distance
+
+x, y = sp.symbols("x y")
+
+
+def _deep(depth, a, b):
+    # 右偏的 Add/Mul 交替嵌套：几乎每个右子节点都是关键根，DP 代价随深度四次方增长
+    e = a
+    for i in range(depth):
+        inner = sp.Add(a, e, evaluate=False) if i % 2 else sp.Mul(a, e, evaluate=False)
+        e = sp.Mul(b, inner, evaluate=False) if i % 2 else sp.Add(b, inner, evaluate=False)
+    return e
+
+
+def test_auto_mode_gates_on_dp_cost():
+    e1, e2 = _deep(45, x, y), _deep(45, y, x)
+    n1, n2 = len(_annotate(e1)[0]), len(_annotate(e2)[0])
+    assert n1 * n2 < 40_000
+    assert _dp_cost(_annotate(e1)[1], _annotate(e2)[1]) > EXACT_LIMIT
+    start = time.perf_counter()
+    res = tree_edit_distance(e1, e2)
+    assert time.perf_counter() - start < 1.0
+    assert not res.exact
+
+
+def test_scorer_tree_edit_deep_trees_fast():
+    e1, e2 = _deep(45, x, y), _deep(45, y, x)
+    start = time.perf_counter()
+    score = STRUCTURE_METRICS["tree_edit"](e1, e2)
+    assert time.perf_counter() - start < 1.0
+    assert 0.0 <= score <= 1.0
+
+
+@pytest.mark.parametrize("bound", [0, 2, 5, 20])
+def test_bounded_dp_matches_exact(bound):
+    e1, e2 = _deep(8, x, y), _deep(9, y, x)
+    full = tree_edit_distance(e1, e2, mode="exact").distance
+    res = tree_edit_distance(e1, e2, bound=bound, mode="exact")
+    assert res.distance == min(full, bound + 1)
+    assert res.exceeded == (full > bound)
+
+
+def test_small_bound_prunes_deep_dp():
+    e1, e2 = _deep(30, x, y), _deep(30, y, x)
+    l1, l2 = _annotate(e1)[1], _annotate(e2)[1]
+    assert _dp_cost(l1, l2, bound=3) * 10 < _dp_cost(l1, l2)
+    start = time.perf_counter()
+    res = tree_edit_distance(e1, e2, bound=3, mode="exact")
+    assert time.perf_counter() - start < 2.0
+    assert res.exceeded and res.distance == 4
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+from equallab.ocr import get_ocr_client
+from equallab.web import app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def arecognize(image_path, fields):
+        return "$x^2+2x+1$"
+
+    monkeypatch.setattr(get_ocr_client(), "arecognize", arecognize)
+    return TestClient(app)
+
+
+def test_image_similarity_returns_normalized_forms(client):
+    resp = client.post("/image/similarity", json={"image_path": "/tmp/q.png", "latex": "$(x+1)^2$"})
+    assert resp.status_code == 200
+    res = resp.json()["result"]
+    assert res["equivalent"] is True
+    # a/b 为 NormalizedExpr，须按 Mapping 展开并把 expr 转为字符串
+    assert res["a"]["latex_norm"] == "x^2+2x+1"
+    assert res["a"]["expr"] == "x**2 + 2*x + 1"
+    assert res["b"]["expr"] == "(x + 1)**2"